@@ -0,0 +1,142 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from markupsafe import Markup, escape
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+STATIC_DIR = "static"
+DIST_DIR = "dist"
+MANIFEST_PATH = os.path.join(STATIC_DIR, DIST_DIR, "manifest.json")
+
+# Version de marked embarquée dans static/vendor par scripts/build_assets.py
+MARKED_VERSION = "12.0.2"
+MARKED_URL = f"https://cdn.jsdelivr.net/npm/marked@{MARKED_VERSION}/marked.min.js"
+
+# Feuille commune à toutes les pages (incluse par base.html)
+BASE_BUNDLE = "base.css"
+
+# Bundles → fichiers sources (relatifs à static/), dans l'ordre de concaténation.
+# Les @import CSS sont résolus au build ; un fichier déjà présent dans base.css
+# n'est pas répété dans les autres feuilles.
+BUNDLES: Dict[str, List[str]] = {
+    "base.css": ["css/theme.css"],
+    "chat.css": ["css/chatbot.css", "css/responsive.css"],
+    "chat.js": ["vendor/marked.min.js", "js/chatbot.js"],
+    "admin.css": ["css/pages/admin.css"],
+    "dashboard.css": ["css/pages/dashboard.css"],
+    "auth.css": ["css/pages/auth.css"],
+    "faq.js": ["js/faq.js"],
+}
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Encodages précompressés, par ordre de préférence
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> Dict[str, str]:
+    """Manifeste bundle → fichier versionné ; vide si les assets n'ont pas été construits."""
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _source_url(path: str) -> str:
+    if path.startswith("vendor/") and not os.path.exists(os.path.join(STATIC_DIR, path)):
+        # Dépendance tierce pas encore récupérée par le build : CDN, version figée
+        return MARKED_URL
+    return f"/static/{path}"
+
+
+def asset_urls(bundle: str) -> List[str]:
+    """URL du bundle versionné, ou des fichiers sources si le build n'a pas été lancé (dev).
+
+    Une dépendance tierce absente de static/vendor n'est pas dans le bundle : elle est
+    chargée avant lui depuis le CDN.
+    """
+    built = load_manifest().get(bundle)
+    if built:
+        external = [
+            _source_url(path) for path in BUNDLES[bundle]
+            if path.startswith("vendor/") and not os.path.exists(os.path.join(STATIC_DIR, path))
+        ]
+        return external + [f"/static/{built}"]
+    return [_source_url(path) for path in BUNDLES[bundle]]
+
+
+def asset_tags(bundle: str) -> Markup:
+    """Balises <link>/<script> d'un bundle, pour les templates Jinja."""
+    if bundle.endswith(".css"):
+        tag = '<link rel="stylesheet" href="{}" />'
+    else:
+        tag = '<script src="{}"></script>'
+    return Markup("\n".join(tag.format(escape(url)) for url in asset_urls(bundle)))
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles avec cache long pour les fichiers versionnés et variantes br/gzip précompressées.
+
+    Les variantes de static/dist sont indexées une fois au montage (le build ne change
+    qu'au redéploiement) : pas de stat() bloquant par requête.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precompressed = self._index_precompressed()
+
+    def _index_precompressed(self) -> Dict[str, Tuple[str, os.stat_result]]:
+        variants: Dict[str, Tuple[str, os.stat_result]] = {}
+        dist_dir = os.path.join(self.directory, DIST_DIR) if self.directory is not None else None
+        if dist_dir is None or not os.path.isdir(dist_dir):
+            return variants
+        suffixes = tuple(suffix for _, suffix in PRECOMPRESSED)
+        for name in os.listdir(dist_dir):
+            if name.endswith(suffixes):
+                full_path = os.path.join(dist_dir, name)
+                variants[f"{DIST_DIR}/{name}"] = (full_path, os.stat(full_path))
+        return variants
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        path_key = path.replace(os.sep, "/")
+        immutable = path_key.startswith(f"{DIST_DIR}/")
+        if immutable:
+            accepted = _accepted_encodings(scope)
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding not in accepted or path_key + suffix not in self.precompressed:
+                    continue
+                full_path, stat_result = self.precompressed[path_key + suffix]
+                response = self.file_response(full_path, stat_result, scope)
+                # Type du fichier d'origine, pas celui de l'extension .br/.gz
+                response.headers["content-type"] = _media_type(path)
+                response.headers["content-encoding"] = encoding
+                response.headers["vary"] = "Accept-Encoding"
+                response.headers["cache-control"] = IMMUTABLE_CACHE
+                return response
+
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE_CACHE if immutable else "no-cache"
+            if immutable:
+                response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+def _accepted_encodings(scope: Scope) -> set:
+    for name, value in scope.get("headers", []):
+        if name == b"accept-encoding":
+            return {part.split(";")[0].strip() for part in value.decode("latin-1").split(",")}
+    return set()
+
+
+def _media_type(path: str) -> str:
+    if path.endswith(".css"):
+        return "text/css; charset=utf-8"
+    if path.endswith(".js"):
+        return "text/javascript; charset=utf-8"
+    return "application/octet-stream"
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -9,17 +9,80 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "CHANGE_ME_IN_PROD_PLEASE_USE_OPENSSL_RAND_HEX_32"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Hachage argon2 hors boucle d'événements (threads dédiés)
+    PASSWORD_HASH_WORKERS: int = 2
+    # Cache token → utilisateur actif (par worker)
+    AUTH_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
     # Base de données
     DATABASE_URL: str = "sqlite:///./chatbot_production.db"
+    # URL asynchrone (déduite de DATABASE_URL si vide, ex. sqlite+aiosqlite://)
+    ASYNC_DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
     # LLM Keys
     GROQ_API_KEY: Optional[str] = None
     OPENAI_API_KEY: Optional[str] = None
+    # Points d'accès compatibles (proxy, serveur simulé des benchmarks)
+    GROQ_BASE_URL: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None
     # RAG Settings
     EMBEDDING_MODEL: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
     FAQ_JSON_PATH: str = "data/faq.json"
     CONFIDENCE_THRESHOLD: float = 0.45
+    # Inférence CPU des embeddings : fichier écrit par scripts/tune_embeddings.py,
+    # valeurs ci-dessous prioritaires si non nulles
+    EMBEDDING_TUNING_FILE: str = "data/embedding_tuning.json"
+    EMBEDDING_THREADS: int = 0
+    EMBEDDING_BATCH_SIZE: int = 0
+    EMBEDDING_MAX_SEQ_LENGTH: int = 0
     DIRECT_ANSWER_THRESHOLD: float = 0.75
-    # Config Chroma
+    # Cascade d'embeddings : encodeur rapide d'abord (CASCADE_MODEL, ou les CASCADE_LAYERS
+    # premières couches du modèle), modèle complet seulement si le premier classement est ambigu
+    CASCADE_MODEL: Optional[str] = None
+    CASCADE_LAYERS: int = 0
+    CASCADE_ACCEPT_SCORE: float = 0.85
+    CASCADE_MIN_MARGIN: float = 0.1
+    CASCADE_REJECT_SCORE: float = 0.2
+    # Budget de temps de bout en bout pour /chat (secondes)
+    CHAT_DEADLINE_SECONDS: float = 8.0
+    # Historique de conversation gardé en mémoire (par worker)
+    HISTORY_TURNS: int = 5
+    HISTORY_CACHE_SESSIONS: int = 10000
+    # Écriture différée des interactions (par lots)
+    WRITE_BATCH_SIZE: int = 100
+    WRITE_FLUSH_INTERVAL_MS: int = 200
+    WRITE_QUEUE_SIZE: int = 10000
+    WRITE_ENQUEUE_TIMEOUT: float = 0.5
+    # Rétention de l'historique (0 = désactivé), archives NDJSON compressées zstd.
+    # Sous SQLite, l'espace libéré n'est rendu qu'en auto_vacuum incrémental (scripts/init_db.py, serveur arrêté)
+    RETENTION_DAYS: int = 0
+    RETENTION_MAX_ROWS: int = 0
+    RETENTION_INTERVAL_HOURS: float = 24.0
+    ARCHIVE_DIR: str = "data/archive"
+    # Regroupement des questions manquées (dashboard admin)
+    CLUSTER_SIMILARITY_THRESHOLD: float = 0.8
+    CLUSTER_INTERVAL_SECONDS: float = 60.0
+    CLUSTER_WINDOW_DAYS: int = 30
+    # Flux SSE du dashboard : commentaire de maintien de connexion (secondes)
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    # Canal WebSocket /ws/chat : ping après inactivité, session reprise si reconnexion dans le délai
+    WS_HEARTBEAT_SECONDS: float = 20.0
+    WS_RESUME_SECONDS: float = 120.0
+    WS_MAX_SESSIONS: int = 10000
+    # Réindexation FAQ en arrière-plan (modifications rapprochées regroupées)
+    REINDEX_DEBOUNCE_SECONDS: float = 2.0
+    REINDEX_MAX_DELAY_SECONDS: float = 30.0
+    # Limitation de débit (seaux à jetons) : "N/second|minute|hour[:rafale]" par route
+    RATE_LIMIT_PER_SESSION: Dict[str, str] = {"/chat": "20/minute"}
+    RATE_LIMIT_PER_IP: Dict[str, str] = {"/chat": "60/minute"}
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    # "memory" (par worker) ou "sqlite" (partagé entre workers)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = "data/ratelimit.db"
+    # Config Chroma ("memory" : index local au processus, sans serveur Chroma)
+    VECTOR_BACKEND: str = "chroma"
     CHROMA_DB_HOST: str = "chromadb"
     CHROMA_DB_PORT: int = 8000
     CHROMA_COLLECTION_NAME: str = "faq_collection"
@@ -3,11 +3,13 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.security.utils import get_authorization_scheme_param
 from jose import jwt, JWTError
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
 from app.db.models import User
-from app.db.session import get_session
+from app.db.session import get_async_session
+from app.services.user_cache import user_cache
 
 # auto_error=False permet de ne pas lever d'erreur automatiquement
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
@@ -32,7 +34,7 @@ async def get_token_from_request(
 
 async def get_current_user(
     token: Annotated[str, Depends(get_token_from_request)],
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,6 +47,10 @@ async def get_current_user(
         # Mais ici on lève une 401 standard
         raise credentials_exception
 
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
@@ -54,14 +60,16 @@ async def get_current_user(
         raise credentials_exception
     
     statement = select(User).where(User.email == email)
-    user = db.exec(statement).first()
+    user = (await db.exec(statement)).first()
     
     if user is None:
         raise credentials_exception
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Utilisateur inactif")
-        
+
+    # Seuls les utilisateurs actifs sont mis en cache
+    user_cache.put(token, user, payload.get("exp"))
     return user
 
 async def get_current_admin_user(
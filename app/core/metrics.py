@@ -0,0 +1,116 @@
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Sequence, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Étapes mesurées : history, retrieval, normalize, rules, cascade_encode, cascade_query, encode,
+# vector_query, llm, persistence
+STAGE_LATENCY = Histogram(
+    "chatbot_stage_duration_seconds",
+    "Durée de chaque étape du traitement d'un message",
+    ["stage"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+LLM_LATENCY = Histogram(
+    "chatbot_llm_duration_seconds",
+    "Durée des appels LLM par provider",
+    ["provider", "status"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+CHAT_REQUESTS = Counter(
+    "chatbot_chat_requests_total",
+    "Messages traités par /chat, par provider de réponse",
+    ["provider"],
+)
+CACHE_REQUESTS = Counter(
+    "chatbot_cache_requests_total",
+    "Accès aux caches internes",
+    ["cache", "result"],
+)
+REINDEX_DURATION = Histogram(
+    "chatbot_reindex_duration_seconds",
+    "Durée de la synchronisation SQL → index vectoriel",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+PERSISTENCE_ERRORS = Counter(
+    "chatbot_persistence_errors_total",
+    "Interactions dont la sauvegarde a échoué",
+)
+WRITES_DROPPED = Counter(
+    "chatbot_persistence_dropped_total",
+    "Interactions abandonnées faute de place dans la file d'écriture",
+)
+WRITE_QUEUE_DEPTH = Gauge(
+    "chatbot_persistence_queue_depth",
+    "Interactions en attente d'écriture",
+)
+WRITE_BATCH_SIZE = Histogram(
+    "chatbot_persistence_batch_size",
+    "Nombre d'interactions par transaction d'écriture",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+RETENTION_ARCHIVED = Counter(
+    "chatbot_retention_archived_total",
+    "Interactions déplacées vers les archives compressées",
+)
+CASCADE_DECISIONS = Counter(
+    "chatbot_cascade_decisions_total",
+    "Issue du premier étage de la cascade d'embeddings (accept, reject, second_stage)",
+    ["decision"],
+)
+WS_CONNECTIONS = Gauge(
+    "chatbot_ws_connections",
+    "Connexions WebSocket /ws/chat ouvertes",
+)
+WS_RESUMES = Counter(
+    "chatbot_ws_resumes_total",
+    "Reconnexions WebSocket, par issue (resumed, expired)",
+    ["result"],
+)
+RATE_LIMITED = Counter(
+    "chatbot_rate_limited_total",
+    "Requêtes refusées par la limitation de débit",
+    ["route", "scope"],
+)
+
+# Durées collectées pendant la requête courante, restituées dans l'en-tête Server-Timing
+_server_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timings", default=None)
+
+
+def start_server_timing() -> List[Tuple[str, float]]:
+    timings: List[Tuple[str, float]] = []
+    _server_timings.set(timings)
+    return timings
+
+
+def format_server_timing(timings: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in timings)
+
+
+def record_stage(stage: str, duration: float):
+    STAGE_LATENCY.labels(stage=stage).observe(duration)
+    timings = _server_timings.get()
+    if timings is not None:
+        timings.append((stage, duration))
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentile par rang le plus proche (q entre 0 et 100) ; partagé par les scripts de mesure."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+@contextmanager
+def timed(stage: str):
+    """Mesure un bloc de code et l'enregistre sous le nom d'étape donné."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from sqlalchemy import JSON, Column, Index
 from sqlmodel import Field, SQLModel
 
 class User(SQLModel, table=True):
@@ -18,6 +19,12 @@ class FAQItem(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class ChatInteraction(SQLModel, table=True):
+    __table_args__ = (
+        # Historique d'une session trié par date
+        Index("ix_chatinteraction_session_timestamp", "user_session_id", "timestamp"),
+        # Dernières questions manquées du dashboard
+        Index("ix_chatinteraction_timestamp", "timestamp"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_session_id: str = Field(index=True)  # ID anonyme du frontend
     message: str
@@ -25,4 +32,29 @@ class ChatInteraction(SQLModel, table=True):
     confidence: float
     provider: str  # "groq", "openai", "retrieval_only"
     is_helpful: Optional[bool] = None  # Pour le feedback utilisateur
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+class StatsBucket(SQLModel, table=True):
+    """Compteurs agrégés par tranche horaire/journalière et par provider, tenus à jour à l'écriture."""
+    granularity: str = Field(primary_key=True)  # "hour" ou "day"
+    bucket_start: datetime = Field(primary_key=True)
+    provider: str = Field(primary_key=True)
+    messages: int = 0
+    confidence_sum: float = 0.0
+    missed: int = 0  # confiance sous CONFIDENCE_THRESHOLD (hors règles statiques)
+
+class JobLease(SQLModel, table=True):
+    """Bail d'une tâche de fond : un seul worker l'exécute tant que le bail n'a pas expiré."""
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: datetime
+
+class MissedClusterRecord(SQLModel, table=True):
+    """Cluster de questions manquées publié par le worker qui regroupe, lu par tous les workers."""
+    id: int = Field(primary_key=True)  # id de l'interaction fondatrice
+    size: int
+    representative: str
+    examples: List[str] = Field(default_factory=list, sa_column=Column(JSON))
+    interaction_ids: List[int] = Field(default_factory=list, sa_column=Column(JSON))
+    last_seen: Optional[datetime] = None
+    resolved: bool = False  # transformé en FAQ : retiré au prochain passage
@@ -1,15 +1,62 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import create_engine, Session
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncGenerator, Generator
 from app.core.config import settings
 
-connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+# Pilotes asynchrones utilisés quand ASYNC_DATABASE_URL n'est pas fourni
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
 
+def to_async_url(url: str) -> str:
+    scheme, _, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+def configure_sqlite(engine):
+    """WAL + busy_timeout : lectures concurrentes des écritures et attente des verrous plutôt qu'une erreur."""
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if ":memory:" not in settings.DATABASE_URL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+connect_args = {"check_same_thread": False} if is_sqlite else {}
+pool_args = {} if is_sqlite else {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_pre_ping": True,
+}
+
+# Moteur synchrone : scripts, tâches de fond en thread (écriture différée, rétention)
 engine = create_engine(
-    settings.DATABASE_URL, 
+    settings.DATABASE_URL,
     echo=False,
     connect_args=connect_args
 )
 
+# Moteur asynchrone : chemins de requête HTTP
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL),
+    echo=False,
+    **pool_args
+)
+
+if is_sqlite:
+    configure_sqlite(engine)
+    configure_sqlite(async_engine.sync_engine)
+
 def get_session() -> Generator:
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -1,36 +1,79 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse  
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
 from fastapi.templating import Jinja2Templates
 from sqlmodel import SQLModel
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import os
 
 from app.core.config import settings
-from app.db.session import engine, get_session
+from app.core.assets import CachedStaticFiles, asset_tags
+from app.core.metrics import format_server_timing, start_server_timing
+from app.db.session import async_engine, engine, get_session
 from app.services.rag_engine import RAGService
+from app.services.interaction_writer import interaction_writer
+from app.services.reindex_jobs import reindex_scheduler
+from app.services.live_events import dashboard_events
+from app.services.retention import ensure_indexes, retention_loop
+from app.services.stats import backfill_stats
+from app.services.faq_search import ensure_faq_search
+from app.services.missed_clusters import clustering_loop, missed_clusterer
 from app.routers import auth, admin, chat
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_tags"] = asset_tags
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     SQLModel.metadata.create_all(engine)
+    ensure_indexes(engine)
+    ensure_faq_search(engine)
     with next(get_session()) as db:
+        backfill_stats(db)
         RAGService().reload_from_db(db)
+    interaction_writer.listeners.append(dashboard_events.publish_batch)
+    interaction_writer.start()
+    reindex_scheduler.start()
+    retention_task = None
+    if settings.RETENTION_DAYS or settings.RETENTION_MAX_ROWS:
+        retention_task = asyncio.create_task(retention_loop(engine))
+    clustering_task = asyncio.create_task(clustering_loop(engine, missed_clusterer))
     yield
+    clustering_task.cancel()
+    if retention_task:
+        retention_task.cancel()
+    await run_in_threadpool(reindex_scheduler.stop)
+    await run_in_threadpool(interaction_writer.stop)
+    await async_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     lifespan=lifespan
 )
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    """Expose les durées des étapes de la requête dans l'en-tête Server-Timing."""
+    timings = start_server_timing()
+    response = await call_next(request)
+    if timings:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
+
+# Fichiers versionnés de static/dist : cache immuable et variantes br/gzip
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(admin.router, prefix="/admin")
 app.include_router(chat.router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques au format texte Prometheus."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/")
 async def root(request: Request):
     if os.path.exists("templates/index.html"):
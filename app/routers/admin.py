@@ -1,38 +1,55 @@
-from fastapi import APIRouter, Depends, Request, Form, HTTPException
-from fastapi.responses import RedirectResponse, JSONResponse
+import asyncio
+import tracemalloc
+from datetime import datetime
+from fastapi import APIRouter, Depends, Request, Form, HTTPException, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select, func
-from app.db.session import get_session
+import json
+from typing import Literal, Optional
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.session import get_async_session
 from app.db.models import ChatInteraction, FAQItem
 from app.core.deps import get_current_admin_user
 from app.services.rag_engine import RAGService
+from app.services.reindex_jobs import reindex_scheduler
+from app.services.live_events import dashboard_events, format_sse
+from app.services import profiler
+from app.services import stats as stats_service
+from app.services import missed_clusters
+from app.services import faq_io, faq_search
+from app.core.config import settings
+from app.core.assets import asset_tags
 
 router = APIRouter(tags=["Admin"])
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_tags"] = asset_tags
+# Un seul profilage à la fois par worker
+profiling_lock = asyncio.Lock()
+FAQ_PAGE_SIZE = 50
 
 @router.get("/dashboard")
 async def dashboard(
     request: Request,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_admin_user)
 ):
-    total_messages = db.exec(select(func.count(ChatInteraction.id))).one()
-    avg_confidence = db.exec(select(func.avg(ChatInteraction.confidence))).one() or 0.0
-    
-    missed_questions = db.exec(
+    missed_questions = (await db.exec(
         select(ChatInteraction)
-        .where(ChatInteraction.confidence < 0.45)
+        .where(ChatInteraction.confidence < settings.CONFIDENCE_THRESHOLD)
         .where(ChatInteraction.provider != "static_rule")
         .order_by(ChatInteraction.timestamp.desc())
         .limit(50) 
-    ).all()
+    )).all()
 
-    stats = {
-        "total_messages": total_messages,
-        "avg_confidence": avg_confidence,
-        "missed_questions_count": len(missed_questions),
-        "recent_missed": missed_questions
-    }
+    stats = await stats_service.get_summary(db)
+    stats.update({
+        "recent_missed": missed_questions,
+        "clusters": await missed_clusters.top_clusters(db, 10),
+        "providers": await stats_service.get_provider_mix(db),
+        "trend": await stats_service.get_trend(db, "day", 14)
+    })
     
     return templates.TemplateResponse("admin/dashboard.html", {
         "request": request,
@@ -41,60 +58,190 @@ async def dashboard(
         "active_page": "dashboard"
     })
 
+@router.get("/dashboard/stream")
+async def dashboard_stream(
+    request: Request,
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_admin_user)
+):
+    """Flux SSE : totaux à la connexion, puis deltas et nouvelles questions manquées à chaque écriture"""
+    summary = await stats_service.get_summary(db)
+    summary["confidence_sum"] = summary["avg_confidence"] * summary["total_messages"]
+    # La connexion n'est pas gardée pendant toute la durée du flux
+    await db.close()
+    queue = dashboard_events.subscribe()
+
+    async def events():
+        try:
+            yield format_sse({"event": "summary", "data": summary})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            dashboard_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/faq")
 async def manage_faq(
     request: Request,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_admin_user)
 ):
-    """Affiche la liste des questions"""
-    faqs = db.exec(select(FAQItem).order_by(FAQItem.id.desc())).all()
+    """Affiche la première page des questions (la suite est chargée via /faq/items)"""
+    faqs, has_more = await faq_search.search_faqs(db, limit=FAQ_PAGE_SIZE)
     
     return templates.TemplateResponse("admin/faq.html", {
         "request": request,
         "faqs": faqs,
+        "next_cursor": faqs[-1].id if has_more else None,
+        "categories": await faq_search.list_categories(db),
+        "indexing": reindex_scheduler.status()["indexing"],
         "user": current_user,
         "active_page": "faq"
     })
 
+@router.get("/faq/items")
+async def list_faq_items(
+    q: str = "",
+    category: str = "",
+    limit: int = Query(FAQ_PAGE_SIZE, ge=1, le=200),
+    before: Optional[int] = None,
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_admin_user)
+):
+    """Page de FAQ filtrée : fragment HTML des cartes et curseur de la page suivante"""
+    faqs, has_more = await faq_search.search_faqs(db, q, category or None, limit, before, offset)
+    next_cursor = None
+    if has_more:
+        # Recherche : pagination par offset (tri par pertinence), sinon par id
+        next_cursor = str(offset + limit) if q.strip() else str(faqs[-1].id)
+    return {
+        "html": templates.get_template("admin/_faq_cards.html").render(faqs=faqs),
+        "count": len(faqs),
+        "next_cursor": next_cursor,
+        "items": [faq_io.faq_to_dict(faq) for faq in faqs]
+    }
+
 @router.post("/faq/add")
 async def add_faq(
     request: Request,
     question: str = Form(...),
     answer: str = Form(...),
     category: str = Form("general"),
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_admin_user)
 ):
     """Ajoute une question et recharge le RAG"""
     new_item = FAQItem(question=question, answer=answer, category=category)
     db.add(new_item)
-    db.commit()
+    await db.commit()
     
-    RAGService().reload_from_db(db)
+    reindex_scheduler.request("faq_add")
     
     return RedirectResponse(url="/admin/faq", status_code=303)
 
+@router.post("/faq/import")
+async def import_faq(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_admin_user)
+):
+    """Import en masse (JSON ou CSV) : upsert en une transaction et une seule mise à jour de l'index"""
+    try:
+        items = faq_io.parse_faq_file(await file.read(), file.filename or "")
+    except (faq_io.FAQImportError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    report, created, updated = await db.run_sync(faq_io.upsert_faqs, items)
+    if created or updated:
+        # Encodage hors de la boucle d'événements ; sans index chargé, reconstruction en arrière-plan
+        if not await run_in_threadpool(faq_io.index_faqs, report, created, updated):
+            reindex_scheduler.request("faq_import")
+    return report
+
+@router.get("/faq/export")
+async def export_faq(
+    format: Literal["json", "csv"] = "json",
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_admin_user)
+):
+    """Export en flux de toute la FAQ (sauvegarde, réimportable via /faq/import)"""
+    async def generate():
+        statement = select(FAQItem).order_by(FAQItem.id).execution_options(yield_per=500)
+        try:
+            rows = await db.stream_scalars(statement)
+            if format == "csv":
+                yield faq_io.csv_line(faq_io.CSV_FIELDS)
+                async for faq in rows:
+                    yield faq_io.csv_line([faq.question, faq.answer, faq.category])
+            else:
+                yield "["
+                separator = ""
+                async for faq in rows:
+                    yield separator + json.dumps(faq_io.faq_to_dict(faq), ensure_ascii=False)
+                    separator = ","
+                yield "]"
+        finally:
+            await db.close()
+
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/json"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="faq_export.{format}"'}
+    )
+
+@router.get("/reindex/status")
+async def reindex_status(current_user = Depends(get_current_admin_user)):
+    """État des reconstructions de l'index (en attente, en cours, dernières terminées)"""
+    return reindex_scheduler.status()
+
+@router.post("/reindex")
+async def request_reindex(current_user = Depends(get_current_admin_user)):
+    """Demande manuelle de reconstruction complète de l'index"""
+    job = reindex_scheduler.request("manual")
+    return JSONResponse(status_code=202, content=job.to_dict())
+
 @router.post("/faq/delete/{faq_id}")
 async def delete_faq(
     faq_id: int,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_admin_user)
 ):
     """Supprime une question et recharge le RAG"""
-    item = db.get(FAQItem, faq_id)
+    item = await db.get(FAQItem, faq_id)
     if item:
-        db.delete(item)
-        db.commit()
-        # Rechargement du RAG après suppression
-        RAGService().reload_from_db(db)
+        await db.delete(item)
+        await db.commit()
+        # Plus servie dès maintenant ; reconstruction de l'index en arrière-plan.
+        # Thread : le verrou de l'index peut être tenu par une reconstruction
+        await run_in_threadpool(RAGService().remove_items, [faq_id])
+        reindex_scheduler.request("faq_delete")
         
     return RedirectResponse(url="/admin/faq", status_code=303)
 
 @router.get("/stats")
-async def get_stats_json(db: Session = Depends(get_session), current_user = Depends(get_current_admin_user)):
-    total = db.exec(select(func.count(ChatInteraction.id))).one()
-    return {"total_messages": total}
+async def get_stats_json(
+    granularity: Literal["hour", "day"] = "day",
+    periods: int = Query(14, ge=1, le=744),
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_admin_user)
+):
+    summary = await stats_service.get_summary(db)
+    summary["providers"] = await stats_service.get_provider_mix(db)
+    summary["trend"] = await stats_service.get_trend(db, granularity, periods)
+    return summary
 
 @router.post("/questions/convert-to-faq/{interaction_id}")
 async def convert_question_to_faq(
@@ -102,19 +249,19 @@ async def convert_question_to_faq(
     question: str = Form(None),
     answer: str = Form(None),
     category: str = Form("general"),
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_admin_user)
 ):
-    interaction = db.get(ChatInteraction, interaction_id)
+    interaction = await db.get(ChatInteraction, interaction_id)
     if not interaction:
         raise HTTPException(status_code=404, detail="Interaction not found")
     
     faq_question = question if question else interaction.message
     faq_answer = answer if answer else interaction.response
     
-    existing = db.exec(
+    existing = (await db.exec(
         select(FAQItem).where(FAQItem.question == faq_question)
-    ).first()
+    )).first()
     
     if existing:
         return JSONResponse(
@@ -128,13 +275,10 @@ async def convert_question_to_faq(
         category=category
     )
     db.add(new_faq)
-    db.commit()
-    db.refresh(new_faq)
+    await db.commit()
+    await db.refresh(new_faq)
     
-    try:
-        RAGService().reload_from_db(db)
-    except Exception as e:
-        print(f"Error reloading ChromaDB: {e}")
+    reindex_scheduler.request("question_convert")
     
     return JSONResponse(
         status_code=200,
@@ -145,13 +289,71 @@ async def convert_question_to_faq(
         }
     )
 
+@router.get("/questions/clusters")
+async def get_missed_clusters(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_admin_user)
+):
+    """Questions manquées regroupées par similarité, les plus fréquentes d'abord"""
+    return {"clusters": await missed_clusters.top_clusters(db, limit)}
+
+@router.post("/questions/clusters/{cluster_id}/convert-to-faq")
+async def convert_cluster_to_faq(
+    cluster_id: int,
+    question: str = Form(None),
+    answer: str = Form(None),
+    category: str = Form("general"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_admin_user)
+):
+    cluster = await missed_clusters.get_cluster(db, cluster_id)
+    if not cluster:
+        raise HTTPException(status_code=404, detail="Cluster not found")
+
+    faq_question = question or cluster.representative
+    if not answer:
+        latest = await db.get(ChatInteraction, cluster.interaction_ids[-1])
+        answer = latest.response if latest else ""
+    if not answer:
+        raise HTTPException(status_code=400, detail="An answer is required")
+
+    existing = (await db.exec(
+        select(FAQItem).where(FAQItem.question == faq_question)
+    )).first()
+    if existing:
+        return JSONResponse(
+            status_code=400,
+            content={"message": "This question already exists in FAQ", "faq_id": existing.id}
+        )
+
+    new_faq = FAQItem(question=faq_question, answer=answer, category=category)
+    db.add(new_faq)
+    # Retiré du classement par le worker qui regroupe, à son prochain passage
+    cluster.resolved = True
+    db.add(cluster)
+    await db.commit()
+    await db.refresh(new_faq)
+
+    reindex_scheduler.request("cluster_convert")
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "message": "Cluster added to FAQ successfully",
+            "faq_id": new_faq.id,
+            "question": new_faq.question,
+            "covered_questions": cluster.size
+        }
+    )
+
 @router.get("/questions/{interaction_id}")
 async def get_question_details(
     interaction_id: int,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_admin_user)
 ):
-    interaction = db.get(ChatInteraction, interaction_id)
+    interaction = await db.get(ChatInteraction, interaction_id)
     if not interaction:
         raise HTTPException(status_code=404, detail="Interaction not found")
     
@@ -163,4 +365,46 @@ async def get_question_details(
         "provider": interaction.provider,
         "timestamp": interaction.timestamp.isoformat(),
         "user_session_id": interaction.user_session_id
-    }
\ No newline at end of file
+    }
+
+def _profile_artifact(content: str, kind: str) -> PlainTextResponse:
+    filename = f"{kind}-{datetime.utcnow():%Y%m%dT%H%M%S}.txt"
+    return PlainTextResponse(
+        content,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/profile/cpu")
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=100),
+    current_user = Depends(get_current_admin_user)
+):
+    """Profil CPU échantillonné du worker, au format « collapsed stacks »."""
+    if profiling_lock.locked():
+        raise HTTPException(status_code=409, detail="Un profilage est déjà en cours")
+    async with profiling_lock:
+        stacks = await run_in_threadpool(profiler.sample_cpu, seconds, interval_ms / 1000)
+    return _profile_artifact(stacks, "cpu")
+
+@router.get("/profile/memory")
+async def profile_memory(
+    seconds: float = Query(10.0, gt=0, le=300),
+    top: int = Query(50, ge=1, le=500),
+    current_user = Depends(get_current_admin_user)
+):
+    """Différence entre deux snapshots tracemalloc pris à `seconds` d'intervalle."""
+    if profiling_lock.locked():
+        raise HTTPException(status_code=409, detail="Un profilage est déjà en cours")
+    async with profiling_lock:
+        started = profiler.start_memory_trace()
+        try:
+            # Un snapshot parcourt toutes les traces : hors de la boucle d'événements
+            before = await run_in_threadpool(tracemalloc.take_snapshot)
+            await asyncio.sleep(seconds)
+            after = await run_in_threadpool(tracemalloc.take_snapshot)
+        finally:
+            if started:
+                tracemalloc.stop()
+    report = await run_in_threadpool(profiler.diff_memory_snapshots, before, after, top)
+    return _profile_artifact(report, "memory")
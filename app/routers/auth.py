@@ -2,20 +2,26 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import timedelta
+from typing import Optional
 
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.db.models import User
-from app.core.security import verify_password, create_access_token
+from app.core.security import verify_password_async, create_access_token
+from app.core.deps import get_token_from_request
+from app.services.user_cache import user_cache
 from app.core.config import settings
+from app.core.assets import asset_tags
 
 router = APIRouter(tags=["Authentication"])
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_tags"] = asset_tags
 
 @router.post("/token")
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
-    user = _authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_session)):
+    user = await _authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,13 +39,13 @@ async def login_page(request: Request):
 async def login_cookie(
     request: Request,
     response: Response,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     form = await request.form()
     email = form.get("username")
     password = form.get("password")
     
-    user = _authenticate_user(db, email, password)
+    user = await _authenticate_user(db, email, password)
     if not user:
         return templates.TemplateResponse("auth/login.html", {
             "request": request, 
@@ -62,16 +68,19 @@ async def login_cookie(
     return redirect
 
 @router.get("/logout")
-async def logout():
+async def logout(token: Optional[str] = Depends(get_token_from_request)):
+    if token:
+        user_cache.invalidate_token(token)
     response = RedirectResponse(url="/api/auth/login")
     response.delete_cookie("access_token")
     return response
 
-def _authenticate_user(db: Session, email: str, password: str):
+async def _authenticate_user(db: AsyncSession, email: str, password: str):
     statement = select(User).where(User.email == email)
-    user = db.exec(statement).first()
+    user = (await db.exec(statement)).first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # argon2 dans le pool dédié : la boucle continue de servir /chat pendant la vérification
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
\ No newline at end of file
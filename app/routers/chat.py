@@ -1,21 +1,45 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
-from sqlmodel import Session, select, delete, desc
-from app.db.session import get_session
+import asyncio
+import json
+import logging
+import math
+import time
+import zlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Literal, Optional
+from sqlmodel import select, delete, desc
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.session import get_async_session
 from app.db.models import ChatInteraction
 from app.services.rag_engine import RAGService
 from app.services.llm_factory import LLMOrchestrator
+from app.services.prompts import build_messages
+from app.services.chat_sessions import ChatSession, ChatSessionRegistry
+from app.services.history_cache import SessionHistoryCache, Turn
+from app.services.interaction_writer import interaction_writer
+from app.services.rate_limit import rate_limiter
 from app.core.config import settings
+from app.core.metrics import CHAT_REQUESTS, WS_CONNECTIONS, timed
 
+logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Chat"])
 rag_service = RAGService()
 llm_orchestrator = LLMOrchestrator()
+history_cache = SessionHistoryCache(settings.HISTORY_CACHE_SESSIONS, settings.HISTORY_TURNS)
+chat_sessions = ChatSessionRegistry(settings.WS_RESUME_SECONDS, settings.WS_MAX_SESSIONS, settings.HISTORY_TURNS)
+# Messages WebSocket en cours (référence forte : ils survivent à la déconnexion du client)
+_ws_tasks = set()
+# use_llm des messages WebSocket validé comme ChatRequest.use_llm ("false" → False)
+_use_llm_adapter = TypeAdapter(bool)
 
 class ChatRequest(BaseModel):
     message: str
     user_id: str = "anonymous"
     use_llm: bool = True
+    # Budget de temps en secondes (par défaut settings.CHAT_DEADLINE_SECONDS)
+    deadline_seconds: Optional[float] = Field(default=None, gt=0, le=60)
 
 class ChatResponse(BaseModel):
     response: str
@@ -25,38 +49,60 @@ class ChatResponse(BaseModel):
     retrieval_only: bool = False 
     is_new_question: bool = False 
 
-def save_interaction_task(db: Session, user_id: str, msg: str, resp: str, conf: float, prov: str):
-    try:
-        interaction = ChatInteraction(
-            user_session_id=user_id,
-            message=msg,
-            response=resp,
-            confidence=conf,
-            provider=prov
-        )
-        db.add(interaction)
-        db.commit()
-    except Exception as e:
-        print(f"Erreur sauvegarde historique: {e}")
-
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(
     request: ChatRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_session)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_session)
 ):
-    history_items = db.exec(
-        select(ChatInteraction)
-        .where(ChatInteraction.user_session_id == request.user_id)
-        .order_by(desc(ChatInteraction.timestamp))
-        .limit(5)
-    ).all()
-    history_items = history_items[::-1]
-    history_text = "\n".join(
-        [f"User: {h.message}\nAssistant: {h.response}" for h in history_items]
-    ) if history_items else "Aucun historique récent."
-
-    rag_result = rag_service.search(request.message, threshold=settings.CONFIDENCE_THRESHOLD)
+    await rate_limiter.enforce("/chat", http_request, request.user_id)
+    budget = request.deadline_seconds or settings.CHAT_DEADLINE_SECONDS
+    deadline = time.monotonic() + budget
+    history = await load_history(db, request.user_id)
+    return await answer_message(request.message, request.user_id, request.use_llm, history, deadline)
+
+async def load_history(db: AsyncSession, user_id: str) -> List[Turn]:
+    """Derniers échanges de la session : cache du worker, sinon base."""
+    with timed("history"):
+        history = history_cache.get(user_id)
+        if history is None:
+            history_items = (await db.exec(
+                select(ChatInteraction)
+                .where(ChatInteraction.user_session_id == user_id)
+                .order_by(desc(ChatInteraction.timestamp))
+                .limit(settings.HISTORY_TURNS)
+            )).all()
+            history = [(h.message, h.response) for h in reversed(history_items)]
+            history_cache.fill(user_id, history)
+    return history
+
+async def answer_message(
+    message: str,
+    user_id: str,
+    use_llm: bool,
+    history: List[Turn],
+    deadline: float,
+    on_event: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+) -> ChatResponse:
+    """Recherche, LLM éventuel et sauvegarde d'un message (partagé par /chat et /ws/chat).
+
+    `on_event` reçoit les étapes intermédiaires : "retrieval" puis "partial" (texte LLM accumulé).
+    """
+    try:
+        # Recherche exécutée hors de la boucle d'événements, bornée par le délai restant
+        with timed("retrieval"):
+            rag_result = await asyncio.wait_for(
+                run_in_threadpool(rag_service.search, message, settings.CONFIDENCE_THRESHOLD),
+                timeout=max(deadline - time.monotonic(), 0),
+            )
+    except asyncio.TimeoutError:
+        CHAT_REQUESTS.labels(provider="timeout").inc()
+        return ChatResponse(
+            response="Désolé, le délai de réponse est dépassé. Veuillez réessayer.",
+            confidence=0.0,
+            provider="timeout",
+            is_new_question=False
+        )
     response_text = ""
     provider = "retrieval_only"
     confidence = rag_result["confidence"]
@@ -64,6 +110,7 @@ async def chat_endpoint(
     context_faq = rag_result["answer"] if rag_result["answer"] else ""
 
     if rag_result.get("provider") == "static_rule":
+        CHAT_REQUESTS.labels(provider="static_rule").inc()
         return ChatResponse(
             response=rag_result["answer"],
             confidence=1.0,
@@ -71,43 +118,47 @@ async def chat_endpoint(
             retrieval_only=True,
             is_new_question=False
         )
+    if on_event:
+        await on_event("retrieval", {"confidence": confidence, "matched_question": matched_q})
     # Cas A : Confiance TRÈS élevée -> FAQ Directe
     if context_faq and confidence >= settings.DIRECT_ANSWER_THRESHOLD:
         response_text = context_faq
         provider = "retrieval_high_confidence"
     # Cas B : Passage au LLM
     else:
-        system_prompt = f"""Tu es un assistant support client utile et précis.
-
-CONTEXTE FAQ (Peut être vide ou peu pertinent, score={confidence:.2f}) :
-"{context_faq}"
-
-HISTORIQUE :
-{history_text}
-
-INSTRUCTIONS :
-1. Utilise le CONTEXTE FAQ en priorité s'il semble répondre à la question.
-2. Si le contexte est vide ou hors-sujet, utilise tes connaissances.
-3. Réponds toujours poliment et en français.
-"""
-        if request.use_llm:
+        messages = build_messages(message, history, context_faq, confidence)
+        if use_llm:
+            # Flux demandé seulement par /ws/chat : /chat garde l'appel non streamé
+            streaming = {"on_partial": lambda text: on_event("partial", {"text": text})} if on_event else {}
             llm_result = await llm_orchestrator.generate_response(
-                f"{system_prompt}\n\nUser: {request.message}"
+                messages,
+                timeout=max(deadline - time.monotonic(), 0),
+                **streaming,
             )
             
             if llm_result["status"] == "success":
                 response_text = llm_result["response"]
                 provider = f"llm_{llm_result['provider']}"
+            elif llm_result["status"] == "timeout":
+                # Meilleure réponse disponible dans le budget : le contexte FAQ
+                response_text = context_faq or llm_result["response"]
+                provider = "fallback_timeout"
             else:
                 response_text = context_faq or "Désolé, mes services d'IA sont indisponibles."
                 provider = "fallback_error"
         else:
             response_text = context_faq or "Je n'ai pas trouvé de réponse exacte."
 
+    CHAT_REQUESTS.labels(provider=provider).inc()
     # Sauvegarde
-    background_tasks.add_task(
-        save_interaction_task, db, request.user_id, request.message, response_text, confidence, provider
-    )
+    history_cache.append(user_id, message, response_text)
+    await interaction_writer.submit(ChatInteraction(
+        user_session_id=user_id,
+        message=message,
+        response=response_text,
+        confidence=confidence,
+        provider=provider
+    ))
     is_retrieval = provider in ["retrieval_high_confidence", "static_rule", "retrieval_only"]
 
     return ChatResponse(
@@ -119,40 +170,232 @@ INSTRUCTIONS :
         is_new_question=(confidence < settings.CONFIDENCE_THRESHOLD) 
     )
 
+@router.websocket("/ws/chat")
+async def chat_websocket(
+    websocket: WebSocket,
+    user_id: str = Query("anonymous"),
+    resume: Optional[str] = Query(None, description="session_id reçu à la connexion précédente"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Canal de chat persistant : état de session en mémoire, événements typing/partial, reprise.
+
+    Client → serveur : {"type": "message", "message", "id"?, "use_llm"?}, {"type": "prefs", "use_llm"},
+    {"type": "ping"}, {"type": "pong"}. Serveur → client : session, typing, retrieval, partial,
+    answer (champs de ChatResponse), error, ping, pong.
+    """
+    await websocket.accept()
+    session = chat_sessions.resume(resume, user_id, websocket) if resume else None
+    resumed = session is not None
+    if session is None:
+        session = chat_sessions.create(user_id, await load_history(db, user_id), websocket)
+    # Historique chargé une fois pour toute la connexion : on rend la connexion SQL
+    await db.close()
+
+    WS_CONNECTIONS.inc()
+    try:
+        await session.send({
+            "type": "session",
+            "session_id": session.session_id,
+            "resumed": resumed,
+            "use_llm": session.use_llm,
+            "heartbeat_seconds": settings.WS_HEARTBEAT_SECONDS,
+        })
+        for event in session.take_pending():
+            await session.send(event, keep=True)
+
+        awaiting_pong = False
+        while True:
+            try:
+                data = await asyncio.wait_for(websocket.receive_json(), timeout=settings.WS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if awaiting_pong:
+                    # Deux intervalles sans nouvelles : connexion considérée comme perdue
+                    await websocket.close(code=1001)
+                    break
+                awaiting_pong = True
+                await session.send({"type": "ping"})
+                continue
+            except (KeyError, ValueError):
+                # Trame binaire (pas de "text") ou JSON invalide : la connexion reste ouverte
+                await session.send({"type": "error", "detail": "Trame texte JSON attendue"})
+                continue
+            awaiting_pong = False
+
+            kind = data.get("type") if isinstance(data, dict) else None
+            if kind == "message":
+                task = asyncio.create_task(_handle_ws_message(websocket, session, data))
+                _ws_tasks.add(task)
+                task.add_done_callback(_ws_tasks.discard)
+            elif kind == "prefs":
+                try:
+                    session.use_llm = _use_llm_adapter.validate_python(data.get("use_llm", session.use_llm))
+                except ValueError:
+                    await session.send({"type": "error", "detail": "use_llm doit être un booléen"})
+                    continue
+                await session.send({"type": "prefs", "use_llm": session.use_llm})
+            elif kind == "ping":
+                await session.send({"type": "pong"})
+            elif kind != "pong":
+                await session.send({"type": "error", "detail": f"Type de message inconnu : {kind}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        WS_CONNECTIONS.dec()
+        # Les messages en cours se terminent : réponses sauvegardées et gardées pour la reprise
+        chat_sessions.detach(session, websocket)
+
+async def _handle_ws_message(websocket: WebSocket, session: ChatSession, data: Dict[str, Any]):
+    message_id = data.get("id")
+    message = data.get("message")
+    if not isinstance(message, str) or not message.strip():
+        await session.send({"type": "error", "id": message_id, "detail": "Message vide"})
+        return
+    try:
+        use_llm = _use_llm_adapter.validate_python(data.get("use_llm", session.use_llm))
+    except ValueError:
+        await session.send({"type": "error", "id": message_id, "detail": "use_llm doit être un booléen"})
+        return
+    wait = await rate_limiter.retry_after("/chat", websocket, session.user_id)
+    if wait > 0:
+        await session.send({
+            "type": "error",
+            "id": message_id,
+            "detail": "Trop de requêtes, veuillez patienter avant de réessayer.",
+            "retry_after": math.ceil(wait),
+        })
+        return
+
+    async def on_event(kind: str, payload: Dict[str, Any]):
+        await session.send({"type": kind, "id": message_id, **payload})
+
+    async with session.lock:
+        await session.send({"type": "typing", "id": message_id})
+        deadline = time.monotonic() + settings.CHAT_DEADLINE_SECONDS
+        try:
+            result = await answer_message(message, session.user_id, use_llm, list(session.turns), deadline, on_event)
+        except Exception:
+            logger.exception("Échec du traitement d'un message WebSocket")
+            await session.send({"type": "error", "id": message_id, "detail": "Erreur interne"}, keep=True)
+            return
+        if result.provider not in ("static_rule", "timeout"):
+            session.turns.append((message, result.response))
+        await session.send({"type": "answer", "id": message_id, **result.model_dump()}, keep=True)
+
 @router.get("/llm/status")
 async def get_llm_status():
     """Retourne le statut pour le badge en haut à droite"""
     return llm_orchestrator.get_status()
 
+def _serialize_interaction(i: ChatInteraction) -> Dict[str, Any]:
+    return {
+        "id": i.id,
+        "user_message": i.message,
+        "bot_response": i.response,
+        "confidence": i.confidence,
+        "provider": i.provider,
+        "retrieval_only": (i.provider == "retrieval_only"),
+        "timestamp": i.timestamp.isoformat()
+    }
+
 @router.get("/chat/history/{user_id}")
-async def get_chat_history(user_id: str, db: Session = Depends(get_session)):
-    """Récupère l'historique pour un utilisateur spécifique"""
-    interactions = db.exec(
-        select(ChatInteraction)
-        .where(ChatInteraction.user_session_id == user_id)
-        .order_by(ChatInteraction.timestamp)
-    ).all()
-    
-    history_data = []
-    for i in interactions:
-        history_data.append({
-            "user_message": i.message,
-            "bot_response": i.response,
-            "confidence": i.confidence,
-            "provider": i.provider,
-            "retrieval_only": (i.provider == "retrieval_only")
-        })
-        
+async def get_chat_history(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = Query(None, description="Curseur : id renvoyé dans next_cursor"),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Récupère l'historique d'un utilisateur, page par page (du plus récent au plus ancien)"""
+    # Lecture de ses propres écritures : on vide la file avant de lire
+    await interaction_writer.flush_async()
+    statement = select(ChatInteraction).where(ChatInteraction.user_session_id == user_id)
+    if before is not None:
+        statement = statement.where(ChatInteraction.id < before)
+    # Une ligne de plus pour savoir s'il reste une page
+    interactions = (await db.exec(statement.order_by(desc(ChatInteraction.id)).limit(limit + 1))).all()
+
+    has_more = len(interactions) > limit
+    page = interactions[:limit][::-1]
+    history_data = [_serialize_interaction(i) for i in page]
+
     return {
         "user_id": user_id,
         "total_messages": len(history_data),
-        "history": history_data
+        "history": history_data,
+        "has_more": has_more,
+        "next_cursor": page[0].id if has_more else None
     }
 
+async def _export_lines(db: AsyncSession, user_id: str, export_format: str) -> AsyncIterator[str]:
+    """Génère l'export ligne à ligne depuis un curseur côté serveur."""
+    statement = (
+        select(ChatInteraction)
+        .where(ChatInteraction.user_session_id == user_id)
+        .order_by(ChatInteraction.id)
+        .execution_options(yield_per=500)
+    )
+    if export_format == "json":
+        yield "["
+    try:
+        rows = await db.stream_scalars(statement)
+        index = 0
+        async for i in rows:
+            if export_format == "txt":
+                yield (
+                    f"[{i.timestamp:%Y-%m-%d %H:%M:%S}] Vous : {i.message}\n"
+                    f"[{i.timestamp:%Y-%m-%d %H:%M:%S}] Assistant ({i.provider}) : {i.response}\n\n"
+                )
+            else:
+                line = json.dumps(_serialize_interaction(i), ensure_ascii=False)
+                if export_format == "json":
+                    yield ("," if index else "") + line
+                else:
+                    yield line + "\n"
+            index += 1
+    finally:
+        # La dépendance peut avoir rendu la session avant la fin du flux : on libère la connexion ici
+        await db.close()
+    if export_format == "json":
+        yield "]"
+
+async def _gzip_stream(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 : conteneur gzip
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "txt": "text/plain; charset=utf-8",
+}
+
+@router.get("/chat/history/{user_id}/export")
+async def export_chat_history(
+    user_id: str,
+    http_request: Request,
+    format: Literal["json", "ndjson", "txt"] = "json",
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Exporte tout l'historique d'un utilisateur en flux (JSON, NDJSON ou texte)"""
+    await interaction_writer.flush_async()
+    headers = {"Content-Disposition": f'attachment; filename="chat_history_{user_id}.{format}"'}
+    body = _export_lines(db, user_id, format)
+    if "gzip" in http_request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+        return StreamingResponse(_gzip_stream(body), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+    return StreamingResponse(
+        (chunk.encode("utf-8") async for chunk in body), media_type=EXPORT_MEDIA_TYPES[format], headers=headers
+    )
+
 @router.delete("/chat/history/{user_id}")
-async def clear_chat_history(user_id: str, db: Session = Depends(get_session)):
+async def clear_chat_history(user_id: str, db: AsyncSession = Depends(get_async_session)):
     """Efface l'historique d'un utilisateur"""
+    await interaction_writer.flush_async()
     statement = delete(ChatInteraction).where(ChatInteraction.user_session_id == user_id)
-    db.exec(statement)
-    db.commit()
+    await db.exec(statement)
+    await db.commit()
+    history_cache.invalidate(user_id)
     return {"message": f"Historique effacé pour {user_id}"}
\ No newline at end of file
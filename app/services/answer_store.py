@@ -0,0 +1,47 @@
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from app.db.models import FAQItem
+
+
+class FAQEntry(NamedTuple):
+    question: str
+    answer: str
+    category: str
+
+
+class AnswerStore:
+    """Table id → (question, réponse, catégorie) servant les résultats de l'index vectoriel.
+
+    L'index ne renvoie que des ids et des scores ; une table est construite avec chaque
+    index et basculée en même temps. Les modifications de réponse ou de catégorie y sont
+    appliquées directement, sans passer par le magasin de vecteurs. `version` augmente à
+    chaque modification.
+    """
+
+    def __init__(self, items: Iterable[FAQItem] = (), version: int = 0):
+        self._entries: Dict[str, FAQEntry] = {str(item.id): self._entry(item) for item in items}
+        self.version = version
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(item: FAQItem) -> FAQEntry:
+        return FAQEntry(item.question, item.answer, item.category)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, faq_id: str) -> Optional[FAQEntry]:
+        return self._entries.get(faq_id)
+
+    def upsert(self, items: Iterable[FAQItem]):
+        with self._lock:
+            for item in items:
+                self._entries[str(item.id)] = self._entry(item)
+            self.version += 1
+
+    def remove(self, faq_ids: Iterable[str]):
+        with self._lock:
+            for faq_id in faq_ids:
+                self._entries.pop(str(faq_id), None)
+            self.version += 1
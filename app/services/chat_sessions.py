@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Sequence
+
+from app.core.metrics import WS_RESUMES
+from app.services.history_cache import Turn
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """État d'une conversation WebSocket, conservé en mémoire pendant la connexion.
+
+    Après une déconnexion, la session reste disponible `resume_seconds` : les réponses
+    terminées entre-temps sont mises de côté et renvoyées à la reprise.
+    """
+
+    def __init__(self, user_id: str, turns: Sequence[Turn], max_turns: int, max_pending: int = 20):
+        self.session_id = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.turns: Deque[Turn] = deque(turns, maxlen=max_turns)
+        self.use_llm = True
+        self.websocket = None
+        self.detached_at: Optional[float] = None
+        self.pending: Deque[Dict] = deque(maxlen=max_pending)
+        # Un message à la fois par session : l'historique reste dans l'ordre
+        self.lock = asyncio.Lock()
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, event: Dict, keep: bool = False):
+        """Envoie sur la connexion courante ; `keep` : mis de côté si le client est déconnecté."""
+        websocket = self.websocket
+        if websocket is not None:
+            try:
+                async with self._send_lock:
+                    await websocket.send_json(event)
+                return
+            except Exception as e:
+                logger.debug(f"Envoi WebSocket impossible ({self.session_id}): {e}")
+        if keep:
+            self.pending.append(event)
+
+    def take_pending(self) -> List[Dict]:
+        events = list(self.pending)
+        self.pending.clear()
+        return events
+
+
+class ChatSessionRegistry:
+    """Sessions WebSocket du worker, reprises par identifiant après reconnexion (LRU)."""
+
+    def __init__(self, resume_seconds: float, max_sessions: int, max_turns: int):
+        self.resume_seconds = resume_seconds
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, user_id: str, turns: Sequence[Turn], websocket) -> ChatSession:
+        self._expire()
+        session = ChatSession(user_id, turns, self.max_turns)
+        session.websocket = websocket
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def resume(self, session_id: str, user_id: str, websocket) -> Optional[ChatSession]:
+        """Rattache la session à une nouvelle connexion, ou None (expirée, inconnue, autre utilisateur).
+
+        Une session encore attachée (ancienne connexion pas encore détectée comme fermée) est reprise.
+        """
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            WS_RESUMES.labels(result="expired").inc()
+            return None
+        session.websocket = websocket
+        session.detached_at = None
+        self._sessions.move_to_end(session_id)
+        WS_RESUMES.labels(result="resumed").inc()
+        return session
+
+    def detach(self, session: ChatSession, websocket):
+        # Une reprise a déjà pu rattacher la session à une nouvelle connexion
+        if session.websocket is websocket:
+            session.websocket = None
+            session.detached_at = time.monotonic()
+
+    def _expire(self):
+        limit = time.monotonic() - self.resume_seconds
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if session.detached_at is not None and session.detached_at < limit
+        ]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+    def clear(self):
+        self._sessions.clear()
@@ -0,0 +1,70 @@
+import json
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EmbeddingTuning:
+    """Réglages d'inférence CPU du modèle d'embeddings (None = valeur par défaut de torch / du modèle)."""
+
+    threads: Optional[int] = None
+    batch_size: int = 64
+    max_seq_length: Optional[int] = None
+
+
+def load_tuning(path: Optional[str] = None) -> EmbeddingTuning:
+    """Réglages du fichier produit par scripts/tune_embeddings.py, surchargés par les variables d'environnement."""
+    tuning = EmbeddingTuning()
+    path = Path(path or settings.EMBEDDING_TUNING_FILE)
+    if path.exists():
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            tuning = EmbeddingTuning(**{k: data[k] for k in asdict(tuning) if k in data})
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Fichier de réglages {path} ignoré: {e}")
+    if settings.EMBEDDING_THREADS:
+        tuning.threads = settings.EMBEDDING_THREADS
+    if settings.EMBEDDING_BATCH_SIZE:
+        tuning.batch_size = settings.EMBEDDING_BATCH_SIZE
+    if settings.EMBEDDING_MAX_SEQ_LENGTH:
+        tuning.max_seq_length = settings.EMBEDDING_MAX_SEQ_LENGTH
+    return tuning
+
+
+def apply_tuning(model, tuning: EmbeddingTuning):
+    """Applique les réglages au processus (threads torch) et au modèle (longueur max)."""
+    if tuning.threads:
+        try:
+            import torch
+
+            torch.set_num_threads(tuning.threads)
+        except ImportError:
+            logger.warning("torch indisponible, nombre de threads non appliqué")
+    if tuning.max_seq_length:
+        model.max_seq_length = tuning.max_seq_length
+    logger.info(
+        f"Embeddings : threads={tuning.threads or 'défaut'}, batch={tuning.batch_size}, "
+        f"max_seq_length={tuning.max_seq_length or 'défaut'}"
+    )
+
+
+def truncate_layers(model, layers: int):
+    """Ne garde que les `layers` premières couches du transformeur (variante rapide du même modèle)."""
+    transformer = model[0].auto_model
+    transformer.encoder.layer = transformer.encoder.layer[:layers]
+    transformer.config.num_hidden_layers = len(transformer.encoder.layer)
+    logger.info(f"Encodeur rapide : {len(transformer.encoder.layer)} couches")
+
+
+def select_best(results: List[Dict], max_p99_ms: Optional[float] = None) -> Dict:
+    """Meilleur débit parmi les candidats dont le p99 reste sous `max_p99_ms` (le plus rapide sinon)."""
+    eligible = [r for r in results if max_p99_ms is None or r["p99_ms"] <= max_p99_ms]
+    if not eligible:
+        return min(results, key=lambda r: r["p99_ms"])
+    return max(eligible, key=lambda r: (r["qps"], -r["p99_ms"]))
@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from app.db.models import FAQItem
+
+CSV_FIELDS = ["question", "answer", "category"]
+# Limite prudente du nombre de paramètres par requête SQLite
+LOOKUP_CHUNK = 500
+
+
+class FAQImportError(ValueError):
+    pass
+
+
+def parse_faq_file(content: bytes, filename: str) -> List[Dict[str, str]]:
+    """Lit un fichier JSON (liste d'objets) ou CSV (question, answer[, category])."""
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".csv"):
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise FAQImportError(f"JSON invalide : {e}")
+        if not isinstance(rows, list):
+            raise FAQImportError("Le JSON doit contenir une liste de questions")
+
+    items: Dict[str, Dict[str, str]] = {}
+    for index, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise FAQImportError(f"Ligne {index} : objet attendu")
+        fields = {name: row.get(name) for name in CSV_FIELDS}
+        for name, value in fields.items():
+            if value is not None and not isinstance(value, str):
+                raise FAQImportError(f"Ligne {index} : {name} doit être du texte")
+        question = (fields["question"] or "").strip()
+        answer = (fields["answer"] or "").strip()
+        if not question or not answer:
+            raise FAQImportError(f"Ligne {index} : question et answer sont obligatoires")
+        # Dernière occurrence gagnante pour une même question
+        items[question] = {
+            "question": question,
+            "answer": answer,
+            "category": (fields["category"] or "general").strip(),
+        }
+    return list(items.values())
+
+
+Progress = Callable[[str, int, int], None]
+
+
+def _no_progress(stage: str, done: int, total: int):
+    pass
+
+
+def upsert_faqs(
+    db: Session,
+    items: List[Dict[str, str]],
+    update_existing: bool = True,
+    progress: Progress = _no_progress,
+) -> Tuple[Dict, List[FAQItem], List[FAQItem]]:
+    """Upsert ensembliste des FAQ en une transaction ; retourne le rapport, les FAQ créées et modifiées.
+
+    `update_existing=False` : les questions déjà en base sont laissées telles quelles.
+    Les FAQ retournées sont détachées de la session, avec leurs ids.
+    """
+    report = {"total": len(items), "created": 0, "updated": 0, "unchanged": 0, "timings": {}}
+    start = time.perf_counter()
+
+    existing: Dict[str, FAQItem] = {}
+    questions = [item["question"] for item in items]
+    for offset in range(0, len(questions), LOOKUP_CHUNK):
+        chunk = questions[offset:offset + LOOKUP_CHUNK]
+        for faq in db.exec(select(FAQItem).where(FAQItem.question.in_(chunk))).all():
+            existing[faq.question] = faq
+        progress("lookup", min(offset + LOOKUP_CHUNK, len(questions)), len(questions))
+    report["timings"]["lookup"] = time.perf_counter() - start
+
+    created: List[FAQItem] = []
+    updated: List[FAQItem] = []
+    now = datetime.utcnow()
+    for item in items:
+        faq = existing.get(item["question"])
+        if faq is None:
+            created.append(FAQItem(**item))
+        elif update_existing and (faq.answer != item["answer"] or faq.category != item["category"]):
+            faq.answer = item["answer"]
+            faq.category = item["category"]
+            faq.updated_at = now
+            updated.append(faq)
+    db.add_all(created + updated)
+    # Ids attribués au flush ; détachées avant le commit, les FAQ ne sont pas expirées
+    # (pas de SELECT par ligne quand l'index les relit)
+    db.flush()
+    for faq in created + updated:
+        db.expunge(faq)
+    db.commit()
+    report.update(created=len(created), updated=len(updated), unchanged=len(items) - len(created) - len(updated))
+    report["timings"]["upsert"] = time.perf_counter() - start - report["timings"]["lookup"]
+    progress("upsert", len(items), len(items))
+    return report, created, updated
+
+
+def index_faqs(report: Dict, created: List[FAQItem], updated: List[FAQItem], progress: Progress = _no_progress) -> bool:
+    """Une seule mise à jour partielle de l'index ; False s'il faut une reconstruction complète.
+
+    Seules les questions nouvelles sont encodées ; une réponse ou une catégorie modifiée
+    ne met à jour que la table des réponses. À n'appeler que dans le processus serveur :
+    l'index et la table des réponses vivent dans son RAGService.
+    """
+    from app.services.rag_engine import RAGService
+
+    start = time.perf_counter()
+    updated_index = RAGService().update_items(created, updated)
+    report["timings"]["index"] = time.perf_counter() - start
+    progress("index", len(created), len(created))
+    return updated_index
+
+
+def import_faqs(
+    db: Session,
+    items: List[Dict[str, str]],
+    progress: Optional[Progress] = None,
+    update_existing: bool = True,
+) -> Dict:
+    """Upsert ensembliste des FAQ en une transaction, sans toucher à l'index (scripts).
+
+    Le serveur reconstruit son index au démarrage ou sur POST /admin/reindex.
+    """
+    report, _, _ = upsert_faqs(db, items, update_existing, progress or _no_progress)
+    return report
+
+
+def faq_to_dict(faq: FAQItem) -> Dict:
+    return {"id": faq.id, "category": faq.category, "question": faq.question, "answer": faq.answer}
+
+
+def csv_line(values: Iterable[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
@@ -0,0 +1,99 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, column, text
+from sqlalchemy.engine import Engine
+from sqlmodel import desc, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import FAQItem
+
+FTS_TABLE = "faqitem_fts"
+
+# Index plein texte externe (content=faqitem) tenu à jour par triggers
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        question, answer, category,
+        content='faqitem', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS faqitem_fts_ai AFTER INSERT ON faqitem BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, question, answer, category)
+        VALUES (new.id, new.question, new.answer, new.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS faqitem_fts_ad AFTER DELETE ON faqitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer, category)
+        VALUES ('delete', old.id, old.question, old.answer, old.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS faqitem_fts_au AFTER UPDATE ON faqitem BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer, category)
+        VALUES ('delete', old.id, old.question, old.answer, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, question, answer, category)
+        VALUES (new.id, new.question, new.answer, new.category);
+    END""",
+]
+
+
+def ensure_faq_search(engine: Engine):
+    """Crée l'index FTS5 de la FAQ (SQLite uniquement) et le remplit à la première création."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"), {"name": FTS_TABLE}
+        ).first()
+        for statement in FTS_SCHEMA:
+            conn.exec_driver_sql(statement)
+        if not exists:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def to_fts_query(query: str) -> str:
+    """Transforme la saisie libre en requête FTS5 sûre : chaque mot en préfixe, tous requis."""
+    tokens = re.findall(r"\w+", query)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+async def search_faqs(
+    db: AsyncSession,
+    query: str = "",
+    category: Optional[str] = None,
+    limit: int = 50,
+    before: Optional[int] = None,
+    offset: int = 0,
+) -> Tuple[List[FAQItem], bool]:
+    """Page de FAQ (plus récentes d'abord, ou par pertinence si `query`) et indicateur de page suivante.
+
+    Sans recherche, la pagination se fait par curseur (`before` = id) ; avec recherche,
+    les résultats sont triés par pertinence et paginés par `offset`.
+    """
+    statement = select(FAQItem)
+    if category:
+        statement = statement.where(FAQItem.category == category)
+
+    fts_query = to_fts_query(query)
+    if fts_query and db.bind.dialect.name == "sqlite":
+        ranked = text(
+            f"SELECT rowid AS id, bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"
+        ).bindparams(q=fts_query).columns(column("id", Integer), column("rank", Float)).subquery()
+        statement = (
+            statement.join(ranked, ranked.c.id == FAQItem.id)
+            .order_by(ranked.c.rank)
+            .offset(offset)
+        )
+    elif fts_query:
+        pattern = f"%{query.strip()}%"
+        statement = statement.where(
+            or_(FAQItem.question.ilike(pattern), FAQItem.answer.ilike(pattern))
+        ).order_by(desc(FAQItem.id)).offset(offset)
+    else:
+        if before is not None:
+            statement = statement.where(FAQItem.id < before)
+        statement = statement.order_by(desc(FAQItem.id))
+
+    items = (await db.exec(statement.limit(limit + 1))).all()
+    return items[:limit], len(items) > limit
+
+
+async def list_categories(db: AsyncSession) -> List[str]:
+    return (await db.exec(select(FAQItem.category).distinct().order_by(FAQItem.category))).all()
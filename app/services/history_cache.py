@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+from app.core.metrics import CACHE_REQUESTS
+
+Turn = Tuple[str, str]  # (message utilisateur, réponse du bot)
+
+
+class SessionHistoryCache:
+    """Derniers échanges de chaque session, en mémoire (LRU sur les sessions).
+
+    Le cache est propre au worker : il est rempli depuis la base au premier accès
+    d'une session puis alimenté à chaque nouvelle interaction (write-through).
+    """
+
+    def __init__(self, max_sessions: int, max_turns: int):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, Deque[Turn]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[List[Turn]]:
+        """Historique du plus ancien au plus récent, ou None si la session n'est pas en cache."""
+        with self._lock:
+            turns = self._sessions.get(user_id)
+            if turns is None:
+                CACHE_REQUESTS.labels(cache="history", result="miss").inc()
+                return None
+            self._sessions.move_to_end(user_id)
+            CACHE_REQUESTS.labels(cache="history", result="hit").inc()
+            return list(turns)
+
+    def fill(self, user_id: str, turns: Sequence[Turn]):
+        """Charge l'historique lu en base pour une session absente du cache."""
+        with self._lock:
+            if user_id in self._sessions:
+                return
+            self._sessions[user_id] = deque(turns, maxlen=self.max_turns)
+            self._evict()
+
+    def append(self, user_id: str, message: str, response: str):
+        """Ajoute un échange ; sans effet si la session n'est pas chargée (lecture base au prochain accès)."""
+        with self._lock:
+            turns = self._sessions.get(user_id)
+            if turns is not None:
+                turns.append((message, response))
+                self._sessions.move_to_end(user_id)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def _evict(self):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
@@ -0,0 +1,147 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.metrics import (
+    PERSISTENCE_ERRORS,
+    WRITE_BATCH_SIZE,
+    WRITE_QUEUE_DEPTH,
+    WRITES_DROPPED,
+    timed,
+)
+from app.db.models import ChatInteraction
+from app.db.session import engine
+from app.services import stats
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionWriter:
+    """File d'écriture différée des ChatInteraction, insérées par lots depuis un thread dédié.
+
+    Un lot est écrit dès qu'il atteint `batch_size` lignes ou que `flush_interval`
+    secondes se sont écoulées depuis sa première ligne, dans une seule transaction
+    et avec sa propre session.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int, enqueue_timeout: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.session_factory: Callable[[], Session] = lambda: Session(engine, expire_on_commit=False)
+        # Appelés avec chaque lot après commit, depuis le thread d'écriture
+        self.listeners: List[Callable[[List[ChatInteraction]], None]] = []
+        self._queue: "queue.Queue[ChatInteraction]" = queue.Queue(maxsize=queue_size)
+        self._flush_requested = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        WRITE_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="interaction-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Écrit tout ce qui est en attente puis arrête le thread."""
+        self.flush()
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    async def submit(self, interaction: ChatInteraction) -> bool:
+        """Met une interaction en file ; attend brièvement si la file est pleine, sinon l'abandonne."""
+        self.start()
+        try:
+            self._queue.put_nowait(interaction)
+            return True
+        except queue.Full:
+            pass
+        try:
+            # Contre-pression : la requête patiente (hors boucle d'événements) que la file se vide
+            await run_in_threadpool(self._queue.put, interaction, True, self.enqueue_timeout)
+            return True
+        except queue.Full:
+            WRITES_DROPPED.inc()
+            logger.warning("File d'écriture pleine, interaction abandonnée")
+            return False
+
+    def flush(self):
+        """Bloque jusqu'à ce que toutes les interactions en file soient écrites."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._flush_requested.set()
+        try:
+            self._queue.join()
+        finally:
+            self._flush_requested.clear()
+
+    async def flush_async(self):
+        if self._queue.unfinished_tasks:
+            await run_in_threadpool(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    if self._flush_requested.is_set():
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(self._queue.get(timeout=min(remaining, 0.02)))
+                except queue.Empty:
+                    if self._flush_requested.is_set():
+                        break
+
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[ChatInteraction]):
+        try:
+            with timed("persistence"), self.session_factory() as db:
+                db.add_all(batch)
+                # Statistiques du dashboard mises à jour dans la même transaction
+                stats.apply_deltas(db, stats.aggregate(batch))
+                db.commit()
+            WRITE_BATCH_SIZE.observe(len(batch))
+        except Exception as e:
+            PERSISTENCE_ERRORS.inc(len(batch))
+            logger.error(f"Erreur sauvegarde historique ({len(batch)} interactions): {e}")
+            return
+        for listener in self.listeners:
+            try:
+                listener(batch)
+            except Exception as e:
+                logger.error(f"Erreur notification écriture: {e}")
+
+
+interaction_writer = InteractionWriter(
+    batch_size=settings.WRITE_BATCH_SIZE,
+    flush_interval=settings.WRITE_FLUSH_INTERVAL_MS / 1000,
+    queue_size=settings.WRITE_QUEUE_SIZE,
+    enqueue_timeout=settings.WRITE_ENQUEUE_TIMEOUT,
+)
@@ -0,0 +1,31 @@
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+
+from app.db.models import JobLease
+
+# Identifiant du worker courant (plusieurs hôtes peuvent partager la base)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(engine: Engine, name: str, ttl_seconds: float, holder: str = WORKER_ID) -> bool:
+    """Prend ou prolonge le bail `name` ; False si un autre worker le détient encore.
+
+    Un seul upsert conditionnel : deux workers ne peuvent pas l'obtenir en même temps,
+    et le bail d'un worker arrêté est repris après expiration.
+    """
+    now = datetime.utcnow()
+    insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    statement = insert(JobLease).values(name=name, holder=holder, expires_at=now + timedelta(seconds=ttl_seconds))
+    statement = statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"holder": statement.excluded.holder, "expires_at": statement.excluded.expires_at},
+        where=or_(JobLease.holder == holder, JobLease.expires_at < now),
+    )
+    with engine.begin() as conn:
+        return conn.execute(statement).rowcount == 1
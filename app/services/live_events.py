@@ -0,0 +1,111 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from app.db.models import ChatInteraction
+from app.services import stats
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardBroadcaster:
+    """Diffusion en direct des écritures d'interactions vers les dashboards ouverts.
+
+    Le thread d'écriture publie chaque lot une seule fois ; l'événement est calculé
+    puis recopié dans la file de chaque abonné sur la boucle d'événements. Un abonné
+    trop lent perd les événements les plus anciens et reçoit un `resync`.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def publish_batch(self, batch: List[ChatInteraction]):
+        """Appelé par le thread d'écriture après commit ; sans abonné, rien n'est calculé."""
+        with self._lock:
+            loop = self._loop if self._subscribers else None
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._fan_out, self.batch_events(batch))
+        except RuntimeError:
+            pass  # Boucle arrêtée entre-temps
+
+    @staticmethod
+    def batch_events(batch: List[ChatInteraction]) -> List[Dict]:
+        """Delta agrégé du lot puis une entrée par nouvelle question manquée."""
+        providers: Dict[str, int] = defaultdict(int)
+        days: Dict[str, List] = defaultdict(lambda: [0, 0.0, 0])
+        for interaction in batch:
+            providers[interaction.provider] += 1
+            day = days[stats.bucket_start(interaction.timestamp, "day").date().isoformat()]
+            day[0] += 1
+            day[1] += interaction.confidence
+            day[2] += int(stats.is_missed(interaction))
+        events = [{
+            "event": "stats",
+            "data": {
+                "messages": len(batch),
+                "confidence_sum": sum(i.confidence for i in batch),
+                "missed": sum(day[2] for day in days.values()),
+                "providers": providers,
+                "days": {
+                    day: {"messages": m, "confidence_sum": c, "missed": missed}
+                    for day, (m, c, missed) in days.items()
+                },
+            },
+        }]
+        events += [
+            {
+                "event": "missed",
+                "data": {
+                    "id": i.id,
+                    "timestamp": i.timestamp.isoformat(),
+                    "message": i.message,
+                    "response": i.response[:100],
+                    "confidence": i.confidence,
+                    "provider": i.provider,
+                },
+            }
+            for i in batch if stats.is_missed(i)
+        ]
+        return events
+
+    def _fan_out(self, events: List[Dict]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            for event in events:
+                if queue.full():
+                    # Abonné en retard : on vide sa file, le client recharge les totaux
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait({"event": "resync", "data": {}})
+                queue.put_nowait(event)
+
+
+def format_sse(event: Dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+dashboard_events = DashboardBroadcaster()
@@ -1,14 +1,21 @@
+import asyncio
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from app.core.config import settings
+from app.core.metrics import LLM_LATENCY, record_stage
 
 logger = logging.getLogger("uvicorn")
 
 class LLMProvider(ABC):
     @abstractmethod
-    async def generate(self, prompt: str) -> str:
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
         pass
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Réponse par fragments ; par défaut en un seul bloc."""
+        yield await self.generate(messages)
     
     @property
     def name(self) -> str:
@@ -16,16 +23,27 @@ class LLMProvider(ABC):
 
 class GroqProvider(LLMProvider):
     def __init__(self):
-        from groq import Groq
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        from groq import AsyncGroq
+        # Client asynchrone : l'appel peut être annulé quand le délai expire
+        self.client = AsyncGroq(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL)
         self.model = "llama-3.1-8b-instant"
 
-    async def generate(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        response = await self.client.chat.completions.create(
+            messages=messages,
             model=self.model,
         )
         return response.choices[0].message.content
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        chunks = await self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            stream=True,
+        )
+        async for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
     
     @property
     def name(self) -> str:
@@ -33,16 +51,26 @@ class GroqProvider(LLMProvider):
 
 class OpenAIProvider(LLMProvider):
     def __init__(self):
-        import openai
-        openai.api_key = settings.OPENAI_API_KEY
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
         self.model = "gpt-3.5-turbo"
 
-    async def generate(self, prompt: str) -> str:
-        response = openai.chat.completions.create(
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        response = await self.client.chat.completions.create(
             model=self.model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=messages,
         )
         return response.choices[0].message.content
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        chunks = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+        )
+        async for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
         
     @property
     def name(self) -> str:
@@ -57,22 +85,58 @@ class LLMOrchestrator:
         if settings.OPENAI_API_KEY:
             self.providers.append(OpenAIProvider())
 
-    async def generate_response(self, prompt: str) -> dict:
+    async def generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        timeout: Optional[float] = None,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> dict:
+        """Essaie les providers dans l'ordre, dans la limite de `timeout` secondes au total.
+
+        Avec `on_partial`, la réponse est générée en flux et le texte accumulé est
+        transmis après chaque fragment (il repart de zéro si un provider échoue en cours).
+        """
         errors = []
+        deadline = time.monotonic() + timeout if timeout is not None else None
         for provider in self.providers:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                break
+            start = time.perf_counter()
+            status = "success"
             try:
                 logger.info(f"Tentative de génération avec {provider.name}")
-                response = await provider.generate(prompt)
+                generation = self._collect(provider, messages, on_partial) if on_partial else provider.generate(messages)
+                response = await asyncio.wait_for(generation, timeout=remaining)
                 return {
                     "response": response,
                     "provider": provider.name,
                     "status": "success"
                 }
+            except asyncio.TimeoutError:
+                status = "timeout"
+                # L'appel en cours est annulé par wait_for, inutile d'essayer le suivant
+                logger.warning(f"Délai dépassé pour {provider.name}")
+                errors.append(f"{provider.name}: timeout")
+                break
             except Exception as e:
+                status = "error"
                 logger.error(f"Echec {provider.name}: {str(e)}")
                 errors.append(f"{provider.name}: {str(e)}")
                 continue
-        
+            finally:
+                duration = time.perf_counter() - start
+                LLM_LATENCY.labels(provider=provider.name, status=status).observe(duration)
+                record_stage(f"llm_{provider.name}", duration)
+
+        if deadline is not None and time.monotonic() >= deadline:
+            return {
+                "response": "Désolé, le délai de réponse est dépassé.",
+                "provider": "none",
+                "status": "timeout",
+                "debug_errors": errors
+            }
+
         return {
             "response": "Désolé, nos services IA sont momentanément indisponibles.",
             "provider": "none",
@@ -80,6 +144,14 @@ class LLMOrchestrator:
             "debug_errors": errors
         }
 
+    @staticmethod
+    async def _collect(provider: LLMProvider, messages: List[Dict[str, str]], on_partial) -> str:
+        text = ""
+        async for fragment in provider.stream(messages):
+            text += fragment
+            await on_partial(text)
+        return text
+
     def get_status(self) -> Dict:
         """Retourne le statut des providers pour le frontend."""
         if not self.providers:
@@ -0,0 +1,103 @@
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class InMemoryCollection:
+    """Sous-ensemble de l'API Collection de Chroma, en mémoire (similarité cosinus, recherche exacte)."""
+
+    def __init__(self, name: str, metadata: Optional[Dict] = None):
+        self.name = name
+        self.metadata = metadata or {}
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        documents = documents or [""] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        with self._lock:
+            if not self._ids:
+                self._vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+            new_rows = []
+            for i, item_id in enumerate(ids):
+                position = self._index.get(item_id)
+                if position is None:
+                    self._index[item_id] = len(self._ids)
+                    self._ids.append(item_id)
+                    self._documents.append(documents[i])
+                    self._metadatas.append(metadatas[i])
+                    new_rows.append(vectors[i])
+                else:
+                    self._vectors[position] = vectors[i]
+                    self._documents[position] = documents[i]
+                    self._metadatas[position] = metadatas[i]
+            if new_rows:
+                self._vectors = np.vstack([self._vectors, np.stack(new_rows)])
+
+    def update(self, ids, metadatas=None, embeddings=None, documents=None):
+        with self._lock:
+            for i, item_id in enumerate(ids):
+                position = self._index.get(item_id)
+                if position is None:
+                    continue
+                if metadatas is not None:
+                    self._metadatas[position] = metadatas[i]
+                if documents is not None:
+                    self._documents[position] = documents[i]
+                if embeddings is not None:
+                    self._vectors[position] = self._normalize(np.asarray([embeddings[i]], dtype=np.float32))[0]
+
+    def query(self, query_embeddings, n_results: int = 10, include=("metadatas", "documents", "distances")) -> Dict:
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        result = {"ids": [], "distances": [], "metadatas": [], "documents": []}
+        with self._lock:
+            if not self._ids:
+                return {key: [[] for _ in queries] for key in result if key == "ids" or key in include}
+            scores = queries @ self._vectors.T
+            k = min(n_results, len(self._ids))
+            for row in scores:
+                top = np.argpartition(-row, k - 1)[:k]
+                top = top[np.argsort(-row[top])]
+                result["ids"].append([self._ids[i] for i in top])
+                result["distances"].append([float(1 - row[i]) for i in top])
+                result["metadatas"].append([self._metadatas[i] for i in top])
+                result["documents"].append([self._documents[i] for i in top])
+        # Comme Chroma : les ids toujours, le reste seulement si demandé
+        return {key: value for key, value in result.items() if key == "ids" or key in include}
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class InMemoryVectorClient:
+    """Remplaçant local de chromadb.HttpClient (développement, benchmarks)."""
+
+    def __init__(self):
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def create_collection(self, name: str, metadata: Optional[Dict] = None) -> InMemoryCollection:
+        if name in self._collections:
+            raise ValueError(f"Collection {name} existe déjà")
+        self._collections[name] = InMemoryCollection(name, metadata)
+        return self._collections[name]
+
+    def get_collection(self, name: str) -> InMemoryCollection:
+        return self._collections[name]
+
+    def delete_collection(self, name: str):
+        if self._collections.pop(name, None) is None:
+            raise ValueError(f"Collection {name} inexistante")
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ChatInteraction, MissedClusterRecord
+from app.services.leases import acquire_lease
+
+logger = logging.getLogger(__name__)
+
+
+# Clusters publiés pour le dashboard (l'API admin en demande au plus 100)
+PUBLISHED_CLUSTERS = 100
+
+
+@dataclass
+class MissedCluster:
+    id: int  # id de l'interaction fondatrice : unique, identique d'un passage à l'autre
+    centroid: np.ndarray
+    interaction_ids: List[int] = field(default_factory=list)
+    messages: List[str] = field(default_factory=list)
+    timestamps: List[datetime] = field(default_factory=list)
+    last_seen: Optional[datetime] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.interaction_ids)
+
+
+class MissedQuestionClusterer:
+    """Regroupe les questions manquées par similarité, de façon incrémentale.
+
+    Chaque nouvelle question est rattachée au cluster dont le centroïde est le plus
+    proche (cosinus ≥ `threshold`), sinon elle ouvre un nouveau cluster. Seules les
+    interactions postérieures au dernier id traité sont encodées à chaque passage.
+
+    Un seul worker regroupe (bail « missed_clusters ») et publie le classement dans
+    MissedClusterRecord ; le dashboard de chaque worker lit cette table.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.clusters: Dict[int, MissedCluster] = {}
+        self.last_interaction_id = 0
+        self._lock = threading.Lock()
+
+    def add(self, interactions: List[ChatInteraction], embeddings: np.ndarray):
+        """Affecte des interactions (embeddings normalisés, une ligne par interaction)."""
+        with self._lock:
+            ids = list(self.clusters)
+            centroids = np.stack([self.clusters[i].centroid for i in ids]) if ids else np.empty((0, embeddings.shape[1]))
+            for interaction, vector in zip(interactions, embeddings):
+                best = -1
+                if len(ids):
+                    scores = centroids @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] < self.threshold:
+                        best = -1
+                if best == -1:
+                    cluster = MissedCluster(id=interaction.id, centroid=vector.copy())
+                    self.clusters[cluster.id] = cluster
+                    ids.append(cluster.id)
+                    centroids = np.vstack([centroids, vector])
+                else:
+                    cluster = self.clusters[ids[best]]
+                    # Moyenne glissante puis renormalisation du centroïde
+                    centroid = cluster.centroid * cluster.size + vector
+                    cluster.centroid = centroid / np.linalg.norm(centroid)
+                    centroids[best] = cluster.centroid
+                cluster.interaction_ids.append(interaction.id)
+                cluster.messages.append(interaction.message)
+                cluster.timestamps.append(interaction.timestamp)
+                cluster.last_seen = interaction.timestamp
+                self.last_interaction_id = max(self.last_interaction_id, interaction.id)
+
+    def evict(self, since: datetime):
+        """Oublie les questions antérieures à `since`, et les clusters qui n'en ont plus."""
+        with self._lock:
+            for cluster_id, cluster in list(self.clusters.items()):
+                kept = [i for i, timestamp in enumerate(cluster.timestamps) if timestamp >= since]
+                if not kept:
+                    del self.clusters[cluster_id]
+                elif len(kept) < cluster.size:
+                    cluster.interaction_ids = [cluster.interaction_ids[i] for i in kept]
+                    cluster.messages = [cluster.messages[i] for i in kept]
+                    cluster.timestamps = [cluster.timestamps[i] for i in kept]
+
+    def reset(self):
+        with self._lock:
+            self.clusters.clear()
+            self.last_interaction_id = 0
+
+    def refresh(self, engine: Engine, model, batch_size: int = 256) -> int:
+        """Encode par lots les nouvelles questions manquées et les rattache aux clusters."""
+        since = datetime.utcnow() - timedelta(days=settings.CLUSTER_WINDOW_DAYS)
+        self.evict(since)
+        total = 0
+        with Session(engine) as db:
+            while True:
+                rows = db.exec(
+                    select(ChatInteraction)
+                    .where(ChatInteraction.id > self.last_interaction_id)
+                    .where(ChatInteraction.timestamp >= since)
+                    .where(ChatInteraction.confidence < settings.CONFIDENCE_THRESHOLD)
+                    .where(ChatInteraction.provider != "static_rule")
+                    .order_by(ChatInteraction.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                embeddings = model.encode(
+                    [row.message for row in rows],
+                    batch_size=64,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                )
+                self.add(rows, np.asarray(embeddings, dtype=np.float32))
+                total += len(rows)
+        return total
+
+    def top(self, limit: int = 20) -> List[Dict]:
+        """Clusters classés par fréquence, avec leur question représentative."""
+        with self._lock:
+            ranked = sorted(self.clusters.values(), key=lambda c: (c.size, c.last_seen), reverse=True)
+            return [self._serialize(c) for c in ranked[:limit]]
+
+    def resolve(self, cluster_id: int):
+        """Retire un cluster transformé en FAQ (ses questions ne reviendront pas)."""
+        with self._lock:
+            self.clusters.pop(cluster_id, None)
+
+    def publish(self, engine: Engine, limit: int = PUBLISHED_CLUSTERS):
+        """Remplace le classement publié ; les clusters marqués résolus entre-temps sont retirés."""
+        with Session(engine) as db:
+            # Écriture d'abord : le verrou est pris avant de relire les résolutions
+            db.exec(delete(MissedClusterRecord).where(MissedClusterRecord.resolved.is_(False)))
+            resolved = db.exec(select(MissedClusterRecord.id)).all()
+            for cluster_id in resolved:
+                self.resolve(cluster_id)
+            db.exec(delete(MissedClusterRecord))
+            for cluster in self.top(limit):
+                db.add(MissedClusterRecord(
+                    id=cluster["id"],
+                    size=cluster["size"],
+                    representative=cluster["representative"],
+                    examples=cluster["examples"],
+                    interaction_ids=cluster["interaction_ids"],
+                    last_seen=cluster["last_seen"],
+                ))
+            db.commit()
+
+    @staticmethod
+    def _serialize(cluster: MissedCluster) -> Dict:
+        # Représentant : la formulation la plus fréquente, à défaut la plus récente
+        counts: Dict[str, int] = {}
+        for message in cluster.messages:
+            counts[message] = counts.get(message, 0) + 1
+        representative = max(reversed(cluster.messages), key=lambda m: counts[m])
+        return {
+            "id": cluster.id,
+            "size": cluster.size,
+            "representative": representative,
+            "examples": list(dict.fromkeys(reversed(cluster.messages)))[:5],
+            "interaction_ids": cluster.interaction_ids[-50:],
+            "last_seen": cluster.last_seen,
+        }
+
+
+def _record_dict(record: MissedClusterRecord) -> Dict:
+    return {
+        "id": record.id,
+        "size": record.size,
+        "representative": record.representative,
+        "examples": record.examples,
+        "interaction_ids": record.interaction_ids,
+        "last_seen": record.last_seen.isoformat() if record.last_seen else None,
+    }
+
+
+async def top_clusters(db: AsyncSession, limit: int = 20) -> List[Dict]:
+    """Classement publié, les clusters les plus fréquents d'abord."""
+    records = (await db.exec(
+        select(MissedClusterRecord)
+        .where(MissedClusterRecord.resolved.is_(False))
+        .order_by(MissedClusterRecord.size.desc(), MissedClusterRecord.last_seen.desc())
+        .limit(limit)
+    )).all()
+    return [_record_dict(record) for record in records]
+
+
+async def get_cluster(db: AsyncSession, cluster_id: int) -> Optional[MissedClusterRecord]:
+    record = await db.get(MissedClusterRecord, cluster_id)
+    return record if record and not record.resolved else None
+
+
+def _cluster_pass(engine: Engine, clusterer: "MissedQuestionClusterer", model, ttl: float) -> int:
+    if not acquire_lease(engine, "missed_clusters", ttl):
+        # Un autre worker regroupe : repartir de zéro si le bail revient ici
+        clusterer.reset()
+        return 0
+    added = clusterer.refresh(engine, model)
+    # Le premier passage (fenêtre complète) a pu dépasser le bail
+    if acquire_lease(engine, "missed_clusters", ttl):
+        clusterer.publish(engine)
+    return added
+
+
+async def clustering_loop(engine: Engine, clusterer: "MissedQuestionClusterer"):
+    """Tâche de fond : intègre régulièrement les nouvelles questions manquées."""
+    from app.services.rag_engine import RAGService
+
+    interval = settings.CLUSTER_INTERVAL_SECONDS
+    while True:
+        try:
+            added = await run_in_threadpool(_cluster_pass, engine, clusterer, RAGService().model, 3 * interval)
+            if added:
+                logger.info(f"{added} questions manquées regroupées ({len(clusterer.clusters)} clusters)")
+        except Exception as e:
+            logger.error(f"Erreur clustering: {e}")
+        await asyncio.sleep(interval)
+
+
+missed_clusterer = MissedQuestionClusterer(settings.CLUSTER_SIMILARITY_THRESHOLD)
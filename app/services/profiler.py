@@ -0,0 +1,55 @@
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List
+
+
+def _collapse(frame) -> str:
+    """Pile d'appels au format « collapsed » (racine;...;feuille) de flamegraph.pl / speedscope."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def sample_cpu(seconds: float, interval: float = 0.005) -> str:
+    """Échantillonne les piles de tous les threads du worker pendant `seconds`.
+
+    Bloquant : à exécuter dans un thread séparé pour ne pas figer la boucle d'événements.
+    """
+    own_ident = threading.get_ident()
+    stacks: Counter = Counter()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for ident, frame in sys._current_frames().items():
+            if ident != own_ident:
+                stacks[_collapse(frame)] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+
+def start_memory_trace() -> bool:
+    """Démarre tracemalloc si nécessaire ; retourne True si c'est nous qui l'avons démarré."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(25)
+    return True
+
+
+def diff_memory_snapshots(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, top: int = 50) -> str:
+    """Top des allocations apparues entre deux snapshots, regroupées par ligne."""
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    lines: List[str] = [f"# Top {top} des différences d'allocation (taille, nombre de blocs)"]
+    for stat in stats[:top]:
+        lines.append(str(stat))
+    total = sum(stat.size_diff for stat in stats)
+    lines.append(f"# Total : {total / 1024:.1f} KiB")
+    return "\n".join(lines)
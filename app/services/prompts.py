@@ -0,0 +1,36 @@
+from typing import Dict, List, Sequence, Tuple
+
+# Message système statique : identique octet pour octet d'une requête à l'autre
+# afin que le cache de préfixe des providers (Groq/OpenAI) puisse s'appliquer.
+SYSTEM_PROMPT = """Tu es un assistant support client utile et précis.
+
+Chaque question de l'utilisateur est précédée d'un CONTEXTE FAQ (peut être vide ou peu pertinent) avec son score de similarité.
+
+INSTRUCTIONS :
+1. Utilise le CONTEXTE FAQ en priorité s'il semble répondre à la question.
+2. Si le contexte est vide ou hors-sujet, utilise tes connaissances.
+3. Réponds toujours poliment et en français."""
+
+USER_TEMPLATE = """CONTEXTE FAQ (score={confidence:.2f}) :
+"{context}"
+
+QUESTION :
+{message}"""
+
+
+def build_messages(
+    message: str,
+    history: Sequence[Tuple[str, str]],
+    context_faq: str = "",
+    confidence: float = 0.0,
+) -> List[Dict[str, str]]:
+    """Construit la conversation : système stable, historique, puis contexte dynamique."""
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for user_message, bot_response in history:
+        messages.append({"role": "user", "content": user_message})
+        messages.append({"role": "assistant", "content": bot_response})
+    messages.append({
+        "role": "user",
+        "content": USER_TEMPLATE.format(confidence=confidence, context=context_faq, message=message),
+    })
+    return messages
@@ -1,11 +1,15 @@
 import logging
 import re
-import chromadb
-from typing import Dict
+from typing import Dict, List, Optional
 from sentence_transformers import SentenceTransformer
 from sqlmodel import Session, select
 from app.core.config import settings
+from app.core.metrics import CASCADE_DECISIONS, REINDEX_DURATION, timed
 from app.db.models import FAQItem
+from app.services.answer_store import AnswerStore
+from app.services.embedding_tuning import apply_tuning, load_tuning, truncate_layers
+from app.services.memory_vector_store import InMemoryVectorClient
+from app.services.reindex_jobs import index_lock
 
 logger = logging.getLogger(__name__)
 
@@ -25,60 +29,122 @@ class RAGService:
         # Chargement du modèle d'embeddings
         logger.info(f"Chargement du modèle {settings.EMBEDDING_MODEL}")
         self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        self.tuning = load_tuning()
+        apply_tuning(self.model, self.tuning)
 
-        # Connexion à ChromaDB (HTTP / Docker)
-        logger.info(
-            f"Connexion ChromaDB {settings.CHROMA_DB_HOST}:{settings.CHROMA_DB_PORT}"
-        )
-        self.chroma_client = chromadb.HttpClient(
-            host=settings.CHROMA_DB_HOST,
-            port=settings.CHROMA_DB_PORT,
-        )
+        # Premier étage de la cascade (optionnel) : encodeur rapide et index dédié
+        self.fast_model = None
+        if settings.CASCADE_MODEL or settings.CASCADE_LAYERS:
+            self.fast_model = SentenceTransformer(settings.CASCADE_MODEL or settings.EMBEDDING_MODEL)
+            if not settings.CASCADE_MODEL:
+                truncate_layers(self.fast_model, settings.CASCADE_LAYERS)
+            apply_tuning(self.fast_model, self.tuning)
+        self.fast_collection = None
+        # Contenu des FAQ servi localement : l'index vectoriel ne stocke que ids et embeddings
+        self.answers = AnswerStore()
+
+        if settings.VECTOR_BACKEND == "memory":
+            # Index en mémoire du processus (développement, benchmarks)
+            logger.info("Index vectoriel en mémoire")
+            self.chroma_client = InMemoryVectorClient()
+        else:
+            # Connexion à ChromaDB (HTTP / Docker)
+            logger.info(
+                f"Connexion ChromaDB {settings.CHROMA_DB_HOST}:{settings.CHROMA_DB_PORT}"
+            )
+            import chromadb
+
+            self.chroma_client = chromadb.HttpClient(
+                host=settings.CHROMA_DB_HOST,
+                port=settings.CHROMA_DB_PORT,
+            )
         self.collection = None
 
     def reload_from_db(self, db: Session):
         """Synchronise entièrement la base SQL vers ChromaDB."""
+        with index_lock:
+            self.reload_from_items(db.exec(select(FAQItem)).all())
+
+    def reload_from_items(self, faq_items: List[FAQItem]):
+        """Reconstruit la collection ChromaDB à partir des FAQ fournies."""
+        with index_lock:
+            self._reload(faq_items)
+
+    @REINDEX_DURATION.time()
+    def _reload(self, faq_items: List[FAQItem]):
         logger.info("Synchronisation SQL → ChromaDB")
+        if not faq_items:
+            logger.warning("Aucune FAQ en base")
 
-        faq_items = db.exec(select(FAQItem)).all()
+        name = settings.CHROMA_COLLECTION_NAME
+        collection = self._build_collection(name, self.collection, self.model, faq_items)
+        fast_collection = None
+        if self.fast_model is not None:
+            fast_collection = self._build_collection(f"{name}_fast", self.fast_collection, self.fast_model, faq_items)
 
-        # Reset de la collection
+        answers = AnswerStore(faq_items, version=self.answers.version + 1)
+
+        # Bascule des index et de la table des réponses ensemble, puis suppression des anciennes collections
+        previous = [self.collection, self.fast_collection]
+        self.collection, self.fast_collection, self.answers = collection, fast_collection, answers
+        for old, new in zip(previous, (collection, fast_collection)):
+            if old is not None and (new is None or old.name != new.name):
+                try:
+                    self.chroma_client.delete_collection(old.name)
+                except Exception as e:
+                    logger.warning(f"Ancienne collection {old.name} non supprimée: {e}")
+
+        logger.info(f"{len(faq_items)} FAQ indexées")
+
+    def _build_collection(self, name: str, current, model, faq_items: List[FAQItem]):
+        """Construit l'index dans la collection de réserve : l'index courant reste interrogé jusqu'à la bascule."""
+        target = f"{name}_next" if current is not None and current.name == name else name
         try:
-            self.chroma_client.delete_collection(settings.CHROMA_COLLECTION_NAME)
+            self.chroma_client.delete_collection(target)
         except Exception:
             pass  # Collection inexistante
 
-        self.collection = self.chroma_client.create_collection(
-            name=settings.CHROMA_COLLECTION_NAME,
+        collection = self.chroma_client.create_collection(
+            name=target,
             metadata={"hnsw:space": "cosine"},
         )
+        if faq_items:
+            embeddings = model.encode(
+                [item.question for item in faq_items], batch_size=self.tuning.batch_size, convert_to_numpy=True
+            ).tolist()
+            collection.add(ids=[str(item.id) for item in faq_items], embeddings=embeddings)
+        return collection
 
-        if not faq_items:
-            logger.warning("Aucune FAQ en base")
-            return
-
-        # Préparation des données
-        ids = [str(item.id) for item in faq_items]
-        documents = [item.question for item in faq_items]
-        metadatas = [
-            {"answer": item.answer, "original_question": item.question}
-            for item in faq_items
-        ]
-
-        # Génération des embeddings
-        embeddings = self.model.encode(
-            documents, convert_to_numpy=True
-        ).tolist()
-
-        # Insertion dans Chroma
-        self.collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-        )
+    def update_items(self, encode_items: List[FAQItem], metadata_items: List[FAQItem] = ()) -> bool:
+        """Mise à jour partielle de l'index : n'encode que les questions nouvelles ou modifiées.
+
+        Retourne False si l'index n'existe pas encore (une reconstruction complète est alors nécessaire).
+        """
+        with index_lock:
+            return self._update(encode_items, metadata_items)
+
+    def _update(self, encode_items: List[FAQItem], metadata_items: List[FAQItem]) -> bool:
+        if self.collection is None:
+            return False
+        # Table d'abord : un id visible dans l'index a toujours son contenu.
+        # Réponse ou catégorie modifiée : seule la table change, l'embedding reste valable
+        self.answers.upsert([*encode_items, *metadata_items])
+        indexes = [(self.model, self.collection)]
+        if self.fast_model is not None and self.fast_collection is not None:
+            indexes.append((self.fast_model, self.fast_collection))
+        if encode_items:
+            for model, collection in indexes:
+                embeddings = model.encode(
+                    [item.question for item in encode_items], batch_size=self.tuning.batch_size, convert_to_numpy=True
+                ).tolist()
+                collection.upsert(ids=[str(item.id) for item in encode_items], embeddings=embeddings)
+        logger.info(f"Index mis à jour : {len(encode_items)} encodées, {len(metadata_items)} réponses modifiées")
+        return True
 
-        logger.info(f"{len(ids)} FAQ indexées")
+    def remove_items(self, faq_ids: List[int]):
+        """Retire des FAQ de la table des réponses : plus servies, en attendant la reconstruction."""
+        with index_lock:
+            self.answers.remove(faq_ids)
 
     @staticmethod
     def normalize_query(query: str) -> str:
@@ -90,12 +156,10 @@ class RAGService:
         )
         return re.sub(r"\s+", " ", query).strip()
 
-    def search(self, query: str, threshold: float = 0.45) -> Dict:
-        """Recherche sémantique avec règles simples et seuil de similarité."""
-        clean_query = self.normalize_query(query)
+    @staticmethod
+    def _static_answer(clean_query: str) -> Optional[Dict]:
+        """Réponses statiques (salutations, remerciements, requêtes trop courtes)."""
         q_lower = clean_query.lower()
-
-        # Réponses statiques
         greetings = {"bonjour", "hello", "salut", "hi", "bonsoir", "coucou"}
         thanks = {"merci", "thanks", "gratitude"}
 
@@ -123,39 +187,89 @@ class RAGService:
                 "matched_question": None,
             }
 
-        if not self.collection:
+        return None
+
+    def search(self, query: str, threshold: float = 0.45) -> Dict:
+        """Recherche sémantique avec règles simples et seuil de similarité."""
+        with timed("normalize"):
+            clean_query = self.normalize_query(query)
+
+        with timed("rules"):
+            static_result = self._static_answer(clean_query)
+        if static_result:
+            return static_result
+
+        # Références locales : une reconstruction peut basculer l'index pendant la recherche
+        collection, answers = self.collection, self.answers
+        if not collection:
             return {"answer": None, "confidence": 0.0, "matched_question": None}
 
+        fast_collection = self.fast_collection
+        if fast_collection is not None:
+            decision, results = self._first_stage(fast_collection, clean_query)
+            CASCADE_DECISIONS.labels(decision=decision).inc()
+            if decision == "accept":
+                return self._result(results, answers, threshold)
+            if decision == "reject":
+                # Aucune FAQ proche, même approximativement : inutile d'encoder avec le modèle complet
+                return self._result(results, answers, float("inf"))
+
         # Vectorisation de la requête
-        query_vec = self.model.encode(
-            [clean_query], convert_to_numpy=True
-        ).tolist()
+        with timed("encode"):
+            query_vec = self.model.encode(
+                [clean_query], convert_to_numpy=True
+            ).tolist()
 
         # Recherche Top-1
-        results = self.collection.query(
-            query_embeddings=query_vec,
-            n_results=1,
-        )
+        with timed("vector_query"):
+            results = collection.query(
+                query_embeddings=query_vec,
+                n_results=1,
+                include=["distances"],
+            )
+
+        return self._result(results, answers, threshold)
 
+    def _first_stage(self, collection, clean_query: str):
+        """Classement par l'encodeur rapide : accept, reject ou second_stage si ambigu."""
+        with timed("cascade_encode"):
+            query_vec = self.fast_model.encode([clean_query], convert_to_numpy=True).tolist()
+        with timed("cascade_query"):
+            results = collection.query(query_embeddings=query_vec, n_results=2, include=["distances"])
+
+        similarities = [1 - d for d in results["distances"][0]] if results["ids"] and results["ids"][0] else []
+        if not similarities or similarities[0] < settings.CASCADE_REJECT_SCORE:
+            return "reject", results
+        margin = similarities[0] - similarities[1] if len(similarities) > 1 else similarities[0]
+        if similarities[0] >= settings.CASCADE_ACCEPT_SCORE and margin >= settings.CASCADE_MIN_MARGIN:
+            return "accept", results
+        return "second_stage", results
+
+    @staticmethod
+    def _result(results: Dict, answers: AnswerStore, threshold: float) -> Dict:
         if not results["ids"] or not results["ids"][0]:
             return {"answer": None, "confidence": 0.0, "matched_question": None}
 
         # Similarité cosinus
         distance = results["distances"][0][0]
         similarity = 1 - distance
-        metadata = results["metadatas"][0][0]
+        faq_id = results["ids"][0][0]
+        entry = answers.get(faq_id)
+        if entry is None:
+            # FAQ supprimée, pas encore retirée de l'index
+            return {"answer": None, "confidence": 0.0, "matched_question": None}
 
         if similarity >= threshold:
             return {
-                "answer": metadata["answer"],
+                "answer": entry.answer,
                 "confidence": similarity,
-                "matched_question": metadata["original_question"],
-                "faq_id": results["ids"][0][0],
+                "matched_question": entry.question,
+                "faq_id": faq_id,
             }
 
         # Fallback sous le seuil
         return {
             "answer": None,
             "confidence": 0.0,
-            "matched_question": metadata["original_question"],
+            "matched_question": entry.question,
         }
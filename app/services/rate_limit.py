@@ -0,0 +1,207 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMITED
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # jetons par seconde
+    burst: int  # capacité du seau
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        """'20/minute' → 20 requêtes par minute, rafale de 20 ; '20/minute:5' → rafale de 5."""
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour)\s*(?::\s*(\d+))?\s*", spec)
+        if not match:
+            raise ValueError(f"Limite invalide : {spec!r} (attendu 'N/second|minute|hour[:rafale]')")
+        count, period, burst = match.groups()
+        return cls(rate=int(count) / PERIODS[period], burst=int(burst or count))
+
+
+class MemoryBucketStore:
+    """Seaux à jetons en mémoire du worker, LRU borné.
+
+    Un seau inactif assez longtemps pour s'être rempli équivaut à un seau neuf :
+    il est supprimé au passage.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # clé → (jetons, dernière mise à jour, instant où le seau sera plein)
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit) -> float:
+        """Consomme un jeton ; retourne 0 si accordé, sinon l'attente en secondes."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.pop(key, (limit.burst, now, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / limit.rate
+            self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+            self._expire(now)
+            return wait
+
+    def _expire(self, now: float):
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        # Les moins récemment utilisés sont en tête : on s'arrête au premier seau non plein
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now:
+                break
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """Seaux partagés entre workers dans un fichier SQLite (une transaction IMMEDIATE par prise)."""
+
+    def __init__(self, path: str, max_keys: int):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._takes = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_bucket "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL DEFAULT 0)"
+            )
+            # Fichier créé avant full_at : ses seaux seront considérés pleins au prochain nettoyage
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(rate_limit_bucket)")}
+            if "full_at" not in columns:
+                conn.execute("ALTER TABLE rate_limit_bucket ADD COLUMN full_at REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_updated ON rate_limit_bucket(updated)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_full_at ON rate_limit_bucket(full_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, limit: Limit) -> float:
+        # Horloge murale : partagée entre processus, contrairement à monotonic()
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (limit.burst, now)
+            tokens = min(limit.burst, tokens + max(now - updated, 0) * limit.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / limit.rate
+            # Instant où ce seau sera plein, d'après sa propre limite
+            full_at = now + (limit.burst - tokens) / limit.rate
+            conn.execute(
+                "INSERT INTO rate_limit_bucket(key, tokens, updated, full_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, "
+                "full_at = excluded.full_at",
+                (key, tokens, now, full_at),
+            )
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                self._expire(conn, now)
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _expire(self, conn: sqlite3.Connection, now: float):
+        # Un seau plein équivaut à un seau neuf, quelle que soit sa limite
+        conn.execute("DELETE FROM rate_limit_bucket WHERE full_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM rate_limit_bucket WHERE key IN "
+            "(SELECT key FROM rate_limit_bucket ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM rate_limit_bucket")
+
+
+class RateLimiter:
+    """Limites par route, appliquées par session (`user_id`) et par adresse IP."""
+
+    def __init__(self, store, per_session: Dict[str, str], per_ip: Dict[str, str]):
+        self.store = store
+        self.limits = {
+            "session": {route: Limit.parse(spec) for route, spec in per_session.items()},
+            "ip": {route: Limit.parse(spec) for route, spec in per_ip.items()},
+        }
+
+    def check(self, route: str, session_id: Optional[str], client_ip: Optional[str]) -> float:
+        """Consomme un jeton dans chaque seau concerné ; retourne l'attente (0 si autorisé)."""
+        for scope, key in (("session", session_id), ("ip", client_ip)):
+            limit = self.limits[scope].get(route)
+            if limit is None or not key:
+                continue
+            wait = self.store.take(f"{route}|{scope}|{key}", limit)
+            if wait > 0:
+                RATE_LIMITED.labels(route=route, scope=scope).inc()
+                return wait
+        return 0.0
+
+    async def retry_after(self, route: str, connection: HTTPConnection, session_id: Optional[str] = None) -> float:
+        """Attente imposée en secondes (0 si autorisé) ; `connection` : requête HTTP ou WebSocket."""
+        client_ip = connection.client.host if connection.client else None
+        if isinstance(self.store, SQLiteBucketStore):
+            return await run_in_threadpool(self.check, route, session_id, client_ip)
+        return self.check(route, session_id, client_ip)
+
+    async def enforce(self, route: str, request: Request, session_id: Optional[str] = None):
+        """Lève une 429 avec Retry-After si l'une des limites est dépassée."""
+        wait = await self.retry_after(route, request, session_id)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Trop de requêtes, veuillez patienter avant de réessayer.",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    def reset(self):
+        self.store.clear()
+
+
+def _build_store():
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBucketStore(settings.RATE_LIMIT_SQLITE_PATH, settings.RATE_LIMIT_MAX_KEYS)
+    return MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limiter = RateLimiter(
+    _build_store(),
+    per_session=settings.RATE_LIMIT_PER_SESSION,
+    per_ip=settings.RATE_LIMIT_PER_IP,
+)
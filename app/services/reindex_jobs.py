@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.models import FAQItem
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# Toute modification de l'index RAG (reconstruction + bascule, mise à jour partielle,
+# retrait) se fait sous ce verrou, lecture des FAQ comprise : une reconstruction ne
+# peut pas effacer un import ou un retrait concurrent
+index_lock = threading.RLock()
+
+
+@dataclass
+class ReindexJob:
+    id: int
+    requested_at: datetime
+    reasons: List[str] = field(default_factory=list)
+    status: str = "pending"  # pending → running → success | failed
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration: Optional[float] = None
+    faq_count: Optional[int] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "requests": len(self.reasons),
+            "reasons": sorted(set(self.reasons)),
+            "requested_at": self.requested_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration": self.duration,
+            "faq_count": self.faq_count,
+            "error": self.error,
+        }
+
+
+def _rebuild_index(faq_items: List[FAQItem]):
+    from app.services.rag_engine import RAGService
+
+    RAGService().reload_from_items(faq_items)
+
+
+class ReindexScheduler:
+    """Reconstructions de l'index regroupées et exécutées dans un thread dédié.
+
+    Chaque modification de la FAQ demande une reconstruction ; les demandes
+    rapprochées sont fusionnées en un seul job, lancé `debounce` secondes après la
+    dernière demande (au plus `max_delay` secondes après la première). L'index
+    courant reste servi pendant la reconstruction.
+    """
+
+    def __init__(self, debounce: float, max_delay: float, history: int = 20):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.session_factory: Callable[[], Session] = lambda: Session(engine)
+        self.rebuild: Callable[[List[FAQItem]], None] = _rebuild_index
+        self.jobs: "deque[ReindexJob]" = deque(maxlen=history)
+        self._pending: Optional[ReindexJob] = None
+        self._running: Optional[ReindexJob] = None
+        self._first_request = 0.0
+        self._last_request = 0.0
+        self._next_id = 1
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="reindex-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Arrête le thread ; une demande encore en attente est abandonnée (l'index est reconstruit au démarrage)."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def request(self, reason: str) -> ReindexJob:
+        """Demande une reconstruction, fusionnée avec la demande en attente s'il y en a une."""
+        self.start()
+        with self._condition:
+            now = time.monotonic()
+            if self._pending is None:
+                self._pending = ReindexJob(id=self._next_id, requested_at=datetime.utcnow())
+                self._next_id += 1
+                self.jobs.append(self._pending)
+                self._first_request = now
+            self._pending.reasons.append(reason)
+            self._last_request = now
+            self._condition.notify_all()
+            return self._pending
+
+    def status(self) -> Dict:
+        with self._condition:
+            finished = [job for job in self.jobs if job.status in ("success", "failed")]
+            return {
+                "indexing": self._pending is not None or self._running is not None,
+                "pending": self._pending.to_dict() if self._pending else None,
+                "running": self._running.to_dict() if self._running else None,
+                "last": finished[-1].to_dict() if finished else None,
+                "jobs": [job.to_dict() for job in reversed(self.jobs)],
+            }
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Bloque jusqu'à ce qu'aucun job ne soit en attente ni en cours."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending is None and self._running is None, timeout
+            )
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    if self._pending is not None:
+                        due = min(self._last_request + self.debounce, self._first_request + self.max_delay)
+                        remaining = due - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._stopping:
+                    return
+                job, self._pending, self._running = self._pending, None, self._pending
+                job.status = "running"
+                job.started_at = datetime.utcnow()
+
+            self._execute(job)
+
+            with self._condition:
+                self._running = None
+                self._condition.notify_all()
+
+    def _execute(self, job: ReindexJob):
+        start = time.perf_counter()
+        try:
+            with index_lock:
+                with self.session_factory() as db:
+                    faq_items = db.exec(select(FAQItem)).all()
+                self.rebuild(faq_items)
+            job.faq_count = len(faq_items)
+            job.status = "success"
+            logger.info(f"Réindexation #{job.id} : {len(job.reasons)} demandes, {len(faq_items)} FAQ")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Erreur réindexation #{job.id}: {e}")
+        finally:
+            job.duration = time.perf_counter() - start
+            job.finished_at = datetime.utcnow()
+
+
+reindex_scheduler = ReindexScheduler(
+    debounce=settings.REINDEX_DEBOUNCE_SECONDS,
+    max_delay=settings.REINDEX_MAX_DELAY_SECONDS,
+)
@@ -0,0 +1,201 @@
+import asyncio
+import io
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import zstandard
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, delete, desc, select
+
+from app.core.config import settings
+from app.core.metrics import RETENTION_ARCHIVED
+from app.db.models import ChatInteraction
+from app.services.leases import acquire_lease
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = ".ndjson.zst"
+
+
+def ensure_indexes(engine: Engine):
+    """Crée les index déclarés sur les tables existantes (create_all ne le fait pas)."""
+    for index in ChatInteraction.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def _archive_record(i: ChatInteraction) -> Dict:
+    return {
+        "id": i.id,
+        "user_session_id": i.user_session_id,
+        "message": i.message,
+        "response": i.response,
+        "confidence": i.confidence,
+        "provider": i.provider,
+        "is_helpful": i.is_helpful,
+        "timestamp": i.timestamp.isoformat(),
+    }
+
+
+def _write_partition(archive_dir: Path, day: date, name: str, rows: List[ChatInteraction]):
+    """Écrit un fichier NDJSON compressé zstd dans la partition du jour (écriture atomique)."""
+    partition = archive_dir / day.isoformat()
+    partition.mkdir(parents=True, exist_ok=True)
+    target = partition / f"{name}{ARCHIVE_SUFFIX}"
+    tmp = target.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        with zstandard.ZstdCompressor(level=10).stream_writer(f, closefd=False) as writer:
+            for row in rows:
+                writer.write((json.dumps(_archive_record(row), ensure_ascii=False) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+
+
+def archive_old_interactions(
+    engine: Engine,
+    archive_dir: Path,
+    max_age_days: int = 0,
+    max_rows: int = 0,
+    chunk_size: int = 5000,
+) -> int:
+    """Déplace les interactions trop anciennes (ou au-delà de `max_rows`) vers les archives.
+
+    Chaque lot est d'abord écrit sur disque puis supprimé de la table : en cas d'arrêt
+    brutal, une ligne peut être archivée deux fois mais jamais perdue.
+    """
+    with Session(engine) as db:
+        conditions = []
+        if max_age_days:
+            conditions.append(ChatInteraction.timestamp < datetime.utcnow() - timedelta(days=max_age_days))
+        if max_rows:
+            id_cap = db.exec(
+                select(ChatInteraction.id).order_by(desc(ChatInteraction.id)).offset(max_rows).limit(1)
+            ).first()
+            if id_cap is not None:
+                conditions.append(ChatInteraction.id <= id_cap)
+        if not conditions:
+            return 0
+
+        run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        total = 0
+        last_id = 0
+        while True:
+            rows = db.exec(
+                select(ChatInteraction)
+                .where(or_(*conditions), ChatInteraction.id > last_id)
+                .order_by(ChatInteraction.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+
+            partitions = defaultdict(list)
+            for row in rows:
+                partitions[row.timestamp.date()].append(row)
+            for day, items in partitions.items():
+                _write_partition(archive_dir, day, f"part-{run_id}-{items[0].id}", items)
+
+            ids = [row.id for row in rows]
+            last_id = ids[-1]
+            db.exec(delete(ChatInteraction).where(ChatInteraction.id.in_(ids)))
+            db.commit()
+            db.expunge_all()
+            total += len(ids)
+
+    RETENTION_ARCHIVED.inc(total)
+    return total
+
+
+def _part_order(path: Path):
+    """Clé de tri d'un fichier `part-{run_id}-{premier id}` : ordre numérique des ids."""
+    run_id, _, first_id = path.name[: -len(ARCHIVE_SUFFIX)].removeprefix("part-").rpartition("-")
+    return (int(first_id), run_id) if first_id.isdigit() else (0, path.name)
+
+
+def read_archive(
+    archive_dir: Path,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_session_id: Optional[str] = None,
+) -> Iterator[Dict]:
+    """Relit les interactions archivées entre `start` et `end` inclus, dans l'ordre chronologique."""
+    if not archive_dir.exists():
+        return
+    for partition in sorted(archive_dir.iterdir()):
+        try:
+            day = date.fromisoformat(partition.name)
+        except ValueError:
+            continue
+        if (start and day < start) or (end and day > end):
+            continue
+        for path in sorted(partition.glob(f"*{ARCHIVE_SUFFIX}"), key=_part_order):
+            with open(path, "rb") as f:
+                reader = zstandard.ZstdDecompressor().stream_reader(f)
+                for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                    record = json.loads(line)
+                    if user_session_id is None or record["user_session_id"] == user_session_id:
+                        yield record
+
+
+def enable_incremental_vacuum(engine: Engine) -> bool:
+    """Passe la base SQLite en auto_vacuum=INCREMENTAL ; True si la conversion a eu lieu.
+
+    Sur une base existante, VACUUM complet sous verrou exclusif : à lancer serveur arrêté
+    (scripts/init_db.py).
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            return False
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+    return True
+
+
+def incremental_vacuum(engine: Engine, pages: int = 2000):
+    """Rend au système l'espace libéré (SQLite en auto_vacuum=INCREMENTAL uniquement)."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            # Jamais de VACUUM complet pendant le service : il bloquerait toutes les écritures
+            logger.warning("auto_vacuum n'est pas INCREMENTAL : lancer scripts/init_db.py serveur arrêté")
+            return
+        conn.exec_driver_sql(f"PRAGMA incremental_vacuum({pages})")
+
+
+def run_retention(engine: Engine) -> int:
+    archived = archive_old_interactions(
+        engine,
+        Path(settings.ARCHIVE_DIR),
+        max_age_days=settings.RETENTION_DAYS,
+        max_rows=settings.RETENTION_MAX_ROWS,
+    )
+    if archived:
+        logger.info(f"{archived} interactions archivées")
+        incremental_vacuum(engine)
+    return archived
+
+
+async def retention_loop(engine: Engine):
+    """Tâche de fond : applique la politique de rétention à intervalle régulier.
+
+    Lancée dans chaque worker ; seul le détenteur du bail « retention » archive.
+    """
+    interval = settings.RETENTION_INTERVAL_HOURS * 3600
+    while True:
+        try:
+            # Bail sur deux intervalles : prolongé à chaque passage, repris si le worker s'arrête
+            if await run_in_threadpool(acquire_lease, engine, "retention", 2 * interval):
+                await run_in_threadpool(run_retention, engine)
+        except Exception as e:
+            logger.error(f"Erreur rétention: {e}")
+        await asyncio.sleep(interval)
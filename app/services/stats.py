@@ -0,0 +1,152 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ChatInteraction, JobLease, StatsBucket
+from app.services.leases import WORKER_ID
+
+GRANULARITIES = ("hour", "day")
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def is_missed(interaction: ChatInteraction) -> bool:
+    return interaction.confidence < settings.CONFIDENCE_THRESHOLD and interaction.provider != "static_rule"
+
+
+def aggregate(interactions: Iterable[ChatInteraction]) -> Dict[Tuple[str, datetime, str], List]:
+    """Agrège des interactions en deltas {(granularité, tranche, provider): [messages, somme conf, manquées]}."""
+    deltas: Dict[Tuple[str, datetime, str], List] = defaultdict(lambda: [0, 0.0, 0])
+    for i in interactions:
+        for granularity in GRANULARITIES:
+            delta = deltas[(granularity, bucket_start(i.timestamp, granularity), i.provider)]
+            delta[0] += 1
+            delta[1] += i.confidence
+            delta[2] += int(is_missed(i))
+    return deltas
+
+
+def apply_deltas(db: Session, deltas: Dict[Tuple[str, datetime, str], List]):
+    """Incrémente les tranches dans la transaction courante (upsert, sans relecture)."""
+    if not deltas:
+        return
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    rows = [
+        {
+            "granularity": granularity,
+            "bucket_start": start,
+            "provider": provider,
+            "messages": messages,
+            "confidence_sum": confidence_sum,
+            "missed": missed,
+        }
+        for (granularity, start, provider), (messages, confidence_sum, missed) in deltas.items()
+    ]
+    statement = insert(StatsBucket).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "provider"],
+        set_={
+            "messages": StatsBucket.messages + statement.excluded.messages,
+            "confidence_sum": StatsBucket.confidence_sum + statement.excluded.confidence_sum,
+            "missed": StatsBucket.missed + statement.excluded.missed,
+        },
+    )
+    db.exec(statement)
+
+
+def backfill_stats(db: Session, chunk_size: int = 5000) -> int:
+    """Construit les tranches depuis les interactions existantes si la table est vide.
+
+    Appelée au démarrage de chaque worker : un marqueur inséré dans la même transaction
+    verrouille l'opération, les autres workers l'ignorent une fois le marqueur posé.
+    """
+    db.add(JobLease(name="stats_backfill", holder=WORKER_ID, expires_at=datetime.max))
+    try:
+        db.flush()
+    except (IntegrityError, OperationalError):
+        # Déjà fait, ou en cours dans un autre worker (verrou d'écriture SQLite)
+        db.rollback()
+        return 0
+    if db.exec(select(StatsBucket).limit(1)).first() is not None:
+        db.commit()
+        return 0
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.exec(
+            select(ChatInteraction)
+            .where(ChatInteraction.id > last_id)
+            .order_by(ChatInteraction.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        apply_deltas(db, aggregate(rows))
+        last_id = rows[-1].id
+        total += len(rows)
+    db.commit()
+    return total
+
+
+async def get_summary(db: AsyncSession) -> Dict:
+    """Totaux globaux à partir des tranches journalières."""
+    messages, confidence_sum, missed = (await db.exec(
+        select(
+            func.coalesce(func.sum(StatsBucket.messages), 0),
+            func.coalesce(func.sum(StatsBucket.confidence_sum), 0.0),
+            func.coalesce(func.sum(StatsBucket.missed), 0),
+        ).where(StatsBucket.granularity == "day")
+    )).one()
+    return {
+        "total_messages": messages,
+        "avg_confidence": confidence_sum / messages if messages else 0.0,
+        "missed_questions_count": missed,
+    }
+
+
+async def get_provider_mix(db: AsyncSession, since: Optional[datetime] = None) -> Dict[str, int]:
+    statement = (
+        select(StatsBucket.provider, func.sum(StatsBucket.messages))
+        .where(StatsBucket.granularity == "day")
+        .group_by(StatsBucket.provider)
+    )
+    if since is not None:
+        statement = statement.where(StatsBucket.bucket_start >= bucket_start(since, "day"))
+    return {provider: count for provider, count in (await db.exec(statement)).all()}
+
+
+async def get_trend(db: AsyncSession, granularity: str = "day", periods: int = 14) -> List[Dict]:
+    """Série chronologique des `periods` dernières tranches (les tranches vides sont omises)."""
+    step = timedelta(days=1) if granularity == "day" else timedelta(hours=1)
+    since = bucket_start(datetime.utcnow(), granularity) - step * (periods - 1)
+    rows = (await db.exec(
+        select(
+            StatsBucket.bucket_start,
+            func.sum(StatsBucket.messages),
+            func.sum(StatsBucket.confidence_sum),
+            func.sum(StatsBucket.missed),
+        )
+        .where(StatsBucket.granularity == granularity, StatsBucket.bucket_start >= since)
+        .group_by(StatsBucket.bucket_start)
+        .order_by(StatsBucket.bucket_start)
+    )).all()
+    return [
+        {
+            "bucket_start": start.isoformat(),
+            "messages": messages,
+            "avg_confidence": confidence_sum / messages if messages else 0.0,
+            "missed": missed,
+        }
+        for start, messages, confidence_sum, missed in rows
+    ]
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import event, inspect
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+from app.db.models import User
+
+
+class VerifiedUserCache:
+    """Tokens déjà validés → utilisateur actif, pour `ttl` secondes (LRU borné).
+
+    Évite un aller-retour en base à chaque appel admin. Une entrée n'est jamais
+    servie au-delà de l'expiration du token ; toute modification ou suppression
+    d'un utilisateur vide ses entrées dans ce worker (les autres workers attendent
+    au plus `ttl` secondes).
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(token)
+                CACHE_REQUESTS.labels(cache="auth", result="hit").inc()
+                return entry[1]
+            if entry is not None:
+                del self._entries[token]
+            CACHE_REQUESTS.labels(cache="auth", result="miss").inc()
+            return None
+
+    def put(self, token: str, user: User, token_expires_at: Optional[float] = None):
+        """Mémorise une copie détachée de l'utilisateur (jamais au-delà de l'expiration du token)."""
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        snapshot = User(**user.model_dump())
+        with self._lock:
+            self._entries[token] = (expires_at, snapshot)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, email: str):
+        with self._lock:
+            for token in [t for t, (_, user) in self._entries.items() if user.email == email]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = VerifiedUserCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_modified_user(mapper, connection, target: User):
+    # Désactivation, changement de mot de passe ou suppression : revalidation en base
+    for email in {target.email, *inspect(target).attrs.email.history.deleted}:
+        user_cache.invalidate_user(email)
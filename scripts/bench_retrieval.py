@@ -0,0 +1,421 @@
+"""Banc de mesure de la recherche sémantique : performance et qualité par configuration.
+
+Construit un jeu de requêtes étiquetées à partir de data/faq.json (paraphrases
+générées : sans accents, politesse, mots-clés, synonymes, faute de frappe), complété
+par des questions hors FAQ (négatifs), des requêtes écrites à la main et,
+en option, les messages journalisés auxquels une FAQ a été servie telle quelle.
+
+Chaque configuration « modèle@backend » est évaluée dans un processus séparé
+(mémoire mesurée sans interférence) : temps de chargement et de construction de
+l'index, mémoire, latence d'encodage et de requête, recall@1/@k, MRR et, pour
+chaque seuil, couverture et précision des réponses acceptées. Le rapport compare
+chaque configuration à la première et s'écrit en JSON.
+
+Exemples :
+    python scripts/bench_retrieval.py run --config hash@memory \\
+        --config sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2@memory
+    python scripts/bench_retrieval.py run --config default@chroma --from-db --extra data/queries.json
+    python scripts/bench_retrieval.py testset --output /tmp/testset.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from app.core.config import settings
+from app.core.metrics import percentile
+
+# Requêtes hors FAQ : aucune réponse ne devrait être acceptée
+NEGATIVE_QUERIES = [
+    "Quel temps fera-t-il à Lyon demain après-midi ?",
+    "Pouvez-vous me conseiller un bon livre de science-fiction ?",
+    "Comment préparer une pâte à crêpes sans gluten ?",
+    "Quelle est la capitale de l'Australie et pourquoi ?",
+    "Qui a gagné la coupe du monde de football en 1998 ?",
+    "Combien de calories dans une pomme ?",
+    "Traduis bonjour en japonais",
+    "Quel est le meilleur itinéraire pour aller à Marseille ?",
+    "Peux-tu m'écrire un poème sur la mer ?",
+    "Quelle heure est-il à New York ?",
+]
+STOPWORDS = {
+    "a", "à", "au", "aux", "avec", "ce", "comment", "de", "des", "du", "en", "est", "et", "il", "je",
+    "j", "l", "la", "le", "les", "ma", "me", "m", "mes", "mon", "ou", "où", "pour", "que", "quel",
+    "quelle", "quels", "quelles", "qu", "se", "s", "sont", "sur", "un", "une", "vous", "d", "n", "pas",
+    "puis", "faire", "t", "elles", "ils",
+}
+SYNONYMS = {
+    "compte": "profil",
+    "créer": "ouvrir",
+    "mot de passe": "mdp",
+    "paiement": "règlement",
+    "paiements": "règlements",
+    "commande": "achat",
+    "livraison": "expédition",
+    "résilier": "arrêter",
+    "annuler": "stopper",
+    "supprimer": "effacer",
+    "modifier": "changer",
+    "contacter": "joindre",
+    "facture": "reçu",
+    "colis": "paquet",
+    "produit": "article",
+    "données": "informations",
+    "application mobile": "appli",
+    "sécurisées": "protégées",
+    "sécurisés": "protégés",
+}
+
+
+# --- Jeu de test -------------------------------------------------------------
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[\wàâäéèêëïîôùûüÿç-]+", text.lower())
+
+
+def paraphrases(question: str, rng: random.Random) -> Dict[str, str]:
+    """Variantes de saisie d'une question FAQ, par type (omises si identiques à la question)."""
+    words = _words(question)
+    variants = {
+        # Minuscules sans accents ni ponctuation
+        "plain": _fold(question),
+        "polite": f"Bonjour, {question[0].lower()}{question[1:].rstrip(' ?')} svp merci",
+        "keywords": " ".join(w for w in words if w not in STOPWORDS),
+    }
+    synonym = question.lower()
+    for source, target in SYNONYMS.items():
+        synonym = re.sub(rf"\b{source}\b", target, synonym)
+    variants["synonyms"] = synonym
+    candidates = [i for i, w in enumerate(words) if len(w) > 4]
+    if candidates:
+        i = rng.choice(candidates)
+        word = words[i]
+        j = rng.randrange(len(word) - 1)
+        typo = list(words)
+        typo[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+        variants["typo"] = " ".join(typo)
+    return {
+        kind: text for kind, text in variants.items()
+        if text.strip() and text != question
+    }
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return " ".join(_words("".join(c for c in text if not unicodedata.combining(c))))
+
+
+def build_testset(faq: List[Dict], seed: int = 0, negatives: Sequence[str] = NEGATIVE_QUERIES) -> List[Dict]:
+    """Requêtes étiquetées {query, faq_id, source} ; faq_id None pour les négatifs."""
+    rng = random.Random(seed)
+    cases = []
+    for item in faq:
+        for kind, text in paraphrases(item["question"], rng).items():
+            cases.append({"query": text, "faq_id": str(item["id"]), "source": kind})
+    cases += [{"query": q, "faq_id": None, "source": "negative"} for q in negatives]
+    return cases
+
+
+# Réponses servies directement depuis la FAQ (sans reformulation par le LLM)
+DIRECT_PROVIDERS = ("retrieval_high_confidence", "retrieval_only")
+
+
+def logged_cases(faq: List[Dict], limit: int) -> List[Dict]:
+    """Messages journalisés dont la réponse servie est mot pour mot une FAQ (hors avis négatif).
+
+    L'étiquette reprend la décision du moteur de l'époque : ce jeu mesure surtout la
+    stabilité d'une configuration à l'autre sur le trafic réel.
+    """
+    from sqlalchemy import or_
+    from sqlmodel import Session, select
+
+    from app.db.models import ChatInteraction
+    from app.db.session import engine
+
+    by_answer = {item["answer"]: str(item["id"]) for item in faq}
+    with Session(engine) as db:
+        rows = db.exec(
+            select(ChatInteraction.message, ChatInteraction.response)
+            .where(ChatInteraction.provider.in_(DIRECT_PROVIDERS))
+            .where(ChatInteraction.response.in_(list(by_answer)))
+            .where(or_(ChatInteraction.is_helpful.is_(None), ChatInteraction.is_helpful.is_(True)))
+            .order_by(ChatInteraction.timestamp.desc())
+            .limit(limit)
+        ).all()
+    cases = [{"query": message, "faq_id": by_answer[response], "source": "logged"} for message, response in rows]
+    if not cases:
+        print("Attention : --from-db n'a trouvé aucun message journalisé servi par une FAQ")
+    else:
+        print(f"{len(cases)} messages journalisés ajoutés")
+    return cases
+
+
+# --- Métriques ---------------------------------------------------------------
+
+def score_cases(cases: List[Dict], results: List[Dict], k: int, thresholds: Sequence[float]) -> Dict:
+    """Qualité d'après les classements obtenus ({ids, scores} par requête, meilleur en tête)."""
+    positives = [(c, r) for c, r in zip(cases, results) if c["faq_id"] is not None]
+    negatives = [r for c, r in zip(cases, results) if c["faq_id"] is None]
+    hits_1 = [bool(r["ids"]) and r["ids"][0] == c["faq_id"] for c, r in positives]
+    hits_k = [c["faq_id"] in r["ids"][:k] for c, r in positives]
+    reciprocal = [
+        1 / (r["ids"].index(c["faq_id"]) + 1) if c["faq_id"] in r["ids"] else 0.0 for c, r in positives
+    ]
+    by_source = defaultdict(list)
+    for (case, _), hit in zip(positives, hits_1):
+        by_source[case["source"]].append(hit)
+
+    threshold_rows = []
+    for threshold in thresholds:
+        accepted = [hit for (_, r), hit in zip(positives, hits_1) if r["scores"] and r["scores"][0] >= threshold]
+        false_accepts = sum(1 for r in negatives if r["scores"] and r["scores"][0] >= threshold)
+        answered = len(accepted) + false_accepts
+        threshold_rows.append({
+            "threshold": threshold,
+            # Part des questions FAQ auxquelles une réponse est servie
+            "coverage": len(accepted) / len(positives) if positives else 0.0,
+            # Réponses servies qui sont les bonnes (négatifs acceptés comptés comme erreurs)
+            "precision": sum(accepted) / answered if answered else 1.0,
+            "false_accept_rate": false_accepts / len(negatives) if negatives else 0.0,
+        })
+    return {
+        "positives": len(positives),
+        "negatives": len(negatives),
+        "recall_at_1": sum(hits_1) / len(positives) if positives else 0.0,
+        f"recall_at_{k}": sum(hits_k) / len(positives) if positives else 0.0,
+        "mrr": sum(reciprocal) / len(positives) if positives else 0.0,
+        "recall_at_1_by_source": {s: sum(h) / len(h) for s, h in sorted(by_source.items())},
+        "thresholds": threshold_rows,
+    }
+
+
+def rss_mb() -> float:
+    """Mémoire résidente du processus (Linux : /proc, sinon pic via resource)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+# --- Évaluation d'une configuration (processus dédié) ------------------------
+
+def make_client(backend: str):
+    if backend == "memory":
+        from app.services.memory_vector_store import InMemoryVectorClient
+
+        return InMemoryVectorClient()
+    import chromadb
+
+    if backend == "chroma":
+        return chromadb.HttpClient(host=settings.CHROMA_DB_HOST, port=settings.CHROMA_DB_PORT)
+    if backend == "chroma-local":
+        return chromadb.EphemeralClient()
+    raise ValueError(f"Backend inconnu : {backend}")
+
+
+def evaluate(config: str, faq: List[Dict], cases: List[Dict], k: int, thresholds: Sequence[float]) -> Dict:
+    model_name, _, backend = config.rpartition("@")
+    if model_name == "hash":
+        import types
+
+        from scripts.load_test import HashingEncoder
+
+        sys.modules["sentence_transformers"] = types.SimpleNamespace(SentenceTransformer=HashingEncoder)
+    from sentence_transformers import SentenceTransformer
+
+    from app.services.embedding_tuning import apply_tuning, load_tuning
+    from app.services.rag_engine import RAGService
+
+    model_name = settings.EMBEDDING_MODEL if model_name in ("", "default") else model_name
+    rss_start = rss_mb()
+    t0 = time.perf_counter()
+    model = SentenceTransformer(model_name)
+    tuning = load_tuning()
+    apply_tuning(model, tuning)
+    load_s = time.perf_counter() - t0
+    rss_model = rss_mb()
+
+    client = make_client(backend)
+    name = f"bench_{os.getpid()}"
+    collection = client.create_collection(name=name, metadata={"hnsw:space": "cosine"})
+    t0 = time.perf_counter()
+    questions = [item["question"] for item in faq]
+    embeddings = model.encode(questions, batch_size=tuning.batch_size, convert_to_numpy=True)
+    encode_build_s = time.perf_counter() - t0
+    collection.add(ids=[str(item["id"]) for item in faq], embeddings=embeddings.tolist())
+    build_s = time.perf_counter() - t0
+    rss_index = rss_mb()
+
+    # Même chemin que RAGService.search : normalisation, encodage isolé, requête top-k
+    encode_ms, query_ms, results = [], [], []
+    for case in cases:
+        t0 = time.perf_counter()
+        vector = model.encode([RAGService.normalize_query(case["query"])], convert_to_numpy=True).tolist()
+        t1 = time.perf_counter()
+        found = collection.query(query_embeddings=vector, n_results=k, include=["distances"])
+        t2 = time.perf_counter()
+        encode_ms.append((t1 - t0) * 1000)
+        query_ms.append((t2 - t1) * 1000)
+        results.append({"ids": found["ids"][0], "scores": [1 - d for d in found["distances"][0]]})
+    total_ms = [e + q for e, q in zip(encode_ms, query_ms)]
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass  # Collection déjà supprimée ou backend distant indisponible
+
+    return {
+        "config": config,
+        "model": model_name,
+        "backend": backend,
+        "dimension": int(embeddings.shape[1]),
+        "model_load_s": load_s,
+        "index_build_s": build_s,
+        "index_encode_s": encode_build_s,
+        "model_rss_mb": rss_model - rss_start,
+        "index_rss_mb": rss_index - rss_model,
+        "latency": {
+            "encode_p50_ms": percentile(encode_ms, 50),
+            "query_p50_ms": percentile(query_ms, 50),
+            "p50_ms": percentile(total_ms, 50),
+            "p95_ms": percentile(total_ms, 95),
+            "p99_ms": percentile(total_ms, 99),
+        },
+        "quality": score_cases(cases, results, k, thresholds),
+    }
+
+
+# --- Rapport -----------------------------------------------------------------
+
+def print_report(report: Dict):
+    k = report["k"]
+    rows = report["results"]
+    reference = rows[0] if rows else None
+    print(f"{len(report['cases'])} requêtes, {report['faq_count']} FAQ, k={k}")
+    print(f"{'configuration':<40} {'build s':>8} {'RSS Mo':>7} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'R@1':>6} {f'R@{k}':>6} {'MRR':>6}")
+    for row in rows:
+        quality, latency = row["quality"], row["latency"]
+        print(f"{row['config'][-40:]:<40} {row['index_build_s']:>8.2f} "
+              f"{row['model_rss_mb'] + row['index_rss_mb']:>7.0f} {latency['p50_ms']:>7.2f} {latency['p99_ms']:>7.2f} "
+              f"{quality['recall_at_1']:>6.3f} {quality[f'recall_at_{k}']:>6.3f} {quality['mrr']:>6.3f}")
+    for row in rows:
+        print(f"\n{row['config']} — recall@1 par source : "
+              + ", ".join(f"{s} {v:.2f}" for s, v in row["quality"]["recall_at_1_by_source"].items()))
+        print(f"  {'seuil':>6} {'couverture':>10} {'précision':>9} {'faux acceptés':>13}")
+        for t in row["quality"]["thresholds"]:
+            print(f"  {t['threshold']:>6.2f} {t['coverage']:>10.3f} {t['precision']:>9.3f} {t['false_accept_rate']:>13.3f}")
+    if reference and len(rows) > 1:
+        print(f"\nÉcarts par rapport à {reference['config']} :")
+        for row in rows[1:]:
+            print(f"  {row['config']} : p50 {_delta(row['latency']['p50_ms'], reference['latency']['p50_ms'])}, "
+                  f"recall@1 {row['quality']['recall_at_1'] - reference['quality']['recall_at_1']:+.3f}, "
+                  f"précision@{settings.CONFIDENCE_THRESHOLD} "
+                  f"{_precision_at(row, settings.CONFIDENCE_THRESHOLD) - _precision_at(reference, settings.CONFIDENCE_THRESHOLD):+.3f}")
+
+
+def _delta(value: float, reference: float) -> str:
+    return f"{(value - reference) / reference * 100:+.1f}%" if reference else "n/a"
+
+
+def _precision_at(row: Dict, threshold: float) -> float:
+    return next((t["precision"] for t in row["quality"]["thresholds"] if t["threshold"] == threshold), 0.0)
+
+
+def load_cases(args, faq: List[Dict]) -> List[Dict]:
+    cases = build_testset(faq, seed=args.seed)
+    if args.extra:
+        cases += json.loads(args.extra.read_text(encoding="utf-8"))
+    if args.from_db:
+        cases += logged_cases(faq, args.db_limit)
+    return cases
+
+
+def run(args):
+    faq = json.loads(args.faq.read_text(encoding="utf-8"))
+    cases = load_cases(args, faq)
+    thresholds = sorted({settings.CONFIDENCE_THRESHOLD, settings.DIRECT_ANSWER_THRESHOLD, *args.thresholds})
+    script = str(Path(__file__).resolve())
+    payload = json.dumps({"faq": faq, "cases": cases, "k": args.k, "thresholds": thresholds})
+    results = []
+    for config in args.config:
+        print(f"Évaluation de {config}…", file=sys.stderr)
+        process = subprocess.run(
+            [sys.executable, script, "evaluate", config], input=payload, capture_output=True, text=True, cwd=ROOT
+        )
+        if process.returncode != 0:
+            # Backend ou modèle indisponible : les autres configurations restent comparées
+            print(process.stderr.strip().splitlines()[-1], file=sys.stderr)
+            print(f"Configuration {config} ignorée", file=sys.stderr)
+            continue
+        results.append(json.loads(process.stdout.splitlines()[-1]))
+
+    from scripts.load_test import git_commit
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "faq_count": len(faq),
+        "k": args.k,
+        "cpu_count": os.cpu_count(),
+        "cases": cases,
+        "results": results,
+    }
+    print_report(report)
+    output = args.output or Path("data/benchmarks") / f"retrieval-{report['commit'] or 'local'}-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Résultats écrits dans {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance et qualité de la recherche sémantique")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = sub.add_parser("run", help="Évalue chaque configuration et écrit le rapport comparatif")
+    run_cmd.add_argument("--config", action="append", required=True,
+                         help="modèle@backend (modèle : nom, 'default' ou 'hash' ; backend : memory, chroma, chroma-local)")
+    run_cmd.add_argument("--k", type=int, default=3)
+    run_cmd.add_argument("--thresholds", type=float, nargs="+", default=[0.35, 0.45, 0.55, 0.65, 0.75, 0.85])
+    run_cmd.add_argument("--output", type=Path)
+    testset_cmd = sub.add_parser("testset", help="Écrit le jeu de requêtes étiquetées")
+    testset_cmd.add_argument("--output", type=Path, required=True)
+    for cmd in (run_cmd, testset_cmd):
+        cmd.add_argument("--faq", type=Path, default=Path(settings.FAQ_JSON_PATH))
+        cmd.add_argument("--seed", type=int, default=0)
+        cmd.add_argument("--extra", type=Path, help="Requêtes écrites à la main [{query, faq_id, source}]")
+        cmd.add_argument("--from-db", action="store_true", help="Ajouter les messages journalisés servis par une FAQ")
+        cmd.add_argument("--db-limit", type=int, default=1000)
+    eval_cmd = sub.add_parser("evaluate", help=argparse.SUPPRESS)
+    eval_cmd.add_argument("config")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    elif args.command == "testset":
+        cases = load_cases(args, json.loads(args.faq.read_text(encoding="utf-8")))
+        args.output.write_text(json.dumps(cases, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"{len(cases)} requêtes écrites dans {args.output}")
+    else:
+        data = json.load(sys.stdin)
+        result = evaluate(args.config, data["faq"], data["cases"], data["k"], data["thresholds"])
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
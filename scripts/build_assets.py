@@ -0,0 +1,176 @@
+"""Construit les assets statiques : bundles minifiés, noms versionnés, variantes gzip/brotli.
+
+Les fichiers sont écrits dans static/dist/ avec un manifest.json lu par les
+templates (app/core/assets.py). Sans build, les templates servent les sources.
+
+Les dépendances tierces (static/vendor) sont téléchargées à une version figée et
+vérifiées contre l'empreinte sha256 enregistrée dans scripts/vendor.lock.json. Sans
+empreinte figée, rien n'est téléchargé : la page charge la dépendance depuis le CDN.
+
+Exemples :
+    python scripts/build_assets.py
+    python scripts/build_assets.py --no-fetch     # sans télécharger les dépendances vendor
+    python scripts/build_assets.py --pin-vendor   # fige l'empreinte d'une nouvelle version (à relire)
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import sys
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.assets import BASE_BUNDLE, BUNDLES, DIST_DIR, MARKED_URL, STATIC_DIR
+
+try:
+    import brotli
+except ImportError:  # Variante .br simplement omise
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # JS concaténé sans minification
+    rjsmin = None
+
+IMPORT_RE = re.compile(r"""@import\s+(?:url\()?["']?([^"')]+)["']?\)?\s*;""")
+VENDOR_SOURCES = {"vendor/marked.min.js": MARKED_URL}
+VENDOR_LOCK = Path(__file__).with_name("vendor.lock.json")
+
+
+class VendorIntegrityError(RuntimeError):
+    pass
+
+
+def _download(url: str) -> bytes:
+    print(f"Téléchargement {url}")
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read()
+
+
+def fetch_vendor(static_dir: Path, lock_path: Path = VENDOR_LOCK, pin: bool = False):
+    """Télécharge les dépendances tierces absentes et vérifie leur sha256 contre le fichier de verrou.
+
+    Une dépendance sans empreinte figée (ou dont l'URL a changé) n'est pas téléchargée et
+    reste servie par le CDN, sauf avec `pin` : l'empreinte téléchargée est alors enregistrée,
+    à relire avant de la committer. Une empreinte différente est une erreur.
+    """
+    lock: Dict[str, Dict[str, str]] = json.loads(lock_path.read_text(encoding="utf-8")) if lock_path.exists() else {}
+    for path, url in VENDOR_SOURCES.items():
+        target = static_dir / path
+        entry = lock.get(path)
+        if entry is None or entry["url"] != url:
+            if not pin:
+                print(f"Attention : {path} sans empreinte figée, chargé depuis {url} (figer avec --pin-vendor)")
+                continue
+            data = _download(url)
+            lock[path] = {"url": url, "sha256": hashlib.sha256(data).hexdigest()}
+            print(f"  {path} figé : sha256 {lock[path]['sha256']}")
+        else:
+            # Fichier déjà présent vérifié aussi : une copie altérée n'entre pas dans les bundles
+            present = target.exists()
+            data = target.read_bytes() if present else _download(url)
+            if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+                raise VendorIntegrityError(f"{path} : empreinte sha256 différente de {lock_path.name}")
+            if present:
+                continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(target)
+    if pin:
+        lock_path.write_text(json.dumps(lock, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def inline_css(path: Path, seen: Set[Path]) -> str:
+    """Contenu CSS avec ses @import locaux remplacés par les fichiers (une seule fois chacun)."""
+    path = path.resolve()
+    if path in seen:
+        return ""
+    seen.add(path)
+
+    def replace(match: re.Match) -> str:
+        target = match.group(1)
+        if re.match(r"^(https?:)?//", target):
+            return match.group(0)
+        return inline_css(path.parent / target, seen)
+
+    return IMPORT_RE.sub(replace, path.read_text(encoding="utf-8"))
+
+
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    # Espaces autour des délimiteurs sans effet ; ceux de calc() et des sélecteurs sont conservés
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(js: str) -> str:
+    return rjsmin.jsmin(js) if rjsmin else js
+
+
+def bundle_content(static_dir: Path, name: str, seen: Optional[Set[Path]] = None) -> str:
+    # Dépendance tierce absente (non figée) : exclue du bundle, servie par le CDN (app/core/assets.py)
+    sources = [
+        static_dir / path for path in BUNDLES[name]
+        if not path.startswith("vendor/") or (static_dir / path).exists()
+    ]
+    if name.endswith(".css"):
+        seen = set() if seen is None else seen
+        return minify_css("\n".join(inline_css(path, seen) for path in sources))
+    # Les fichiers déjà minifiés (vendor) ne sont pas retraités
+    parts = [
+        path.read_text(encoding="utf-8") if path.name.endswith(".min.js") else minify_js(path.read_text(encoding="utf-8"))
+        for path in sources
+    ]
+    return ";\n".join(parts)
+
+
+def write_precompressed(path: Path, data: bytes):
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+def build(static_dir: Path = Path(STATIC_DIR), fetch: bool = True, pin: bool = False) -> Dict[str, str]:
+    if fetch:
+        fetch_vendor(static_dir, pin=pin)
+    out_dir = static_dir / DIST_DIR
+    # Les anciennes versions sont supprimées : le manifeste ne pointe que sur ce build
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+
+    base_files: Set[Path] = set()
+    manifest = {}
+    for name in [BASE_BUNDLE] + [n for n in BUNDLES if n != BASE_BUNDLE]:
+        # Les feuilles de page n'embarquent pas ce que base.css fournit déjà
+        seen = base_files if name == BASE_BUNDLE else set(base_files)
+        data = bundle_content(static_dir, name, seen if name.endswith(".css") else None).encode("utf-8")
+        stem, ext = name.rsplit(".", 1)
+        filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}.{ext}"
+        (out_dir / filename).write_bytes(data)
+        write_precompressed(out_dir / filename, data)
+        manifest[name] = f"{DIST_DIR}/{filename}"
+        print(f"  {name} → {filename} ({len(data)} octets)")
+
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit les assets statiques versionnés")
+    parser.add_argument("--static-dir", type=Path, default=Path(STATIC_DIR))
+    parser.add_argument("--no-fetch", action="store_true", help="Ne pas télécharger les dépendances vendor")
+    parser.add_argument("--pin-vendor", action="store_true", help="Enregistrer l'empreinte des dépendances non figées")
+    args = parser.parse_args()
+    try:
+        manifest = build(args.static_dir, fetch=not args.no_fetch, pin=args.pin_vendor)
+    except VendorIntegrityError as e:
+        parser.exit(1, f"Erreur : {e}\n")
+    print(f"{len(manifest)} bundles écrits dans {args.static_dir / DIST_DIR}")
@@ -0,0 +1,90 @@
+"""Import / export en masse de la FAQ.
+
+L'import n'écrit qu'en base : l'index et la table des réponses vivent dans le serveur,
+qui les reconstruit au démarrage ou sur demande (POST /admin/reindex, via --server).
+
+Exemples :
+    python scripts/faq_bulk.py import data/faq.json
+    python scripts/faq_bulk.py import nouvelles_questions.csv --server http://localhost:8000 --token "$ADMIN_TOKEN"
+    python scripts/faq_bulk.py export sauvegarde.csv
+"""
+import argparse
+import json
+import sys
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlmodel import Session, SQLModel, select
+
+from app.db.models import FAQItem
+from app.db.session import engine
+from app.services import faq_io
+
+
+def print_progress(stage: str, done: int, total: int):
+    print(f"  [{stage}] {done}/{total}")
+
+
+def request_reindex(server: str, token: str):
+    """Demande au serveur de reconstruire son index (job de réindexation en arrière-plan)."""
+    request = urllib.request.Request(
+        f"{server.rstrip('/')}/admin/reindex", method="POST", headers={"Authorization": f"Bearer {token}"}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        job = json.loads(response.read())
+    print(f"Réindexation #{job['id']} demandée au serveur ({job['status']})")
+
+
+def import_file(path: Path, server: Optional[str], token: Optional[str]):
+    SQLModel.metadata.create_all(engine)
+    items = faq_io.parse_faq_file(path.read_bytes(), path.name)
+    print(f"{len(items)} questions lues dans {path}")
+    with Session(engine) as session:
+        report = faq_io.import_faqs(session, items, progress=print_progress)
+    print(f"{report['created']} créées, {report['updated']} mises à jour, {report['unchanged']} inchangées")
+    if not (report["created"] or report["updated"]):
+        return
+    if server:
+        request_reindex(server, token)
+    else:
+        print("Index du serveur inchangé : POST /admin/reindex (ou --server) ou redémarrage pour servir l'import")
+
+
+def export_file(path: Path):
+    with Session(engine) as session, open(path, "w", encoding="utf-8", newline="") as f:
+        rows = session.exec(select(FAQItem).order_by(FAQItem.id).execution_options(yield_per=500))
+        count = 0
+        if path.suffix.lower() == ".csv":
+            f.write(faq_io.csv_line(faq_io.CSV_FIELDS))
+            for faq in rows:
+                f.write(faq_io.csv_line([faq.question, faq.answer, faq.category]))
+                count += 1
+        else:
+            f.write("[\n")
+            for faq in rows:
+                f.write(("," if count else "") + json.dumps(faq_io.faq_to_dict(faq), ensure_ascii=False) + "\n")
+                count += 1
+            f.write("]\n")
+    print(f"{count} questions exportées vers {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import / export en masse de la FAQ")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_cmd = sub.add_parser("import", help="Importe un fichier JSON ou CSV")
+    import_cmd.add_argument("path", type=Path)
+    import_cmd.add_argument("--server", help="URL du serveur à réindexer après l'import")
+    import_cmd.add_argument("--token", help="Jeton d'un administrateur (avec --server)")
+    export_cmd = sub.add_parser("export", help="Exporte la FAQ en JSON ou CSV (selon l'extension)")
+    export_cmd.add_argument("path", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        if args.server and not args.token:
+            parser.error("--server nécessite --token")
+        import_file(args.path, args.server, args.token)
+    else:
+        export_file(args.path)
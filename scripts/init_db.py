@@ -1,13 +1,12 @@
-import json
 import sys
-import os
 from pathlib import Path
-from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel import Session, SQLModel, create_engine
 
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.core.config import settings
-from app.db.models import FAQItem
+from app.services.faq_io import import_faqs, parse_faq_file
+from app.services.retention import enable_incremental_vacuum
 
 def init_db():
     print(f"Connexion à la base de données : {settings.DATABASE_URL}")
@@ -15,34 +14,22 @@ def init_db():
     # Création des tables
     SQLModel.metadata.create_all(engine)
     print("Tables créées.")
+    # Espace rendu par la rétention sans VACUUM complet pendant le service (SQLite)
+    if enable_incremental_vacuum(engine):
+        print("auto_vacuum=INCREMENTAL activé (VACUUM complet).")
     # Chargement du JSON source
     json_path = Path("data/faq.json")
     if not json_path.exists():
         print(f"Fichier {json_path} introuvable.")
         return
-    with open(json_path, "r", encoding="utf-8") as f:
-        faq_data = json.load(f)
-    print(f"{len(faq_data)} questions trouvées dans le JSON.")
-    # Insertion en base
+    # Amorçage : seules les questions absentes sont insérées, les réponses modifiées depuis
+    # l'admin sont conservées (scripts/faq_bulk.py pour écraser). L'index est reconstruit au démarrage de l'app
     with Session(engine) as session:
-        count = 0
-        for item in faq_data:
-            # Vérifier si la question existe déjà pour éviter les doublons
-            existing_q = session.exec(
-                select(FAQItem).where(FAQItem.question == item["question"])
-            ).first()
-            
-            if not existing_q:
-                new_faq = FAQItem(
-                    question=item["question"],
-                    answer=item["answer"],
-                    category=item.get("category", "general")
-                )
-                session.add(new_faq)
-                count += 1
-        
-        session.commit()
-        print(f"{count} nouvelles questions importées avec succès !")
+        report = import_faqs(
+            session, parse_faq_file(json_path.read_bytes(), json_path.name), update_existing=False
+        )
+        print(f"{report['total']} questions trouvées dans le JSON.")
+        print(f"{report['created']} nouvelles questions importées avec succès !")
 
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
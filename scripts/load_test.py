@@ -0,0 +1,373 @@
+"""Test de charge de bout en bout de /chat avec des remplaçants locaux.
+
+`run` démarre un faux serveur LLM (compatible OpenAI, profil de latence et
+d'erreurs configurable) puis l'application (index vectoriel en mémoire, base
+SQLite temporaire remplie depuis data/faq.json), envoie un trafic mixte avec un
+client asynchrone concurrent et écrit RPS et p50/p95/p99 par chemin en JSON.
+
+Exemples :
+    python scripts/load_test.py run --concurrency 32 --duration 30
+    python scripts/load_test.py run --llm-profile degraded --mix static=1,faq=2,llm=4,history=1
+    python scripts/load_test.py run --hash-encoder      # sans coût d'inférence du modèle
+    python scripts/load_test.py compare data/benchmarks/avant.json data/benchmarks/apres.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from app.core.metrics import percentile
+
+# Profils du faux LLM : latence log-normale (médiane, dispersion), erreurs 500, requêtes bloquées
+LLM_PROFILES = {
+    "fast": {"median_ms": 50, "sigma": 0.2, "error_rate": 0.0, "hang_rate": 0.0},
+    "typical": {"median_ms": 800, "sigma": 0.5, "error_rate": 0.01, "hang_rate": 0.0},
+    "degraded": {"median_ms": 2000, "sigma": 0.8, "error_rate": 0.1, "hang_rate": 0.05},
+}
+DEFAULT_MIX = "static=1,faq=4,llm=2,history=1"
+STATIC_MESSAGES = ["bonjour", "merci beaucoup", "salut", "ok"]
+# Hors FAQ : confiance faible, passage au LLM
+OFF_TOPIC_MESSAGES = [
+    "Quel temps fera-t-il à Lyon demain après-midi ?",
+    "Pouvez-vous me conseiller un bon livre de science-fiction ?",
+    "Comment préparer une pâte à crêpes sans gluten ?",
+    "Quelle est la capitale de l'Australie et pourquoi ?",
+]
+
+
+# --- Faux serveur LLM -------------------------------------------------------
+
+def fake_llm_app(profile: Dict):
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI()
+    rng = random.Random()
+
+    @app.post("/v1/chat/completions")
+    async def completions(body: Dict):
+        draw = rng.random()
+        if draw < profile["hang_rate"]:
+            await asyncio.sleep(3600)  # Bloqué : seul le délai du client y met fin
+        await asyncio.sleep(rng.lognormvariate(0, profile["sigma"]) * profile["median_ms"] / 1000)
+        if draw < profile["hang_rate"] + profile["error_rate"]:
+            return JSONResponse(status_code=500, content={"error": {"message": "erreur simulée"}})
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "bench"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Réponse simulée du LLM de benchmark."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+def serve_fake_llm(port: int, profile: Dict):
+    import uvicorn
+
+    uvicorn.run(fake_llm_app(profile), host="127.0.0.1", port=port, log_level="warning")
+
+
+# --- Application sous test --------------------------------------------------
+
+class HashingEncoder:
+    """Encodeur par hachage de mots : même interface que SentenceTransformer, coût quasi nul."""
+
+    def __init__(self, *args, dim: int = 384, **kwargs):
+        self.dim = dim
+        self.max_seq_length = 128
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs):
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, hash(word) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+def serve_app(port: int, faq_path: Path, hash_encoder: bool):
+    """Démarre l'application (variables d'environnement déjà positionnées par `run`)."""
+    if hash_encoder:
+        import types
+
+        sys.modules["sentence_transformers"] = types.SimpleNamespace(SentenceTransformer=HashingEncoder)
+
+    import uvicorn
+    from sqlmodel import Session, SQLModel
+
+    from app.db.session import engine
+    from app.main import app
+    from app.services import faq_io
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        # Indexation faite par le lifespan de l'application
+        faq_io.import_faqs(db, faq_io.parse_faq_file(faq_path.read_bytes(), faq_path.name))
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    # Journal INFO par requête (logger "uvicorn" de l'orchestrateur LLM) coupé : il fausserait la mesure
+    logging.getLogger("uvicorn").setLevel(logging.WARNING)
+    uvicorn.Server(config).run()
+
+
+# --- Client de charge -------------------------------------------------------
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("static", "faq", "llm", "history"):
+            raise ValueError(f"Chemin inconnu : {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_request(path: str, faq_questions: List[str], session_id: str) -> Tuple[str, str, Optional[Dict]]:
+    if path == "history":
+        return "GET", f"/chat/history/{session_id}?limit=20", None
+    message = {
+        "static": lambda: random.choice(STATIC_MESSAGES),
+        "faq": lambda: random.choice(faq_questions),
+        "llm": lambda: random.choice(OFF_TOPIC_MESSAGES),
+    }[path]()
+    return "POST", "/chat", {"message": message, "user_id": session_id, "use_llm": path == "llm"}
+
+
+async def drive(base_url: str, mix: Dict[str, float], faq_questions: List[str],
+                concurrency: int, duration: float, warmup: float, sessions: int) -> Dict:
+    import httpx
+
+    paths, weights = list(mix), list(mix.values())
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    providers: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    async def worker(client):
+        while time.perf_counter() < stop_at:
+            path = random.choices(paths, weights)[0]
+            method, url, payload = build_request(path, faq_questions, f"bench-{random.randrange(sessions)}")
+            t0 = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=payload)
+                ok = response.status_code < 400
+                provider = response.json().get("provider") if ok and path != "history" else None
+            except httpx.HTTPError:
+                ok, provider = False, None
+            if t0 < measure_from:
+                continue
+            latencies[path].append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                errors[path] += 1
+            elif provider:
+                providers[path][provider] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+
+    def summarize(values: List[float], error_count: int) -> Dict:
+        return {
+            "requests": len(values),
+            "errors": error_count,
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(max(values), 2) if values else 0.0,
+        }
+
+    report = {name: summarize(values, errors[name]) for name, values in latencies.items()}
+    for name, mix_counts in providers.items():
+        report[name]["providers"] = dict(mix_counts)
+    overall = [v for values in latencies.values() for v in values]
+    return {"duration_s": round(elapsed, 2), "overall": summarize(overall, sum(errors.values())), "paths": report}
+
+
+async def wait_ready(url: str, timeout: float = 300):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} ne répond pas")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    profile = dict(LLM_PROFILES[args.llm_profile])
+    if args.llm_latency_ms is not None:
+        profile["median_ms"] = args.llm_latency_ms
+    if args.llm_error_rate is not None:
+        profile["error_rate"] = args.llm_error_rate
+    mix = parse_mix(args.mix)
+    faq_questions = [item["question"] for item in json.loads(args.faq.read_text(encoding="utf-8"))]
+
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir / 'bench.db'}",
+        VECTOR_BACKEND="memory",
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.llm_port}/v1",
+        GROQ_API_KEY="",
+        RATE_LIMIT_PER_SESSION="{}",
+        RATE_LIMIT_PER_IP="{}",
+        RETENTION_DAYS="0",
+        ARCHIVE_DIR=str(workdir / "archive"),
+        EMBEDDING_TUNING_FILE=str(workdir / "absent.json") if args.hash_encoder else os.environ.get(
+            "EMBEDDING_TUNING_FILE", "data/embedding_tuning.json"),
+    )
+    script = str(Path(__file__).resolve())
+    llm_cmd = [sys.executable, script, "fake-llm", "--port", str(args.llm_port), "--profile-json", json.dumps(profile)]
+    app_cmd = [sys.executable, script, "serve", "--port", str(args.port), "--faq", str(args.faq)]
+    if args.hash_encoder:
+        app_cmd.append("--hash-encoder")
+
+    processes = [subprocess.Popen(llm_cmd, cwd=ROOT, env=env), subprocess.Popen(app_cmd, cwd=ROOT, env=env)]
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        asyncio.run(wait_ready(f"{base_url}/llm/status"))
+        print(f"Charge : {args.concurrency} clients, {args.duration}s (+{args.warmup}s de chauffe), mix {mix}")
+        results = asyncio.run(drive(
+            base_url, mix, faq_questions, args.concurrency, args.duration, args.warmup, args.sessions
+        ))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                # Arrêt gracieux bloqué par des requêtes en suspens (profil avec hang_rate)
+                process.kill()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "sessions": args.sessions,
+            "mix": mix,
+            "llm_profile": profile,
+            "encoder": "hash" if args.hash_encoder else "model",
+            "cpu_count": os.cpu_count(),
+        },
+        **results,
+    }
+    print_report(report)
+    output = args.output or Path("data/benchmarks") / f"load-{report['commit'] or 'local'}-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Résultats écrits dans {output}")
+
+
+def print_report(report: Dict):
+    print(f"{'chemin':<10} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in [*sorted(report["paths"].items()), ("total", report["overall"])]:
+        print(f"{name:<10} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+def compare(baseline: Path, candidate: Path):
+    """Écarts relatifs de débit et de latence par chemin entre deux exécutions."""
+    before = json.loads(baseline.read_text(encoding="utf-8"))
+    after = json.loads(candidate.read_text(encoding="utf-8"))
+    print(f"{before.get('commit')} → {after.get('commit')}")
+    rows = {**after["paths"], "total": after["overall"]}
+    reference = {**before["paths"], "total": before["overall"]}
+    print(f"{'chemin':<10} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, row in rows.items():
+        ref = reference.get(name)
+        if not ref:
+            continue
+
+        def delta(key):
+            return f"{(row[key] - ref[key]) / ref[key] * 100:+.1f}%" if ref[key] else "n/a"
+
+        print(f"{name:<10} {delta('rps'):>9} {delta('p50_ms'):>9} {delta('p95_ms'):>9} {delta('p99_ms'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de bout en bout de /chat")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = sub.add_parser("run", help="Démarre les remplaçants et l'application puis envoie la charge")
+    run_cmd.add_argument("--concurrency", type=int, default=16)
+    run_cmd.add_argument("--duration", type=float, default=30.0, help="Durée mesurée (s)")
+    run_cmd.add_argument("--warmup", type=float, default=5.0, help="Chauffe non mesurée (s)")
+    run_cmd.add_argument("--sessions", type=int, default=200, help="Nombre de sessions simulées")
+    run_cmd.add_argument("--mix", default=DEFAULT_MIX, help="Poids par chemin : static, faq, llm, history")
+    run_cmd.add_argument("--llm-profile", choices=sorted(LLM_PROFILES), default="typical")
+    run_cmd.add_argument("--llm-latency-ms", type=float, help="Surcharge la latence médiane du profil")
+    run_cmd.add_argument("--llm-error-rate", type=float, help="Surcharge le taux d'erreurs du profil")
+    run_cmd.add_argument("--hash-encoder", action="store_true", help="Encodeur par hachage au lieu du modèle")
+    run_cmd.add_argument("--faq", type=Path, default=Path("data/faq.json"))
+    run_cmd.add_argument("--port", type=int, default=8765)
+    run_cmd.add_argument("--llm-port", type=int, default=8766)
+    run_cmd.add_argument("--output", type=Path)
+
+    compare_cmd = sub.add_parser("compare", help="Compare deux fichiers de résultats")
+    compare_cmd.add_argument("baseline", type=Path)
+    compare_cmd.add_argument("candidate", type=Path)
+
+    llm_cmd = sub.add_parser("fake-llm", help="Faux serveur LLM compatible OpenAI (utilisé par run)")
+    llm_cmd.add_argument("--port", type=int, default=8766)
+    llm_cmd.add_argument("--profile-json", default=json.dumps(LLM_PROFILES["typical"]))
+
+    serve_cmd = sub.add_parser("serve", help="Application sous test (utilisé par run)")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+    serve_cmd.add_argument("--faq", type=Path, default=Path("data/faq.json"))
+    serve_cmd.add_argument("--hash-encoder", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "compare":
+        compare(args.baseline, args.candidate)
+    elif args.command == "fake-llm":
+        serve_fake_llm(args.port, json.loads(args.profile_json))
+    else:
+        serve_app(args.port, args.faq, args.hash_encoder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Enregistrement et rejeu du trafic de production.
+
+Exemples :
+    python scripts/replay_traffic.py export --output data/replay.ndjson --limit 5000 --salt "$(openssl rand -hex 16)"
+    python scripts/replay_traffic.py replay data/replay.ndjson --rate 20
+    DATABASE_URL=sqlite:///./copie.db python scripts/replay_traffic.py replay data/replay.ndjson --mode chat
+    python scripts/replay_traffic.py replay data/replay.ndjson --mode chat --hash-encoder  # sans modèle
+
+Le mode `chat` écrit dans la base configurée : utilisez une copie de la base de production.
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.metrics import percentile
+from app.db.models import ChatInteraction
+from app.db.session import engine
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_RE = re.compile(r"(?:\+?\d[\s.-]?){8,}\d")
+
+
+def anonymize_text(text: str) -> str:
+    """Masque les données personnelles évidentes (emails, téléphones)."""
+    text = EMAIL_RE.sub("<email>", text)
+    return PHONE_RE.sub("<phone>", text)
+
+
+def anonymize_session(session_id: str, salt: str) -> str:
+    return hashlib.sha256(f"{salt}:{session_id}".encode("utf-8")).hexdigest()[:16]
+
+
+def classify(provider: str) -> str:
+    """Regroupe les providers en décisions comparables entre deux exécutions."""
+    if provider == "static_rule":
+        return "static_rule"
+    if provider.startswith("retrieval"):
+        return "retrieval"
+    if provider == "timeout":
+        return "timeout"
+    if provider == "rate_limited":
+        return "rate_limited"
+    return "llm"
+
+
+def export_interactions(output: Path, limit: int, salt: str):
+    with Session(engine) as db:
+        statement = select(ChatInteraction).order_by(ChatInteraction.timestamp)
+        if limit:
+            statement = statement.limit(limit)
+        interactions = db.exec(statement).all()
+
+    with open(output, "w", encoding="utf-8") as f:
+        for i in interactions:
+            record = {
+                "session": anonymize_session(i.user_session_id, salt),
+                "message": anonymize_text(i.message),
+                "response": anonymize_text(i.response),
+                "confidence": i.confidence,
+                "provider": i.provider,
+                "timestamp": i.timestamp.isoformat(),
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"{len(interactions)} interactions exportées vers {output}")
+
+
+def load_records(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_retrieval_runner():
+    from app.services.rag_engine import RAGService
+
+    rag = RAGService()
+    with Session(engine) as db:
+        rag.reload_from_db(db)
+
+    def run(record):
+        result = rag.search(record["message"], threshold=settings.CONFIDENCE_THRESHOLD)
+        if result.get("provider") == "static_rule":
+            return "static_rule", result["answer"]
+        if result["answer"] and result["confidence"] >= settings.DIRECT_ANSWER_THRESHOLD:
+            return "retrieval_high_confidence", result["answer"]
+        return "llm", result["answer"] or ""
+
+    return run, lambda: None
+
+
+def make_chat_runner(llm_latency: float):
+    import asyncio
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.routers import chat
+    from app.services.rate_limit import rate_limiter
+
+    # Toutes les requêtes du rejeu partagent une IP : limites désactivées, comme dans load_test.py
+    rate_limiter.limits = {"session": {}, "ip": {}}
+
+    class StubLLM:
+        async def generate_response(self, messages, timeout=None, on_partial=None):
+            await asyncio.sleep(llm_latency)
+            if on_partial:
+                await on_partial("[stub]")
+            return {"response": "[stub]", "provider": "stub", "status": "success"}
+
+        def get_status(self):
+            return {"current": "stub", "available": ["stub"]}
+
+    chat.llm_orchestrator = StubLLM()
+    client = TestClient(app)
+    client.__enter__()
+    sessions = set()
+
+    def run(record):
+        user_id = f"replay-{record['session']}"
+        sessions.add(user_id)
+        response = client.post("/chat", json={"message": record["message"], "user_id": user_id})
+        if response.status_code == 429:
+            return "rate_limited", ""
+        response.raise_for_status()
+        data = response.json()
+        return data["provider"], data["response"]
+
+    def close():
+        for user_id in sessions:
+            client.delete(f"/chat/history/{user_id}")
+        client.__exit__(None, None, None)
+
+    return run, close
+
+
+def replay(path: Path, mode: str, rate: float, concurrency: int, llm_latency: float, report: Path = None,
+           hash_encoder: bool = False):
+    records = load_records(path)
+    if not records:
+        print("Fichier de rejeu vide.")
+        return
+    if hash_encoder:
+        # Encodeur sans coût ni téléchargement : vérifie le pipeline, pas la qualité des réponses
+        import types
+
+        from scripts.load_test import HashingEncoder
+
+        sys.modules["sentence_transformers"] = types.SimpleNamespace(SentenceTransformer=HashingEncoder)
+
+    if mode == "chat":
+        run, close = make_chat_runner(llm_latency)
+    else:
+        run, close = make_retrieval_runner()
+
+    def timed(record):
+        start = time.perf_counter()
+        provider, answer = run(record)
+        return time.perf_counter() - start, provider, answer
+
+    start = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, record in enumerate(records):
+            if rate > 0:
+                delay = start + index / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(timed, record))
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+    close()
+
+    latencies = [r[0] * 1000 for r in results]
+    recorded_mix = Counter(classify(r["provider"]) for r in records)
+    replayed_mix = Counter(classify(r[1]) for r in results)
+    decision_changes = 0
+    answer_changes = 0
+    for record, (_, provider, answer) in zip(records, results):
+        before, after = classify(record["provider"]), classify(provider)
+        if before != after:
+            decision_changes += 1
+        elif after in ("static_rule", "retrieval") and answer != record["response"]:
+            answer_changes += 1
+
+    summary = {
+        "mode": mode,
+        "requests": len(records),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2),
+        },
+        "provider_mix": {"recorded": dict(recorded_mix), "replayed": dict(replayed_mix)},
+        "decision_changes": decision_changes,
+        "answer_changes": answer_changes,
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if report:
+        report.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Rapport écrit dans {report}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistrement et rejeu du trafic /chat")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="Exporte les ChatInteraction anonymisées")
+    export_cmd.add_argument("--output", type=Path, default=Path("data/replay.ndjson"))
+    export_cmd.add_argument("--limit", type=int, default=0, help="0 = tout exporter")
+    export_cmd.add_argument("--salt", required=True, help="Sel du hachage des sessions (secret, propre à l'export)")
+
+    replay_cmd = sub.add_parser("replay", help="Rejoue un fichier contre le pipeline")
+    replay_cmd.add_argument("input", type=Path)
+    replay_cmd.add_argument("--mode", choices=["retrieval", "chat"], default="retrieval")
+    replay_cmd.add_argument("--rate", type=float, default=0.0, help="Requêtes/s (0 = maximum)")
+    replay_cmd.add_argument("--concurrency", type=int, default=1)
+    replay_cmd.add_argument("--llm-latency", type=float, default=0.0, help="Latence du LLM simulé (s)")
+    replay_cmd.add_argument("--report", type=Path, default=None, help="Fichier JSON du rapport")
+    replay_cmd.add_argument("--hash-encoder", action="store_true", help="Encodeur par hachage au lieu du modèle")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        # La clé par défaut est publique : les sessions hachées seraient réidentifiables
+        if args.salt == type(settings).model_fields["SECRET_KEY"].default:
+            parser.error("--salt ne doit pas reprendre la SECRET_KEY par défaut")
+        export_interactions(args.output, args.limit, args.salt)
+    else:
+        replay(args.input, args.mode, args.rate, args.concurrency, args.llm_latency, args.report, args.hash_encoder)
+
+
+if __name__ == "__main__":
+    main()
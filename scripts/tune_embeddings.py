@@ -0,0 +1,138 @@
+"""Autoréglage de l'inférence CPU du modèle d'embeddings sur la machine courante.
+
+Mesure chaque combinaison (threads torch, taille de lot, longueur max de séquence)
+sur des requêtes tirées de data/faq.json, affiche débit et p99, puis écrit les
+meilleurs réglages dans EMBEDDING_TUNING_FILE, appliqué par RAGService au chargement.
+
+Les threads et la longueur max sont choisis pour la latence d'une requête isolée
+(chemin /chat) ; la taille de lot pour le débit (réindexation, clustering).
+
+Exemples :
+    python scripts/tune_embeddings.py --workers 2
+    python scripts/tune_embeddings.py --batch-sizes 1 16 64 --dry-run
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.core.metrics import percentile
+from app.services.embedding_tuning import EmbeddingTuning, select_best
+
+
+def load_queries(path: Path, count: int) -> List[str]:
+    """Questions de la FAQ et variantes de saisie (casse, ponctuation, formule de politesse)."""
+    questions = [item["question"] for item in json.loads(path.read_text(encoding="utf-8"))]
+    variants = []
+    for q in questions:
+        variants += [q, q.lower().rstrip(" ?"), f"Bonjour, {q[0].lower()}{q[1:]}"]
+    return list(itertools.islice(itertools.cycle(variants), count))
+
+
+def default_thread_counts(workers: int) -> List[int]:
+    """Puissances de deux jusqu'au nombre de cœurs disponibles par worker uvicorn."""
+    available = max((os.cpu_count() or 1) // workers, 1)
+    counts = [1]
+    while counts[-1] * 2 <= available:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != available:
+        counts.append(available)
+    return counts
+
+
+def benchmark(model, queries: List[str], batch_size: int, rounds: int) -> Dict:
+    """Encode les requêtes par lots ; débit global et latence par lot."""
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+    model.encode(batches[0], batch_size=batch_size)  # Préchauffage
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for batch in batches:
+            t0 = time.perf_counter()
+            model.encode(batch, batch_size=batch_size, convert_to_numpy=True)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return {
+        "qps": len(queries) * rounds / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autoréglage CPU du modèle d'embeddings")
+    parser.add_argument("--faq", type=Path, default=Path(settings.FAQ_JSON_PATH))
+    parser.add_argument("--queries", type=int, default=256, help="Nombre de requêtes par passe")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="Workers uvicorn se partageant les cœurs")
+    parser.add_argument("--threads", type=int, nargs="+")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16, 32, 64, 128])
+    parser.add_argument("--max-seq-lengths", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--max-p99-ms", type=float, help="p99 maximal par lot pour le choix de la taille de lot")
+    parser.add_argument("--allow-truncation", action="store_true",
+                        help="Tester des longueurs max inférieures à la plus longue requête")
+    parser.add_argument("--output", type=Path, default=Path(settings.EMBEDDING_TUNING_FILE))
+    parser.add_argument("--dry-run", action="store_true", help="Afficher sans écrire le fichier")
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    queries = load_queries(args.faq, args.queries)
+    model = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+    longest = max(len(ids) for ids in model.tokenizer(queries)["input_ids"])
+    seq_lengths = [n for n in args.max_seq_lengths if n <= model.max_seq_length and (args.allow_truncation or n >= longest)]
+    if not seq_lengths:
+        seq_lengths = [model.max_seq_length]
+    threads = args.threads or default_thread_counts(args.workers)
+    print(f"{len(queries)} requêtes (≤ {longest} tokens), {os.cpu_count()} cœurs, {args.workers} worker(s)")
+
+    results = []
+    print(f"{'threads':>7} {'seq':>5} {'batch':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for n_threads, seq_length, batch_size in itertools.product(threads, seq_lengths, args.batch_sizes):
+        torch.set_num_threads(n_threads)
+        model.max_seq_length = seq_length
+        row = {"threads": n_threads, "max_seq_length": seq_length, "batch_size": batch_size}
+        row.update(benchmark(model, queries, batch_size, args.rounds))
+        results.append(row)
+        print(f"{n_threads:>7} {seq_length:>5} {batch_size:>5} {row['qps']:>9.1f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+    # Chemin /chat : une requête à la fois, on minimise le p99
+    single = [r for r in results if r["batch_size"] == 1] or results
+    serving = min(single, key=lambda r: r["p99_ms"])
+    # Encodage par lots : meilleur débit à threads et longueur choisis
+    batched = select_best(
+        [r for r in results if r["threads"] == serving["threads"] and r["max_seq_length"] == serving["max_seq_length"]],
+        args.max_p99_ms,
+    )
+    tuning = EmbeddingTuning(
+        threads=serving["threads"], batch_size=batched["batch_size"], max_seq_length=serving["max_seq_length"]
+    )
+    print(f"Retenu : {tuning} (requête isolée p99 {serving['p99_ms']:.1f} ms, lots {batched['qps']:.1f} req/s)")
+
+    if args.dry_run:
+        return
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({
+        "threads": tuning.threads,
+        "batch_size": tuning.batch_size,
+        "max_seq_length": tuning.max_seq_length,
+        "model": settings.EMBEDDING_MODEL,
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "tuned_at": datetime.utcnow().isoformat(),
+        "results": results,
+    }, indent=2), encoding="utf-8")
+    print(f"Réglages écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,12 @@ if (!userId) {
 let isTyping = false;
 let failedMessages = new Map(); // Store failed messages for retry
 const MAX_MESSAGE_LENGTH = 2000;
+// WebSocket channel (HTTP /chat is used while it is unavailable)
+let chatSocket = null;
+let wsSessionId = sessionStorage.getItem("chat_ws_session");
+let wsRetryDelay = 1000;
+const pendingReplies = new Map(); // message id -> { resolve, reject, timer }
+const WS_REPLY_TIMEOUT_MS = 30000;
 // Initialize on DOM load
 document.addEventListener("DOMContentLoaded", () => {
   initializeChatbot();
@@ -16,6 +22,7 @@ document.addEventListener("DOMContentLoaded", () => {
 function initializeChatbot() {
   loadLLMStatus();
   loadChatHistory();
+  connectChatSocket();
   setupEventListeners();
   focusInput();
 }
@@ -42,6 +49,8 @@ function setupEventListeners() {
   settingsBtn.addEventListener("click", () => {
     showHistoryMenu();
   });
+  // Keep the server-side session preference in sync
+  document.getElementById("useLLM").addEventListener("change", sendPreferences);
   // Character counter
   userInput.addEventListener("input", updateCharacterCounter);
   // Auto-resize textarea
@@ -292,8 +301,118 @@ function hideTypingIndicator() {
   isTyping = false;
   const indicator = document.getElementById("typingIndicator");
   indicator.style.display = "none";
+  indicator.querySelector(".typing-text").textContent = "Le chatbot écrit...";
   updateStatusIndicator("online");
 }
+/**
+ * Show the partial answer streamed by the server
+ */
+function showPartialAnswer(text) {
+  const indicator = document.getElementById("typingIndicator");
+  indicator.querySelector(".typing-text").textContent = text;
+  scrollToBottom();
+}
+/**
+ * Open the WebSocket channel, resuming the previous session when possible
+ */
+function connectChatSocket() {
+  if (!("WebSocket" in window)) return;
+  const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+  const params = new URLSearchParams({ user_id: userId });
+  if (wsSessionId) params.set("resume", wsSessionId);
+  const socket = new WebSocket(
+    `${protocol}://${window.location.host}/ws/chat?${params}`
+  );
+  socket.addEventListener("message", (event) => {
+    handleSocketEvent(socket, JSON.parse(event.data));
+  });
+  socket.addEventListener("close", () => {
+    if (chatSocket === socket) chatSocket = null;
+    // Replies still pending are delivered after resumption (or time out)
+    setTimeout(connectChatSocket, wsRetryDelay);
+    wsRetryDelay = Math.min(wsRetryDelay * 2, 30000);
+  });
+}
+/**
+ * Handle an event received on the WebSocket channel
+ */
+function handleSocketEvent(socket, data) {
+  switch (data.type) {
+    case "session":
+      chatSocket = socket;
+      wsRetryDelay = 1000;
+      wsSessionId = data.session_id;
+      sessionStorage.setItem("chat_ws_session", wsSessionId);
+      if (data.use_llm !== document.getElementById("useLLM").checked) {
+        sendPreferences();
+      }
+      break;
+    case "ping":
+      socket.send(JSON.stringify({ type: "pong" }));
+      break;
+    case "partial":
+      showPartialAnswer(data.text);
+      break;
+    case "answer":
+    case "error": {
+      const pending = pendingReplies.get(data.id);
+      if (!pending) break;
+      pendingReplies.delete(data.id);
+      clearTimeout(pending.timer);
+      if (data.type === "answer") pending.resolve(data);
+      else pending.reject(new Error(data.detail));
+      break;
+    }
+  }
+}
+/**
+ * Send the use_llm preference to the server-side session
+ */
+function sendPreferences() {
+  if (!chatSocket) return;
+  chatSocket.send(
+    JSON.stringify({
+      type: "prefs",
+      use_llm: document.getElementById("useLLM").checked,
+    })
+  );
+}
+/**
+ * Send a message over the WebSocket channel and wait for its answer
+ */
+function sendOverSocket(message, messageId) {
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      pendingReplies.delete(messageId);
+      reject(new Error("Délai de réponse dépassé"));
+    }, WS_REPLY_TIMEOUT_MS);
+    pendingReplies.set(messageId, { resolve, reject, timer });
+    chatSocket.send(JSON.stringify({ type: "message", message, id: messageId }));
+  });
+}
+/**
+ * Send a message over HTTP
+ */
+async function postMessage(message, useLLM) {
+  const response = await fetch("/chat", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      message,
+      user_id: userId,
+      use_llm: useLLM,
+    }),
+  });
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({
+      detail: "Erreur inconnue",
+    }));
+    throw new Error(errorData.detail || `Erreur ${response.status}`);
+  }
+  return response.json();
+}
 /**
  * Scroll chat to bottom
  */
@@ -331,26 +450,11 @@ async function handleSendMessage() {
   // Show typing indicator
   showTypingIndicator();
   try {
-    const response = await fetch("/chat", {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-      },
-      body: JSON.stringify({
-        message,
-        user_id: userId,
-        use_llm: useLLM,
-      }),
-    });
+    const data = chatSocket
+      ? await sendOverSocket(message, messageId)
+      : await postMessage(message, useLLM);
     // Hide typing indicator
     hideTypingIndicator();
-    if (!response.ok) {
-      const errorData = await response.json().catch(() => ({
-        detail: "Erreur inconnue",
-      }));
-      throw new Error(errorData.detail || `Erreur ${response.status}`);
-    }
-    const data = await response.json();
     // Add bot response
     addMessage(data.response, false, {
       confidence: data.confidence,
@@ -492,6 +596,7 @@ async function retryMessage(originalMessage, messageId) {
   const storedData = failedMessages.get(messageId);
   if (storedData) {
     document.getElementById("useLLM").checked = storedData.useLLM;
+    sendPreferences();
   }
   focusInput();
   await handleSendMessage();
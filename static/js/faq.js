@@ -18,3 +18,106 @@ document.getElementById("addModal").addEventListener("click", function (e) {
 document.addEventListener("keydown", function (e) {
   if (e.key === "Escape") closeModal();
 });
+
+// Import en masse : un seul upsert et une seule mise à jour de l'index côté serveur
+async function importFaqFile(input) {
+  const file = input.files[0];
+  if (!file) return;
+  const formData = new FormData();
+  formData.append("file", file);
+  try {
+    const response = await fetch("/admin/faq/import", {
+      method: "POST",
+      body: formData,
+    });
+    const result = await response.json();
+    if (!response.ok) {
+      alert(`Erreur: ${result.detail || "Import impossible"}`);
+      return;
+    }
+    alert(
+      `Import terminé : ${result.created} créées, ${result.updated} mises à jour, ${result.unchanged} inchangées`
+    );
+    window.location.reload();
+  } catch (error) {
+    console.error("Erreur:", error);
+    alert("Erreur lors de l'import");
+  } finally {
+    input.value = "";
+  }
+}
+
+// Liste paginée : recherche plein texte et chargement incrémental côté serveur
+let faqSearchTimer = null;
+
+function debouncedSearchFaqs() {
+  clearTimeout(faqSearchTimer);
+  faqSearchTimer = setTimeout(searchFaqs, 300);
+}
+
+async function fetchFaqPage(cursor) {
+  const params = new URLSearchParams({
+    q: document.getElementById("faqSearch").value,
+    category: document.getElementById("faqCategory").value,
+  });
+  if (cursor) {
+    params.set(params.get("q").trim() ? "offset" : "before", cursor);
+  }
+  const response = await fetch(`/admin/faq/items?${params}`);
+  if (!response.ok) throw new Error(`Erreur ${response.status}`);
+  return response.json();
+}
+
+function renderFaqPage(page, append) {
+  const list = document.getElementById("faqList");
+  if (append) {
+    list.insertAdjacentHTML("beforeend", page.html);
+  } else {
+    list.innerHTML = page.html;
+  }
+  const loadMore = document.getElementById("faqLoadMore");
+  loadMore.dataset.nextCursor = page.next_cursor || "";
+  loadMore.style.display = page.next_cursor ? "" : "none";
+  document.getElementById("faqEmpty").style.display =
+    list.children.length ? "none" : "";
+}
+
+async function searchFaqs() {
+  try {
+    renderFaqPage(await fetchFaqPage(null), false);
+  } catch (error) {
+    console.error("Erreur recherche FAQ:", error);
+  }
+}
+
+async function loadMoreFaqs() {
+  const cursor = document.getElementById("faqLoadMore").dataset.nextCursor;
+  if (!cursor) return;
+  try {
+    renderFaqPage(await fetchFaqPage(cursor), true);
+  } catch (error) {
+    console.error("Erreur chargement FAQ:", error);
+  }
+}
+
+// Indexation en arrière-plan : bandeau affiché tant qu'un job est en attente ou en cours
+async function pollIndexStatus() {
+  const banner = document.getElementById("indexStatus");
+  try {
+    const response = await fetch("/admin/reindex/status");
+    if (!response.ok) return;
+    const status = await response.json();
+    banner.style.display = status.indexing ? "" : "none";
+    if (status.indexing) {
+      setTimeout(pollIndexStatus, 2000);
+    } else if (status.last && status.last.status === "failed") {
+      alert(`Échec de l'indexation : ${status.last.error}`);
+    }
+  } catch (error) {
+    console.error("Erreur statut indexation:", error);
+  }
+}
+
+if (document.getElementById("indexStatus").dataset.indexing === "true") {
+  setTimeout(pollIndexStatus, 2000);
+}
@@ -9,18 +9,34 @@ mock_st = MagicMock()
 mock_st.SentenceTransformer.return_value = MagicMock()
 sys.modules["sentence_transformers"] = mock_st
 
+import os
+import tempfile
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine, pool
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.main import app
-from app.db.session import get_session
+from app.db.session import get_session, get_async_session
+from app.routers.chat import chat_sessions, history_cache
+from app.services.interaction_writer import interaction_writer
+from app.services.reindex_jobs import reindex_scheduler
+from app.services.user_cache import user_cache
+from app.services.rate_limit import rate_limiter
 
-TEST_DATABASE_URL = "sqlite:///:memory:"
+# Fichier temporaire : partagé entre le moteur synchrone et le moteur asynchrone
+TEST_DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
 engine = create_engine(
-    TEST_DATABASE_URL, 
+    f"sqlite:///{TEST_DATABASE_PATH}",
     connect_args={"check_same_thread": False}, 
     poolclass=pool.StaticPool
 )
+# NullPool : TestClient ouvre une boucle d'événements par requête
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}",
+    poolclass=NullPool
+)
 
 @pytest.fixture(name="session")
 def session_fixture():
@@ -36,13 +52,29 @@ def client_fixture(session: Session):
     def get_session_override():
         return session
 
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+            yield async_session
+
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    interaction_writer.session_factory = lambda: Session(engine, expire_on_commit=False)
+    reindex_scheduler.session_factory = lambda: Session(engine)
+    reindex_scheduler.debounce = 0.01
     client = TestClient(app)
     yield client
+    interaction_writer.flush()
+    reindex_scheduler.wait(5)
     app.dependency_overrides.clear()
+    history_cache.clear()
+    chat_sessions.clear()
+    user_cache.clear()
+    rate_limiter.reset()
 
 class MockLLM:
-    async def generate_response(self, prompt):
+    async def generate_response(self, messages, timeout=None, on_partial=None):
+        if on_partial:
+            await on_partial("Ceci est")
         return {
             "response": "Ceci est une réponse simulée pour le test.",
             "provider": "mock_provider",
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import json
+import shutil
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core import assets
+from app.core.assets import MARKED_URL, CachedStaticFiles, asset_urls
+from scripts.build_assets import VendorIntegrityError, build, fetch_vendor, minify_css
+
+
+def _build(tmp_path: Path):
+    static_dir = tmp_path / "static"
+    shutil.copytree("static", static_dir, ignore=shutil.ignore_patterns("dist"))
+    (static_dir / "vendor").mkdir(exist_ok=True)
+    (static_dir / "vendor" / "marked.min.js").write_text("var marked={};")
+    return static_dir, build(static_dir, fetch=False)
+
+
+def test_minify_css_keeps_semantics():
+    css = "/* c */\n.a  >  .b ,\n.c {\n  color: red;\n  width: calc(100% - 2px);\n}\n.d :hover { x: y }"
+    assert minify_css(css) == ".a>.b,.c{color:red;width:calc(100% - 2px)}.d :hover{x:y}"
+
+
+def test_build_writes_hashed_bundles_and_manifest(tmp_path):
+    static_dir, manifest = _build(tmp_path)
+    assert json.loads((static_dir / "dist" / "manifest.json").read_text()) == manifest
+
+    chat_css = (static_dir / manifest["chat.css"]).read_text()
+    assert "@import" not in chat_css and ".chatbot-header" in chat_css
+    # theme.css est déjà fourni par base.css
+    assert "q:after" in (static_dir / manifest["base.css"]).read_text()
+    assert "q:after" not in chat_css
+    chat_js = static_dir / manifest["chat.js"]
+    assert chat_js.read_text().startswith("var marked={};")
+    assert gzip.decompress(chat_js.with_name(chat_js.name + ".gz").read_bytes()) == chat_js.read_bytes()
+
+    # Même contenu → même nom ; contenu modifié → nouveau nom
+    assert build(static_dir, fetch=False) == manifest
+    (static_dir / "js" / "faq.js").write_text("console.log(1);")
+    assert build(static_dir, fetch=False)["faq.js"] != manifest["faq.js"]
+
+
+def test_versioned_assets_are_immutable_and_precompressed(tmp_path):
+    static_dir, manifest = _build(tmp_path)
+    app = FastAPI()
+    static = CachedStaticFiles(directory=static_dir)
+    # Variantes indexées au montage, aucune recherche sur disque à la requête
+    assert f"{manifest['chat.css']}.gz" in static.precompressed
+    app.mount("/static", static, name="static")
+    client = TestClient(app)
+
+    response = client.get(f"/static/{manifest['chat.css']}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert "immutable" in response.headers["cache-control"]
+    assert response.text == (static_dir / manifest["chat.css"]).read_text()
+
+    response = client.get("/static/js/faq.js")
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_vendor_checksum_is_verified_when_pinned(tmp_path):
+    vendor = tmp_path / "vendor" / "marked.min.js"
+    vendor.parent.mkdir()
+    vendor.write_text("var marked={};")
+    lock = tmp_path / "vendor.lock.json"
+    # Sans empreinte : avertissement, rien n'est téléchargé (le CDN reste utilisé)
+    fetch_vendor(tmp_path / "sans_vendor", lock)
+    assert not (tmp_path / "sans_vendor").exists()
+
+    lock.write_text(json.dumps({"vendor/marked.min.js": {"url": MARKED_URL, "sha256": "0" * 64}}))
+    with pytest.raises(VendorIntegrityError):
+        fetch_vendor(tmp_path, lock)
+
+    lock.write_text(json.dumps({"vendor/marked.min.js": {
+        "url": MARKED_URL, "sha256": hashlib.sha256(b"var marked={};").hexdigest()
+    }}))
+    fetch_vendor(tmp_path, lock)
+
+
+def test_unpinned_vendor_is_loaded_from_cdn(tmp_path, monkeypatch):
+    static_dir = tmp_path / "static"
+    shutil.copytree("static", static_dir, ignore=shutil.ignore_patterns("dist", "vendor"))
+    # Le build passe sans le fichier vendor : il est simplement exclu du bundle
+    manifest = build(static_dir, fetch=False)
+
+    # static/vendor absent : marked depuis le CDN, puis le bundle
+    monkeypatch.setattr(assets, "load_manifest", lambda: manifest)
+    assert asset_urls("chat.js") == [MARKED_URL, f"/static/{manifest['chat.js']}"]
+
+
+def test_templates_fall_back_to_sources_without_build():
+    assert asset_urls("auth.css") == ["/static/css/pages/auth.css"]
@@ -21,4 +21,33 @@ def test_login_flow(client, session):
 def test_dashboard_access_denied(client):
     # Tenter d'accéder sans token
     response = client.get("/admin/stats")
-    assert response.status_code == 401  # Unauthorized
\ No newline at end of file
+    assert response.status_code == 401  # Unauthorized
+
+
+def test_profiling_requires_admin(client):
+    response = client.get("/admin/profile/cpu?seconds=0.1")
+    assert response.status_code == 401
+
+
+def test_deactivated_user_loses_cached_access(client, session):
+    admin = User(email="cache@test.com", hashed_password=get_password_hash("pass123"))
+    session.add(admin)
+    session.commit()
+    token = client.post(
+        "/api/auth/token", data={"username": "cache@test.com", "password": "pass123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/admin/stats", headers=headers).status_code == 200
+    assert client.get("/admin/stats", headers=headers).status_code == 200
+
+    admin.is_active = False
+    session.add(admin)
+    session.commit()
+    assert client.get("/admin/stats", headers=headers).status_code == 400
+
+def test_wrong_password_rejected(client, session):
+    session.add(User(email="admin@test.com", hashed_password=get_password_hash("pass123")))
+    session.commit()
+    response = client.post("/api/auth/token", data={"username": "admin@test.com", "password": "nope"})
+    assert response.status_code == 401
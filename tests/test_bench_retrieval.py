@@ -0,0 +1,59 @@
+import random
+from sqlmodel import Session
+from app.db import session as db_session
+from app.db.models import ChatInteraction
+
+from scripts.bench_retrieval import build_testset, logged_cases, paraphrases, score_cases
+from tests.conftest import engine
+
+
+def test_paraphrases_differ_from_question():
+    question = "Comment créer un compte utilisateur ?"
+    variants = paraphrases(question, random.Random(0))
+    assert variants["plain"] == "comment creer un compte utilisateur"
+    assert variants["synonyms"] == "comment ouvrir un profil utilisateur ?"
+    assert "comment" not in variants["keywords"]
+    assert question not in variants.values()
+
+
+def test_build_testset_labels_and_negatives():
+    faq = [{"id": 7, "question": "Où trouver ma facture ?", "answer": "Espace client."}]
+    cases = build_testset(faq, negatives=["Quelle heure est-il ?"])
+    assert {c["faq_id"] for c in cases} == {"7", None}
+    assert cases[-1]["source"] == "negative"
+
+
+def test_score_cases_recall_and_threshold_precision():
+    cases = [
+        {"query": "a", "faq_id": "1", "source": "plain"},
+        {"query": "b", "faq_id": "2", "source": "typo"},
+        {"query": "c", "faq_id": None, "source": "negative"},
+    ]
+    results = [
+        {"ids": ["1", "2"], "scores": [0.9, 0.5]},
+        {"ids": ["1", "2"], "scores": [0.6, 0.55]},
+        {"ids": ["2", "1"], "scores": [0.5, 0.1]},
+    ]
+    quality = score_cases(cases, results, k=2, thresholds=[0.45, 0.7])
+    assert quality["recall_at_1"] == 0.5
+    assert quality["recall_at_2"] == 1.0
+    assert quality["mrr"] == 0.75
+    low, high = quality["thresholds"]
+    assert (low["coverage"], low["precision"], low["false_accept_rate"]) == (1.0, 1 / 3, 1.0)
+    assert (high["coverage"], high["precision"], high["false_accept_rate"]) == (0.5, 1.0, 0.0)
+
+
+def test_logged_cases_use_direct_faq_answers(session: Session, monkeypatch):
+    monkeypatch.setattr(db_session, "engine", engine)
+    faq = [{"id": 7, "question": "Délai de livraison ?", "answer": "48 heures."}]
+    for message, response, provider, helpful in [
+        ("livraison combien de temps", "48 heures.", "retrieval_high_confidence", None),
+        ("reformulée", "48 heures.", "llm_groq", None),
+        ("mauvaise réponse", "48 heures.", "retrieval_high_confidence", False),
+        ("autre", "Je ne sais pas.", "retrieval_only", None),
+    ]:
+        session.add(ChatInteraction(user_session_id="u", message=message, response=response,
+                                    confidence=0.9, provider=provider, is_helpful=helpful))
+    session.commit()
+
+    assert logged_cases(faq, 100) == [{"query": "livraison combien de temps", "faq_id": "7", "source": "logged"}]
@@ -22,4 +22,68 @@ def test_chat_history_saving(client, session):
     assert response.status_code == 200
     data = response.json()
     assert len(data["history"]) == 1
-    assert data["history"][0]["user_message"] == "Test history"
\ No newline at end of file
+    assert data["history"][0]["user_message"] == "Test history"
+
+def test_chat_deadline_fallback(client, monkeypatch):
+    """Vérifie qu'un LLM trop lent est abandonné au profit du contexte FAQ."""
+    import asyncio
+    from app.services.llm_factory import LLMOrchestrator
+
+    class SlowProvider:
+        name = "slow"
+
+        async def generate(self, messages):
+            await asyncio.sleep(5)
+            return "trop tard"
+
+    orchestrator = LLMOrchestrator()
+    orchestrator.providers = [SlowProvider()]
+    monkeypatch.setattr("app.routers.chat.llm_orchestrator", orchestrator)
+    monkeypatch.setattr(
+        "app.routers.chat.rag_service.search",
+        lambda query, threshold=0.45: {
+            "answer": "Réponse FAQ", "confidence": 0.5, "matched_question": "Question FAQ"
+        },
+    )
+
+    response = client.post(
+        "/chat",
+        json={"message": "Question lente", "user_id": "slow_user", "deadline_seconds": 0.2}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["provider"] == "fallback_timeout"
+    assert data["response"] == "Réponse FAQ"
+
+
+def test_metrics_and_server_timing(client):
+    """Vérifie l'en-tête Server-Timing et l'exposition Prometheus."""
+    response = client.post("/chat", json={"message": "Bonjour", "user_id": "metrics_user"})
+    assert "rules;dur=" in response.headers["Server-Timing"]
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'chatbot_stage_duration_seconds_count{stage="rules"}' in metrics.text
+    assert 'chatbot_chat_requests_total{provider="static_rule"}' in metrics.text
+
+
+def test_chat_history_pagination_and_export(client):
+    """Vérifie la pagination par curseur et l'export en flux."""
+    for i in range(3):
+        client.post("/chat", json={"message": f"Question numéro {i}", "user_id": "page_user", "use_llm": False})
+
+    first = client.get("/chat/history/page_user?limit=2").json()
+    assert [h["user_message"] for h in first["history"]] == ["Question numéro 1", "Question numéro 2"]
+    assert first["has_more"] is True
+
+    second = client.get(f"/chat/history/page_user?limit=2&before={first['next_cursor']}").json()
+    assert [h["user_message"] for h in second["history"]] == ["Question numéro 0"]
+    assert second["has_more"] is False
+
+    export = client.get("/chat/history/page_user/export?format=ndjson")
+    assert export.status_code == 200
+    assert export.headers["content-encoding"] == "gzip"
+    assert len(export.text.strip().splitlines()) == 3
+
+    export = client.get("/chat/history/page_user/export?format=json")
+    assert len(export.json()) == 3
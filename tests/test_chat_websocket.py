@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.config import settings
+from app.routers.chat import chat_sessions
+from app.services.chat_sessions import ChatSession
+
+
+@pytest.fixture
+def faq_search(monkeypatch):
+    monkeypatch.setattr(
+        "app.routers.chat.rag_service.search",
+        lambda query, threshold=0.45: {"answer": "Réponse FAQ", "confidence": 0.5, "matched_question": "Question FAQ"},
+    )
+
+
+def receive_until(ws, event_type):
+    events = []
+    while not events or events[-1]["type"] != event_type:
+        events.append(ws.receive_json())
+    return events
+
+
+def test_websocket_chat_streams_and_keeps_session(client, faq_search):
+    with client.websocket_connect("/ws/chat?user_id=ws_user") as ws:
+        session = ws.receive_json()
+        assert session["type"] == "session" and session["resumed"] is False
+
+        ws.send_json({"type": "message", "message": "Question FAQ ?", "id": "m1"})
+        events = receive_until(ws, "answer")
+        assert [e["type"] for e in events] == ["typing", "retrieval", "partial", "answer"]
+        assert events[2]["text"] == "Ceci est"
+        assert events[-1]["id"] == "m1" and events[-1]["provider"] == "llm_mock_provider"
+
+        ws.send_json({"type": "prefs", "use_llm": False})
+        assert ws.receive_json() == {"type": "prefs", "use_llm": False}
+        ws.send_json({"type": "message", "message": "Autre question", "id": "m2"})
+        answer = receive_until(ws, "answer")[-1]
+        assert (answer["provider"], answer["response"]) == ("retrieval_only", "Réponse FAQ")
+
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+    history = client.get("/chat/history/ws_user").json()["history"]
+    assert [h["user_message"] for h in history] == ["Question FAQ ?", "Autre question"]
+
+
+def test_websocket_validates_use_llm_and_bad_frames(client, faq_search):
+    with client.websocket_connect("/ws/chat?user_id=frames_user") as ws:
+        ws.receive_json()
+        ws.send_bytes(b"\x00binaire")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_text("{pas du json")
+        assert ws.receive_json()["type"] == "error"
+
+        # "false" (chaîne) est validé comme ChatRequest.use_llm : pas de LLM
+        ws.send_json({"type": "message", "message": "Question FAQ ?", "id": "m1", "use_llm": "false"})
+        answer = receive_until(ws, "answer")[-1]
+        assert answer["provider"] == "retrieval_only"
+        ws.send_json({"type": "prefs", "use_llm": "peut-être"})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+
+def test_websocket_resume_restores_state(client, faq_search):
+    with client.websocket_connect("/ws/chat?user_id=resume_user") as ws:
+        session_id = ws.receive_json()["session_id"]
+        ws.send_json({"type": "prefs", "use_llm": False})
+        ws.receive_json()
+        ws.send_json({"type": "message", "message": "Question FAQ ?"})
+        receive_until(ws, "answer")
+
+    with client.websocket_connect(f"/ws/chat?user_id=resume_user&resume={session_id}") as ws:
+        session = ws.receive_json()
+        assert (session["session_id"], session["resumed"], session["use_llm"]) == (session_id, True, False)
+    assert list(chat_sessions._sessions[session_id].turns) == [("Question FAQ ?", "Réponse FAQ")]
+
+    # Autre utilisateur : nouvelle session
+    with client.websocket_connect(f"/ws/chat?user_id=intrus&resume={session_id}") as ws:
+        assert ws.receive_json()["resumed"] is False
+
+
+def test_websocket_heartbeat_closes_silent_client(client, monkeypatch):
+    monkeypatch.setattr(settings, "WS_HEARTBEAT_SECONDS", 0.05)
+    with client.websocket_connect("/ws/chat?user_id=idle_user") as ws:
+        assert ws.receive_json()["heartbeat_seconds"] == 0.05
+        assert ws.receive_json() == {"type": "ping"}
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+
+
+def test_answers_kept_while_detached():
+    session = ChatSession("detached_user", [], max_turns=5)
+    asyncio.run(session.send({"type": "partial", "text": "..."}))
+    asyncio.run(session.send({"type": "answer", "response": "Réponse"}, keep=True))
+    assert session.take_pending() == [{"type": "answer", "response": "Réponse"}]
+    assert session.take_pending() == []
@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from app.core.config import settings
+from app.core.metrics import percentile
+from app.services.embedding_tuning import apply_tuning, load_tuning, select_best, truncate_layers
+from scripts.tune_embeddings import load_queries
+
+
+def test_load_tuning_file_with_env_override(tmp_path, monkeypatch):
+    path = tmp_path / "tuning.json"
+    path.write_text(json.dumps({"threads": 2, "batch_size": 32, "max_seq_length": 128, "results": []}))
+    tuning = load_tuning(str(path))
+    assert (tuning.threads, tuning.batch_size, tuning.max_seq_length) == (2, 32, 128)
+
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 8)
+    assert load_tuning(str(path)).batch_size == 8
+    assert load_tuning(str(tmp_path / "absent.json")).threads is None
+
+
+def test_apply_tuning_sets_max_seq_length():
+    model = SimpleNamespace(max_seq_length=512)
+    apply_tuning(model, load_tuning("absent.json"))
+    assert model.max_seq_length == 512
+    tuning = load_tuning("absent.json")
+    tuning.max_seq_length = 96
+    apply_tuning(model, tuning)
+    assert model.max_seq_length == 96
+
+
+def test_select_best_respects_p99_bound():
+    results = [
+        {"batch_size": 1, "qps": 50, "p99_ms": 30},
+        {"batch_size": 32, "qps": 400, "p99_ms": 120},
+        {"batch_size": 128, "qps": 450, "p99_ms": 600},
+    ]
+    assert select_best(results)["batch_size"] == 128
+    assert select_best(results, max_p99_ms=200)["batch_size"] == 32
+    assert select_best(results, max_p99_ms=10)["batch_size"] == 1
+    assert percentile([0.1 * i for i in range(1, 101)], 99) == 0.1 * 99
+
+
+def test_load_queries_from_faq():
+    queries = load_queries(Path("data/faq.json"), 10)
+    assert len(queries) == 10 and queries[1] == queries[0].lower().rstrip(" ?")
+
+
+def test_truncate_layers_keeps_first_layers():
+    encoder = SimpleNamespace(layer=["l1", "l2", "l3", "l4"])
+    transformer = SimpleNamespace(encoder=encoder, config=SimpleNamespace(num_hidden_layers=4))
+    truncate_layers([SimpleNamespace(auto_model=transformer)], 2)
+    assert encoder.layer == ["l1", "l2"]
+    assert transformer.config.num_hidden_layers == 2
@@ -0,0 +1,80 @@
+import json
+from unittest.mock import MagicMock
+import pytest
+from sqlmodel import Session, select
+from app.core.deps import get_current_admin_user
+from app.db.models import FAQItem
+from app.main import app
+from app.services import faq_io
+from app.services.rag_engine import RAGService
+
+
+def test_parse_csv_and_json():
+    csv_content = "question,answer,category\nQ1,R1,compte\nQ2,R2,\n".encode("utf-8")
+    assert faq_io.parse_faq_file(csv_content, "faq.csv") == [
+        {"question": "Q1", "answer": "R1", "category": "compte"},
+        {"question": "Q2", "answer": "R2", "category": "general"},
+    ]
+    json_content = json.dumps([{"question": "Q1", "answer": "R1"}]).encode("utf-8")
+    assert faq_io.parse_faq_file(json_content, "faq.json")[0]["category"] == "general"
+    with pytest.raises(faq_io.FAQImportError):
+        faq_io.parse_faq_file(b'[{"question": "Q1"}]', "faq.json")
+
+    for malformed in ('["Q1"]', '[null]', '[{"question": 1, "answer": "R1"}]',
+                      '[{"question": "Q1", "answer": {"texte": "R1"}}]', '[{"question": "Q1", "answer": "R1", "category": []}]'):
+        with pytest.raises(faq_io.FAQImportError, match="Ligne 1"):
+            faq_io.parse_faq_file(malformed.encode("utf-8"), "faq.json")
+
+
+def test_import_upserts_and_encodes_only_new(session: Session, monkeypatch):
+    rag = RAGService()
+    monkeypatch.setattr(rag, "collection", MagicMock())
+    session.add(FAQItem(question="Q1", answer="Ancienne réponse"))
+    session.add(FAQItem(question="Q2", answer="R2"))
+    session.commit()
+
+    report, created, updated = faq_io.upsert_faqs(session, [
+        {"question": "Q1", "answer": "Nouvelle réponse", "category": "general"},
+        {"question": "Q2", "answer": "R2", "category": "general"},
+        {"question": "Q3", "answer": "R3", "category": "general"},
+    ])
+    assert faq_io.index_faqs(report, created, updated)
+    assert (report["created"], report["updated"], report["unchanged"]) == (1, 1, 1)
+    assert session.exec(select(FAQItem).where(FAQItem.question == "Q1")).one().answer == "Nouvelle réponse"
+
+    q1, q3 = (session.exec(select(FAQItem).where(FAQItem.question == q)).one() for q in ("Q1", "Q3"))
+    assert rag.collection.upsert.call_args.kwargs["ids"] == [str(q3.id)]
+    # Réponse modifiée : table locale seulement, sans appel au magasin de vecteurs
+    rag.collection.update.assert_not_called()
+    assert rag.answers.get(str(q1.id)).answer == "Nouvelle réponse"
+
+
+def test_seeding_keeps_existing_answers(session: Session):
+    session.add(FAQItem(question="Q1", answer="Réponse éditée"))
+    session.commit()
+
+    report = faq_io.import_faqs(session, [
+        {"question": "Q1", "answer": "Réponse du fichier", "category": "general"},
+        {"question": "Q2", "answer": "R2", "category": "general"},
+    ], update_existing=False)
+    assert (report["created"], report["updated"], report["unchanged"]) == (1, 0, 1)
+    assert session.exec(select(FAQItem).where(FAQItem.question == "Q1")).one().answer == "Réponse éditée"
+
+
+def test_import_endpoint_uses_async_session(client, session: Session, monkeypatch):
+    rag = RAGService()
+    monkeypatch.setattr(rag, "collection", MagicMock())
+    app.dependency_overrides[get_current_admin_user] = lambda: object()
+    content = json.dumps([{"question": "Q1", "answer": "R1"}]).encode("utf-8")
+
+    response = client.post("/admin/faq/import", files={"file": ("faq.json", content, "application/json")})
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    faq = session.exec(select(FAQItem)).one()
+    assert rag.collection.upsert.call_args.kwargs["ids"] == [str(faq.id)]
+
+
+def test_import_endpoint_rejects_malformed_rows(client):
+    app.dependency_overrides[get_current_admin_user] = lambda: object()
+    response = client.post("/admin/faq/import", files={"file": ("faq.json", b'[{"question": 1}]', "application/json")})
+    assert response.status_code == 400
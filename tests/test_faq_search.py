@@ -0,0 +1,44 @@
+import asyncio
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.models import FAQItem
+from app.services.faq_search import ensure_faq_search, search_faqs
+from tests.conftest import async_engine, engine
+
+
+def _search(**kwargs):
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            items, has_more = await search_faqs(db, **kwargs)
+            return [item.question for item in items], has_more
+    return asyncio.run(run())
+
+
+def test_fts_index_follows_faq_changes(session: Session):
+    ensure_faq_search(engine)
+    livraison = FAQItem(question="Quel est le délai de livraison ?", answer="3 à 5 jours.", category="livraison")
+    session.add(livraison)
+    session.add(FAQItem(question="Comment créer un compte ?", answer="Via l'inscription.", category="compte"))
+    session.commit()
+
+    assert _search(query="delai livr") == (["Quel est le délai de livraison ?"], False)
+    assert _search(query="inscription", category="livraison") == ([], False)
+
+    livraison.answer = "Expédition sous 24h."
+    session.add(livraison)
+    session.commit()
+    assert _search(query="expedition") == (["Quel est le délai de livraison ?"], False)
+
+    session.delete(livraison)
+    session.commit()
+    assert _search(query="expedition") == ([], False)
+
+
+def test_keyset_pagination(session: Session):
+    for i in range(3):
+        session.add(FAQItem(question=f"Question {i}", answer="R"))
+    session.commit()
+
+    first, has_more = _search(limit=2)
+    assert first == ["Question 2", "Question 1"] and has_more
+    assert _search(limit=2, before=2) == (["Question 0"], False)
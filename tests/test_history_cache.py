@@ -0,0 +1,29 @@
+from app.services.history_cache import SessionHistoryCache
+
+
+def test_ring_buffer_keeps_last_turns():
+    cache = SessionHistoryCache(max_sessions=10, max_turns=2)
+    assert cache.get("u1") is None
+    cache.fill("u1", [("Q1", "R1")])
+    cache.append("u1", "Q2", "R2")
+    cache.append("u1", "Q3", "R3")
+    assert cache.get("u1") == [("Q2", "R2"), ("Q3", "R3")]
+
+
+def test_append_ignored_for_unloaded_session():
+    """Une session absente doit être relue en base plutôt que servie partiellement."""
+    cache = SessionHistoryCache(max_sessions=10, max_turns=5)
+    cache.append("u1", "Q1", "R1")
+    assert cache.get("u1") is None
+
+
+def test_lru_eviction_and_invalidate():
+    cache = SessionHistoryCache(max_sessions=2, max_turns=5)
+    cache.fill("u1", [])
+    cache.fill("u2", [])
+    cache.get("u1")
+    cache.fill("u3", [])
+    assert cache.get("u2") is None
+    assert cache.get("u1") == []
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
@@ -0,0 +1,33 @@
+import asyncio
+from sqlmodel import Session, select
+from app.db.models import ChatInteraction
+from app.services.interaction_writer import InteractionWriter
+from tests.conftest import engine
+
+
+def test_writer_batches_and_flushes(session: Session):
+    writer = InteractionWriter(batch_size=10, flush_interval=5.0, queue_size=10, enqueue_timeout=0.1)
+    writer.session_factory = lambda: Session(engine, expire_on_commit=False)
+
+    async def submit_all():
+        for i in range(3):
+            await writer.submit(ChatInteraction(
+                user_session_id="batch_user", message=f"Q{i}", response=f"R{i}",
+                confidence=0.5, provider="retrieval_only"
+            ))
+
+    asyncio.run(submit_all())
+    writer.stop()
+    rows = session.exec(select(ChatInteraction).where(ChatInteraction.user_session_id == "batch_user")).all()
+    assert [r.message for r in rows] == ["Q0", "Q1", "Q2"]
+
+
+def test_writer_drops_when_full():
+    writer = InteractionWriter(batch_size=10, flush_interval=5.0, queue_size=1, enqueue_timeout=0.01)
+    writer.start = lambda: None  # pas de consommateur : la file reste pleine
+    interaction = ChatInteraction(user_session_id="u", message="m", response="r", confidence=0.0, provider="p")
+
+    async def submit_twice():
+        return [await writer.submit(interaction), await writer.submit(interaction)]
+
+    assert asyncio.run(submit_twice()) == [True, False]
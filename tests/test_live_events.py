@@ -0,0 +1,71 @@
+import asyncio
+import json
+import threading
+from datetime import datetime
+from sqlmodel import Session
+from app.db.models import ChatInteraction
+from app.services.interaction_writer import InteractionWriter
+from app.services.live_events import DashboardBroadcaster, format_sse
+from tests.conftest import engine
+
+
+def _interaction(i, confidence, provider="retrieval_only"):
+    return ChatInteraction(
+        id=i, user_session_id="u", message=f"Q{i}", response=f"R{i}",
+        confidence=confidence, provider=provider, timestamp=datetime(2024, 5, 1, 10)
+    )
+
+
+def test_batch_published_once_to_every_subscriber():
+    broadcaster = DashboardBroadcaster()
+
+    async def run():
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        batch = [_interaction(1, 0.9), _interaction(2, 0.1), _interaction(3, 0.0, "static_rule")]
+        thread = threading.Thread(target=broadcaster.publish_batch, args=(batch,))
+        thread.start()
+        thread.join()
+        events = [await asyncio.wait_for(first.get(), 1) for _ in range(2)]
+        assert [await asyncio.wait_for(second.get(), 1) for _ in range(2)] == events
+        broadcaster.unsubscribe(first)
+        broadcaster.unsubscribe(second)
+        return events
+
+    stats, missed = asyncio.run(run())
+    assert stats["event"] == "stats"
+    assert stats["data"]["messages"] == 3 and stats["data"]["missed"] == 1
+    assert stats["data"]["days"]["2024-05-01"]["messages"] == 3
+    assert missed["event"] == "missed" and missed["data"]["id"] == 2
+    assert json.loads(format_sse(missed).split("data: ")[1])["message"] == "Q2"
+
+
+def test_slow_subscriber_gets_resync():
+    broadcaster = DashboardBroadcaster(queue_size=2)
+
+    async def run():
+        queue = broadcaster.subscribe()
+        for i in range(3):
+            broadcaster._fan_out([{"event": "stats", "data": {"n": i}}])
+        return [queue.get_nowait()["event"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(run()) == ["resync", "stats"]
+
+
+def test_writer_notifies_listeners_after_commit(session: Session):
+    writer = InteractionWriter(batch_size=10, flush_interval=0.01, queue_size=10, enqueue_timeout=0.1)
+    writer.session_factory = lambda: Session(engine, expire_on_commit=False)
+    published = []
+    writer.listeners.append(lambda batch: published.extend(i.id for i in batch))
+
+    async def submit():
+        await writer.submit(ChatInteraction(
+            user_session_id="live", message="Q", response="R", confidence=0.2, provider="retrieval_only"
+        ))
+
+    asyncio.run(submit())
+    writer.stop()
+    assert len(published) == 1 and published[0] is not None
+
+
+def test_stream_requires_admin(client):
+    assert client.get("/admin/dashboard/stream").status_code == 401
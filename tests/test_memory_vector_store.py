@@ -0,0 +1,36 @@
+import pytest
+
+from app.services.memory_vector_store import InMemoryVectorClient
+from scripts.load_test import parse_mix
+
+
+def test_query_orders_by_cosine_distance():
+    collection = InMemoryVectorClient().create_collection("faq")
+    collection.add(ids=["a", "b"], embeddings=[[1, 0], [0, 1]], metadatas=[{"n": 1}, {"n": 2}])
+    result = collection.query(query_embeddings=[[0.9, 0.1]], n_results=2)
+    assert result["ids"] == [["a", "b"]]
+    assert result["distances"][0][0] < result["distances"][0][1]
+
+    collection.upsert(ids=["a"], embeddings=[[0, 1]])
+    collection.update(ids=["b"], metadatas=[{"n": 3}])
+    assert collection.count() == 2
+    result = collection.query(query_embeddings=[[0, 1]], n_results=1, include=["distances"])
+    assert result["distances"][0][0] == pytest.approx(0)
+    assert set(result) == {"ids", "distances"}
+
+
+def test_client_collection_lifecycle():
+    client = InMemoryVectorClient()
+    client.create_collection("faq")
+    with pytest.raises(ValueError):
+        client.create_collection("faq")
+    assert client.get_collection("faq").query(query_embeddings=[[1, 0]])["ids"] == [[]]
+    client.delete_collection("faq")
+    with pytest.raises(ValueError):
+        client.delete_collection("faq")
+
+
+def test_load_test_helpers():
+    assert parse_mix("faq=4,llm") == {"faq": 4.0, "llm": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("admin=1")
@@ -0,0 +1,74 @@
+import asyncio
+import numpy as np
+from datetime import datetime
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.models import ChatInteraction, MissedClusterRecord
+from app.services import missed_clusters
+from app.services.missed_clusters import MissedQuestionClusterer
+from tests.conftest import async_engine, engine
+
+
+def _vectors(*rows):
+    matrix = np.array(rows, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _interactions(*messages, day=1):
+    return [
+        ChatInteraction(id=i + 1, user_session_id="u", message=m, response=f"R{i}",
+                        confidence=0.1, provider="llm_groq", timestamp=datetime(2024, 5, day))
+        for i, m in enumerate(messages)
+    ]
+
+
+def test_similar_questions_are_grouped_incrementally():
+    clusterer = MissedQuestionClusterer(threshold=0.9)
+    clusterer.add(_interactions("Livraison ?", "Délai de livraison ?"), _vectors([1, 0, 0], [0.99, 0.05, 0]))
+    clusterer.add(_interactions("x", "y", "Remboursement ?")[2:], _vectors([0, 1, 0]))
+    more = _interactions("x", "y", "z", "Livraison ?")[3:]
+    clusterer.add(more, _vectors([1, 0.02, 0]))
+
+    top = clusterer.top()
+    assert [c["size"] for c in top] == [3, 1]
+    # Identifiant : l'interaction fondatrice, le même quel que soit le passage
+    assert [c["id"] for c in top] == [1, 3]
+    assert top[0]["representative"] == "Livraison ?"
+    assert clusterer.last_interaction_id == 4
+
+    clusterer.resolve(top[0]["id"])
+    assert [c["representative"] for c in clusterer.top()] == ["Remboursement ?"]
+
+
+def test_old_questions_are_evicted():
+    clusterer = MissedQuestionClusterer(threshold=0.9)
+    clusterer.add(_interactions("Livraison ?", "Remboursement ?"), _vectors([1, 0, 0], [0, 1, 0]))
+    clusterer.add(_interactions("x", "y", "Délai de livraison ?", day=20)[2:], _vectors([1, 0.05, 0]))
+
+    clusterer.evict(datetime(2024, 5, 10))
+    top = clusterer.top()
+    assert [(c["id"], c["size"], c["representative"]) for c in top] == [(1, 1, "Délai de livraison ?")]
+
+
+def test_published_clusters_are_shared_and_resolved(session: Session):
+    clusterer = MissedQuestionClusterer(threshold=0.9)
+    clusterer.add(_interactions("Livraison ?", "Délai de livraison ?"), _vectors([1, 0, 0], [0.99, 0.05, 0]))
+    clusterer.add(_interactions("x", "y", "Remboursement ?")[2:], _vectors([0, 1, 0]))
+    clusterer.publish(engine)
+
+    async def read():
+        async with AsyncSession(async_engine) as db:
+            return await missed_clusters.top_clusters(db), await missed_clusters.get_cluster(db, 3)
+
+    top, cluster = asyncio.run(read())
+    assert [(c["id"], c["size"]) for c in top] == [(1, 2), (3, 1)]
+    assert cluster.representative == "Remboursement ?"
+
+    # Conversion en FAQ depuis un autre worker : le regroupeur l'oublie au passage suivant
+    record = session.get(MissedClusterRecord, 1)
+    record.resolved = True
+    session.add(record)
+    session.commit()
+    clusterer.publish(engine)
+    assert list(clusterer.clusters) == [3]
+    assert [c["id"] for c in asyncio.run(read())[0]] == [3]
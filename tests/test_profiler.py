@@ -0,0 +1,44 @@
+import threading
+import tracemalloc
+
+from app.services import profiler
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_cpu_collects_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,))
+    worker.start()
+    try:
+        stacks = profiler.sample_cpu(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = stacks.splitlines()
+    assert lines
+    # Format « collapsed » : pile séparée par « ; » puis nombre d'échantillons
+    _, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    assert any("_busy_loop" in line for line in lines)
+    assert all("sample_cpu" not in line for line in lines)
+
+
+def test_diff_memory_snapshots_shows_allocation():
+    started = profiler.start_memory_trace()
+    try:
+        before = tracemalloc.take_snapshot()
+        retained = [bytearray(1024) for _ in range(2000)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    report = profiler.diff_memory_snapshots(before, after, top=5)
+    assert "test_profiler.py" in report
+    assert report.splitlines()[-1].startswith("# Total")
+    assert len(retained) == 2000
@@ -0,0 +1,29 @@
+from app.services.prompts import SYSTEM_PROMPT, build_messages
+
+
+def test_system_prefix_is_stable():
+    """Le message système ne dépend ni de la question, ni du contexte, ni de l'historique."""
+    first = build_messages("Quel est le prix ?", [], "C'est 10 euros.", 0.62)
+    second = build_messages(
+        "Comment créer un compte ?",
+        [("Bonjour", "Bonjour ! Comment puis-je vous aider ?")],
+        "",
+        0.0,
+    )
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def test_history_prefix_is_stable_across_turns():
+    """Un tour supplémentaire ne modifie pas les messages déjà envoyés (hors contexte final)."""
+    history = [("Q1", "R1"), ("Q2", "R2")]
+    turn = build_messages("Q3", history, "ctx A", 0.5)
+    next_turn = build_messages("Q4", history + [("Q3", "R3")], "ctx B", 0.7)
+    assert next_turn[:len(turn) - 1] == turn[:-1]
+
+
+def test_dynamic_context_is_last():
+    messages = build_messages("Quel est le prix ?", [("Q1", "R1")], "C'est 10 euros.", 0.62)
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    assert "C'est 10 euros." in messages[-1]["content"]
+    assert "Quel est le prix ?" in messages[-1]["content"]
+    assert "0.62" in messages[-1]["content"]
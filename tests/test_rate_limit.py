@@ -0,0 +1,62 @@
+import time
+import pytest
+from app.services.rate_limit import Limit, MemoryBucketStore, RateLimiter, SQLiteBucketStore, rate_limiter
+
+
+def test_parse_limit():
+    assert Limit.parse("20/minute") == Limit(rate=20 / 60, burst=20)
+    assert Limit.parse("5/second:10") == Limit(rate=5, burst=10)
+    with pytest.raises(ValueError):
+        Limit.parse("20 per minute")
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: MemoryBucketStore(max_keys=100),
+    lambda tmp_path: SQLiteBucketStore(str(tmp_path / "ratelimit.db"), max_keys=100),
+])
+def test_bucket_allows_burst_then_waits(tmp_path, make_store):
+    store = make_store(tmp_path)
+    limit = Limit.parse("2/minute")
+    assert store.take("k", limit) == 0
+    assert store.take("k", limit) == 0
+    assert 0 < store.take("k", limit) <= 30
+    # Seaux indépendants par clé
+    assert store.take("other", limit) == 0
+
+
+def test_memory_store_is_bounded():
+    store = MemoryBucketStore(max_keys=3)
+    limit = Limit.parse("1/hour")
+    for i in range(10):
+        store.take(str(i), limit)
+    assert list(store._buckets) == ["7", "8", "9"]
+
+
+def test_sqlite_expiry_keeps_drained_slow_buckets(tmp_path):
+    store = SQLiteBucketStore(str(tmp_path / "ratelimit.db"), max_keys=100)
+    slow, fast = Limit.parse("1/hour"), Limit.parse("100/second")
+    store.take("slow", slow)
+    store.take("fast", fast)
+    conn = store._connect()
+    # Nettoyage déclenché plus tard par une limite rapide : le seau lent n'est pas plein
+    store._expire(conn, time.time() + 60)
+    assert [row[0] for row in conn.execute("SELECT key FROM rate_limit_bucket")] == ["slow"]
+    assert store.take("slow", slow) > 0
+
+
+def test_ip_limit_applies_across_sessions():
+    limiter = RateLimiter(MemoryBucketStore(100), per_session={"/chat": "5/minute"}, per_ip={"/chat": "2/minute"})
+    assert limiter.check("/chat", "a", "1.2.3.4") == 0
+    assert limiter.check("/chat", "b", "1.2.3.4") == 0
+    assert limiter.check("/chat", "c", "1.2.3.4") > 0
+    assert limiter.check("/chat", "c", "5.6.7.8") == 0
+
+
+def test_chat_returns_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setitem(rate_limiter.limits["session"], "/chat", Limit.parse("1/minute"))
+    payload = {"message": "Bonjour", "user_id": "flood"}
+    assert client.post("/chat", json=payload).status_code == 200
+
+    response = client.post("/chat", json=payload)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
@@ -0,0 +1,86 @@
+import threading
+import time
+from sqlmodel import Session
+from app.db.models import FAQItem
+from app.services.rag_engine import RAGService
+from app.services.reindex_jobs import ReindexScheduler
+from tests.conftest import engine
+
+
+def _scheduler(debounce=0.05, max_delay=5.0):
+    scheduler = ReindexScheduler(debounce=debounce, max_delay=max_delay)
+    scheduler.session_factory = lambda: Session(engine)
+    return scheduler
+
+
+def test_burst_of_requests_is_coalesced(session: Session):
+    session.add(FAQItem(question="Q1", answer="R1"))
+    session.commit()
+    scheduler = _scheduler()
+    rebuilds = []
+    scheduler.rebuild = lambda items: rebuilds.append([item.question for item in items])
+
+    jobs = {scheduler.request("faq_add").id for _ in range(5)}
+    assert scheduler.status()["indexing"]
+    assert scheduler.wait(5)
+    scheduler.stop()
+
+    assert len(jobs) == 1
+    assert rebuilds == [["Q1"]]
+    last = scheduler.status()["last"]
+    assert last["status"] == "success" and last["requests"] == 5 and last["faq_count"] == 1
+    assert not scheduler.status()["indexing"]
+
+
+def test_max_delay_bounds_debounce(session: Session):
+    scheduler = _scheduler(debounce=10.0, max_delay=0.1)
+    scheduler.rebuild = lambda items: None
+
+    start = time.monotonic()
+    scheduler.request("faq_add")
+    assert scheduler.wait(5)
+    scheduler.stop()
+    assert time.monotonic() - start < 5
+
+
+def test_failed_rebuild_is_reported(session: Session):
+    scheduler = _scheduler(debounce=0.01)
+
+    def fail(items):
+        raise RuntimeError("chroma indisponible")
+
+    scheduler.rebuild = fail
+    scheduler.request("manual")
+    assert scheduler.wait(5)
+    scheduler.stop()
+    last = scheduler.status()["last"]
+    assert last["status"] == "failed" and "chroma" in last["error"]
+
+
+def test_removal_during_rebuild_is_not_undone(session: Session):
+    faq = FAQItem(question="Q1", answer="R1")
+    session.add(faq)
+    session.commit()
+    rag = RAGService()
+    scheduler = _scheduler(debounce=0.01)
+    started = threading.Event()
+
+    def slow_rebuild(items):
+        started.set()
+        time.sleep(0.2)
+        rag.reload_from_items(items)
+
+    scheduler.rebuild = slow_rebuild
+    scheduler.request("manual")
+    assert started.wait(5)
+    # FAQ supprimée pendant la reconstruction (lue avant la suppression)
+    remover = threading.Thread(target=rag.remove_items, args=([faq.id],))
+    remover.start()
+    assert scheduler.wait(5)
+    remover.join(5)
+    scheduler.stop()
+    assert rag.answers.get(str(faq.id)) is None
+
+
+def test_status_requires_admin(client):
+    assert client.get("/admin/reindex/status").status_code == 401
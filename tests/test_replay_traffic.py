@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_replay_chat_mode_smoke(tmp_path):
+    """Rejeu complet en mode chat (application réelle, LLM simulé), au-delà des limites de débit."""
+    questions = [item["question"] for item in json.loads((ROOT / "data/faq.json").read_text(encoding="utf-8"))]
+    records = [
+        {"session": f"s{i % 3}", "message": message, "response": "", "confidence": 0.0, "provider": "retrieval_only"}
+        for i, message in enumerate((["Bonjour"] + questions + ["Quel temps fera-t-il demain ?"]) * 2)
+    ]
+    replay_file = tmp_path / "replay.ndjson"
+    replay_file.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    report = tmp_path / "report.json"
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'replay.db'}",
+        VECTOR_BACKEND="memory",
+        GROQ_API_KEY="",
+        OPENAI_API_KEY="",
+        RETENTION_DAYS="0",
+        EMBEDDING_TUNING_FILE=str(tmp_path / "absent.json"),
+    )
+    process = subprocess.run(
+        [sys.executable, "scripts/replay_traffic.py", "replay", str(replay_file),
+         "--mode", "chat", "--hash-encoder", "--report", str(report)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert process.returncode == 0, process.stderr[-2000:]
+    summary = json.loads(report.read_text(encoding="utf-8"))
+    assert summary["requests"] == len(records) > 60
+    assert "rate_limited" not in summary["provider_mix"]["replayed"]
+    assert summary["provider_mix"]["replayed"]["llm"] > 0
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, create_engine, select
+from app.db.models import ChatInteraction
+from app.services.leases import acquire_lease
+from app.services.retention import (
+    archive_old_interactions, enable_incremental_vacuum, incremental_vacuum, read_archive
+)
+from tests.conftest import engine
+
+
+def test_old_interactions_are_archived(session: Session, tmp_path):
+    old = datetime.utcnow() - timedelta(days=200)
+    for i in range(3):
+        session.add(ChatInteraction(
+            user_session_id=f"u{i % 2}", message=f"Ancien {i}", response="R",
+            confidence=0.5, provider="retrieval_only", timestamp=old + timedelta(days=i)
+        ))
+    session.add(ChatInteraction(
+        user_session_id="u0", message="Récent", response="R", confidence=0.5, provider="retrieval_only"
+    ))
+    session.commit()
+
+    archived = archive_old_interactions(engine, tmp_path, max_age_days=180, chunk_size=2)
+    assert archived == 3
+    remaining = session.exec(select(ChatInteraction)).all()
+    assert [r.message for r in remaining] == ["Récent"]
+
+    records = list(read_archive(tmp_path))
+    assert [r["message"] for r in records] == ["Ancien 0", "Ancien 1", "Ancien 2"]
+    assert [r["message"] for r in read_archive(tmp_path, user_session_id="u1")] == ["Ancien 1"]
+    assert list(read_archive(tmp_path, start=(old + timedelta(days=2)).date())) == records[2:]
+
+
+def test_row_cap(session: Session, tmp_path):
+    for i in range(5):
+        session.add(ChatInteraction(
+            user_session_id="u", message=f"M{i}", response="R", confidence=0.5, provider="retrieval_only"
+        ))
+    session.commit()
+
+    assert archive_old_interactions(engine, tmp_path, max_rows=2) == 3
+    remaining = session.exec(select(ChatInteraction)).all()
+    assert [r.message for r in remaining] == ["M3", "M4"]
+
+
+def test_archive_parts_read_in_id_order(session: Session, tmp_path):
+    old = datetime.utcnow() - timedelta(days=200)
+    for i in range(12):
+        session.add(ChatInteraction(
+            user_session_id="u", message=f"M{i}", response="R", confidence=0.5,
+            provider="retrieval_only", timestamp=old
+        ))
+    session.commit()
+
+    # Lots de 3 : part-…-1, -4, -7, -10 dans la même partition
+    assert archive_old_interactions(engine, tmp_path, max_age_days=180, chunk_size=3) == 12
+    assert [r["message"] for r in read_archive(tmp_path)] == [f"M{i}" for i in range(12)]
+
+
+def test_retention_lease_single_holder(session: Session):
+    assert acquire_lease(engine, "retention", 60, holder="a")
+    assert not acquire_lease(engine, "retention", 60, holder="b")
+    # Le détenteur prolonge son bail ; un bail expiré est repris
+    assert acquire_lease(engine, "retention", -1, holder="a")
+    assert acquire_lease(engine, "retention", 60, holder="b")
+    assert not acquire_lease(engine, "retention", 60, holder="a")
+
+
+def test_vacuum_mode_is_only_switched_offline(tmp_path):
+    db = create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    with db.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (x)")
+
+    def mode():
+        with db.connect() as conn:
+            return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+
+    # Passage en tâche de fond : pas de VACUUM complet, le mode reste inchangé
+    incremental_vacuum(db)
+    assert mode() == 0
+    assert enable_incremental_vacuum(db)
+    assert mode() == 2
+    assert not enable_incremental_vacuum(db)
+    incremental_vacuum(db)
@@ -3,6 +3,7 @@ from unittest.mock import MagicMock
 from sqlmodel import Session
 from app.services.rag_engine import RAGService
 from app.models import FAQItem
+from app.services.answer_store import AnswerStore
 
 def test_rag_static_rules():
     """Vérifie que les règles statiques (Bonjour, etc.) fonctionnent sans DB."""
@@ -57,4 +58,79 @@ def test_rag_search_no_match(session: Session):
     }
     result = engine.search("Une question qui n'a aucun sens ici")
     assert result["answer"] is None
-    assert result["confidence"] == 0.0
\ No newline at end of file
+    assert result["confidence"] == 0.0
+
+def _ranking(distances):
+    return {"ids": [[str(i + 1) for i in range(len(distances))]], "distances": [distances]}
+
+
+def test_cascade_first_stage_decisions(monkeypatch):
+    """Le modèle complet n'est sollicité que si le premier classement est ambigu."""
+    engine = RAGService()
+    monkeypatch.setattr(engine, "collection", MagicMock())
+    monkeypatch.setattr(engine, "fast_model", MagicMock())
+    monkeypatch.setattr(engine, "fast_collection", MagicMock())
+    monkeypatch.setattr(engine, "answers", AnswerStore(
+        [FAQItem(id=i, question=f"Question {i}", answer=f"Réponse {i}") for i in (1, 2)]
+    ))
+    engine.collection.query.return_value = _ranking([0.2])
+
+    engine.fast_collection.query.return_value = _ranking([0.05, 0.5])
+    result = engine.search("comment créer un compte")
+    assert result["answer"] == "Réponse 1" and result["confidence"] == pytest.approx(0.95)
+    engine.collection.query.assert_not_called()
+
+    engine.fast_collection.query.return_value = _ranking([0.95, 0.97])
+    assert engine.search("recette de cuisine du terroir")["answer"] is None
+    engine.collection.query.assert_not_called()
+
+    engine.fast_collection.query.return_value = _ranking([0.3, 0.32])
+    result = engine.search("compte ou mot de passe")
+    engine.collection.query.assert_called_once()
+    assert result["confidence"] == pytest.approx(0.8)
+
+
+def test_cascade_indexes_share_sync(monkeypatch):
+    """Reconstruction et mises à jour partielles alimentent les deux index."""
+    from app.services.memory_vector_store import InMemoryVectorClient
+    from scripts.load_test import HashingEncoder
+
+    engine = RAGService()
+    client = InMemoryVectorClient()
+    for attribute, value in [("chroma_client", client), ("model", HashingEncoder()),
+                             ("fast_model", HashingEncoder(dim=64)), ("collection", None),
+                             ("fast_collection", None)]:
+        monkeypatch.setattr(engine, attribute, value)
+    items = [FAQItem(id=1, question="Comment créer un compte ?", answer="Inscription."),
+             FAQItem(id=2, question="Quel est le prix ?", answer="10 euros.")]
+    engine.reload_from_items(items)
+    engine.reload_from_items(items)
+    assert sorted(client._collections) == ["faq_collection_fast_next", "faq_collection_next"]
+    assert engine.fast_collection.count() == 2
+
+    items.append(FAQItem(id=3, question="Livrez-vous à l'étranger ?", answer="Oui."))
+    assert engine.update_items(items[2:])
+    assert engine.collection.count() == engine.fast_collection.count() == 3
+    assert engine.answers.get("3").answer == "Oui."
+
+
+def test_answers_served_from_local_table(monkeypatch):
+    """L'index ne renvoie que des ids : réponse modifiée ou FAQ supprimée visibles sans réindexation."""
+    engine = RAGService()
+    monkeypatch.setattr(engine, "collection", MagicMock())
+    monkeypatch.setattr(engine, "fast_collection", None)
+    item = FAQItem(id=4, question="Où trouver ma facture ?", answer="Espace client.")
+    monkeypatch.setattr(engine, "answers", AnswerStore([item], version=3))
+    engine.collection.query.return_value = {"ids": [["4"]], "distances": [[0.1]]}
+
+    assert engine.search("où est ma facture")["answer"] == "Espace client."
+    assert engine.collection.query.call_args.kwargs["include"] == ["distances"]
+
+    item.answer = "Rubrique Factures."
+    assert engine.update_items([], [item])
+    assert engine.answers.version == 4
+    assert engine.search("où est ma facture")["answer"] == "Rubrique Factures."
+    engine.collection.update.assert_not_called()
+
+    engine.answers.remove(["4"])
+    assert engine.search("où est ma facture")["answer"] is None
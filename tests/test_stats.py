@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+from sqlmodel import Session, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.models import ChatInteraction, StatsBucket
+from app.services import stats
+from tests.conftest import async_engine
+
+
+def _interaction(confidence, provider, hour):
+    return ChatInteraction(
+        user_session_id="u", message="m", response="r", confidence=confidence,
+        provider=provider, timestamp=datetime(2024, 5, 1, hour, 30)
+    )
+
+
+def test_buckets_are_incremented(session: Session):
+    stats.apply_deltas(session, stats.aggregate([
+        _interaction(0.9, "retrieval_high_confidence", 10),
+        _interaction(0.2, "llm_groq", 10),
+    ]))
+    stats.apply_deltas(session, stats.aggregate([
+        _interaction(0.1, "llm_groq", 11),
+        _interaction(0.0, "static_rule", 11),
+    ]))
+    session.commit()
+
+    hours = session.exec(select(StatsBucket).where(
+        StatsBucket.granularity == "hour", StatsBucket.provider == "llm_groq"
+    )).all()
+    assert [(b.bucket_start.hour, b.messages, b.missed) for b in hours] == [(10, 1, 1), (11, 1, 1)]
+
+    async def read():
+        async with AsyncSession(async_engine) as db:
+            return await stats.get_summary(db), await stats.get_provider_mix(db)
+
+    summary, providers = asyncio.run(read())
+    assert summary["total_messages"] == 4
+    assert summary["missed_questions_count"] == 2
+    assert abs(summary["avg_confidence"] - 0.3) < 1e-9
+    assert providers == {"retrieval_high_confidence": 1, "llm_groq": 2, "static_rule": 1}
+
+
+def test_backfill_runs_once(session: Session):
+    session.add(_interaction(0.9, "retrieval_high_confidence", 10))
+    session.add(_interaction(0.1, "llm_groq", 11))
+    session.commit()
+
+    assert stats.backfill_stats(session) == 2
+    days = session.exec(select(StatsBucket).where(StatsBucket.granularity == "day")).all()
+    assert sum(b.messages for b in days) == 2
+
+    # Marqueur posé : un autre worker ne recompte pas, même si la table paraît vide
+    session.exec(delete(StatsBucket))
+    session.commit()
+    assert stats.backfill_stats(session) == 0